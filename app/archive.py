@@ -0,0 +1,48 @@
+# app/archive.py
+import hashlib
+import os
+import tempfile
+import zstandard
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Innehållsadresserat arkiv av hämtade sidor: <ARCHIVE_DIR>/ab/cd/<sha256>.html.zst
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "1") == "1"
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "./archive")
+ARCHIVE_ZSTD_LEVEL = int(os.getenv("ARCHIVE_ZSTD_LEVEL", "10"))
+
+
+def page_hash(page_source: str) -> str:
+    return hashlib.sha256(page_source.encode("utf-8")).hexdigest()
+
+
+def page_path(digest: str, root: str = None) -> str:
+    return os.path.join(root or ARCHIVE_DIR, digest[:2], digest[2:4], f"{digest}.html.zst")
+
+
+def store_page(page_source: str, root: str = None) -> str:
+    """Spara sidan zstd-komprimerad under dess hash; identiska sidor lagras bara en gång."""
+    digest = page_hash(page_source)
+    path = page_path(digest, root)
+    if os.path.exists(path):
+        return digest
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    compressed = zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress(page_source.encode("utf-8"))
+    # Skriv till temporär fil och byt namn så att samtidiga workers aldrig ser en halv fil
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return digest
+
+
+def load_page(digest: str, root: str = None) -> str:
+    with open(page_path(digest, root), "rb") as f:
+        return zstandard.ZstdDecompressor().decompress(f.read()).decode("utf-8")
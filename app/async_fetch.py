@@ -0,0 +1,192 @@
+# app/async_fetch.py
+"""Asynkron hämtning: en process driver många samtidiga sidladdningar över en delad HTTP/2-pool.
+
+Sidor som kräver JS-rendering lämnas till processens Selenium-pool i en trådpool med
+lika många trådar som pooldrivers, så att webbläsarna aldrig blir fler än vanligt.
+Global och per-värd token bucket, tak för antal sidor i luften och en begränsad
+resultatkö som håller tillbaka nya hämtningar när konsumenten inte hinner med.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from dotenv import load_dotenv
+from .config import logger
+from .driver_pool import DRIVER_POOL_SIZE
+from .ratelimit import HOST_RATE_BURST, HOST_RATE_LIMIT, host_of
+from .scraper import (
+    HTTP_MAX_CONNECTIONS, HTTP_TIMEOUT, HTTP_USER_AGENT, Fetcher, SeleniumFetcher, has_content_marker,
+)
+
+load_dotenv()
+
+ASYNC_FETCH_CONCURRENCY = int(os.getenv("ASYNC_FETCH_CONCURRENCY", "32"))  # sidor i luften per process
+ASYNC_FETCH_RATE = float(os.getenv("ASYNC_FETCH_RATE", "10"))  # förfrågningar per sekund och process, alla värdar
+ASYNC_FETCH_BURST = float(os.getenv("ASYNC_FETCH_BURST", "20"))
+# Per-värdgränsen delas med övriga workers via Redis, som i batchläget
+ASYNC_FETCH_SHARED_HOST_LIMIT = os.getenv("ASYNC_FETCH_SHARED_HOST_LIMIT", "1") == "1"
+ASYNC_FETCH_RESULT_BUFFER = int(os.getenv("ASYNC_FETCH_RESULT_BUFFER", "0")) or ASYNC_FETCH_CONCURRENCY
+ASYNC_FETCH_BROWSER_WORKERS = int(os.getenv("ASYNC_FETCH_BROWSER_WORKERS", "0")) or DRIVER_POOL_SIZE
+
+
+class TokenBucket:
+    """Token bucket för en event loop; väntande anropare släpps i tur och ordning."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class SharedHostBucket:
+    """Per-värdgränsen i Redis (ratelimit.acquire), så att alla workers delar samma budget."""
+
+    def __init__(self, host: str, rate: float, burst: float):
+        self.host, self.rate, self.burst = host, rate, burst
+
+    async def acquire(self):
+        from . import ratelimit
+
+        while True:
+            wait = await asyncio.to_thread(ratelimit.acquire, self.host, self.rate, self.burst)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+class AsyncFetcher:
+    """Hämtar många sidor samtidigt i en event loop med fallback till webbläsaren."""
+
+    def __init__(self, concurrency: int = ASYNC_FETCH_CONCURRENCY, rate: float = ASYNC_FETCH_RATE,
+                 burst: float = ASYNC_FETCH_BURST, host_rate: float = HOST_RATE_LIMIT,
+                 host_burst: float = HOST_RATE_BURST, shared_host_limit: bool = ASYNC_FETCH_SHARED_HOST_LIMIT,
+                 fallback: Fetcher = None, browser_workers: int = ASYNC_FETCH_BROWSER_WORKERS,
+                 client: httpx.AsyncClient = None):
+        self.concurrency = concurrency
+        self.host_rate, self.host_burst = host_rate, host_burst
+        self.shared_host_limit = shared_host_limit
+        self.fallback = fallback
+        self.stats = {"http": 0, "browser": 0, "failed": 0}
+        self._inflight = asyncio.Semaphore(concurrency)
+        self._global = TokenBucket(rate, burst)
+        self._hosts = {}
+        self._executor = ThreadPoolExecutor(max_workers=browser_workers, thread_name_prefix="browser-fetch") \
+            if fallback is not None else None
+        self.client = client or httpx.AsyncClient(
+            http2=True,
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max(concurrency, HTTP_MAX_CONNECTIONS),
+                                max_keepalive_connections=max(concurrency, HTTP_MAX_CONNECTIONS)),
+            headers={
+                "User-Agent": HTTP_USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml",
+                "Accept-Encoding": "gzip, deflate, br",
+                "Accept-Language": "sv-SE,sv;q=0.9",
+            },
+        )
+
+    def _host_bucket(self, host: str):
+        if host not in self._hosts:
+            self._hosts[host] = SharedHostBucket(host, self.host_rate, self.host_burst) if self.shared_host_limit \
+                else TokenBucket(self.host_rate, self.host_burst)
+        return self._hosts[host]
+
+    async def _browser_fetch(self, url: str) -> str:
+        self.stats["browser"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.fallback.fetch, url)
+
+    async def fetch(self, url: str) -> str:
+        """Hämta en sida; väntar på plats i luften och på båda token-hinkarna."""
+        async with self._inflight:
+            await self._global.acquire()
+            await self._host_bucket(host_of(url)).acquire()
+            try:
+                response = await self.client.get(url)
+                response.raise_for_status()
+                page_source = response.text
+            except httpx.HTTPError as e:
+                if self.fallback is None:
+                    self.stats["failed"] += 1
+                    raise RuntimeError(f"Failed to fetch page source from {url}: {e}")
+                logger.warning("Async fetch failed for %s (%s), falling back to %s.", url, e, self.fallback.name)
+                return await self._browser_fetch(url)
+
+            if has_content_marker(page_source):
+                self.stats["http"] += 1
+                return page_source
+            if self.fallback is None:
+                self.stats["failed"] += 1
+                raise RuntimeError(f"Content marker missing in HTTP response from {url}")
+            logger.debug("Content marker missing for %s, falling back to %s.", url, self.fallback.name)
+            return await self._browser_fetch(url)
+
+    async def stream(self, items):
+        """Hämta (nyckel, url)-par och ge (nyckel, sidkälla, fel) i den ordning de blir klara.
+
+        Högst `concurrency` sidor är i luften och högst ASYNC_FETCH_RESULT_BUFFER färdiga
+        sidor väntar på konsumenten; är bufferten full startar inga nya hämtningar.
+        """
+        pending = asyncio.Queue(maxsize=self.concurrency)
+        results = asyncio.Queue(maxsize=ASYNC_FETCH_RESULT_BUFFER)
+        done = object()
+
+        async def produce():
+            for item in items:
+                await pending.put(item)
+            for _ in range(self.concurrency):
+                await pending.put(done)
+
+        async def work():
+            while True:
+                item = await pending.get()
+                if item is done:
+                    await results.put(done)
+                    return
+                key, url = item
+                try:
+                    await results.put((key, await self.fetch(url), None))
+                except Exception as e:
+                    await results.put((key, None, e))
+
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        try:
+            finished = 0
+            while finished < self.concurrency:
+                result = await results.get()
+                if result is done:
+                    finished += 1
+                    continue
+                yield result
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def aclose(self):
+        await self.client.aclose()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def make_async_fetcher(**kwargs) -> AsyncFetcher:
+    """AsyncFetcher med Selenium-poolen som fallback för sidor som kräver JS."""
+    return AsyncFetcher(fallback=SeleniumFetcher(), **kwargs)
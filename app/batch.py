@@ -0,0 +1,160 @@
+# app/batch.py
+import json
+import os
+import time
+import uuid
+from dotenv import load_dotenv
+from .query import query_hash
+from .redis_client import get_redis
+
+load_dotenv()
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))  # samtidiga skrapningar per batch
+BATCH_TTL = int(os.getenv("BATCH_TTL", "604800"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "10000"))
+# En plats som inte lämnas tillbaka (t.ex. SIGKILL:ad worker) blir ledig igen efter så här många sekunder
+BATCH_LEASE_TTL = int(os.getenv("BATCH_LEASE_TTL", "900"))
+
+BATCH_PREFIX = "batch:"
+
+
+def _key(batch_id: str, suffix: str) -> str:
+    return f"{BATCH_PREFIX}{batch_id}:{suffix}"
+
+
+def dedupe(people):
+    """Ta bort dubbletter på normaliserad sökning; behåller första förekomsten."""
+    seen, unique = set(), []
+    for person in people:
+        key = query_hash(person.first_name, person.last_name, person.city)
+        if key not in seen:
+            seen.add(key)
+            unique.append(person)
+    return unique
+
+
+def create_batch(total: int, duplicates: int) -> str:
+    batch_id = str(uuid.uuid4())
+    r = get_redis()
+    pipe = r.pipeline()
+    pipe.hset(_key(batch_id, "meta"), mapping={
+        "total": total,
+        "duplicates": duplicates,
+        "done": 0,
+        "failed": 0,
+        "status": "running",
+        "created_at": time.time(),
+    })
+    pipe.expire(_key(batch_id, "meta"), BATCH_TTL)
+    pipe.execute()
+    return batch_id
+
+
+def record_result(batch_id: str, query: dict, output: dict = None, error: str = None):
+    """Spara ett färdigt objekt i batchens resultatlista och räkna upp progress.
+
+    Batchen markeras klar när det sista objektet registreras.
+    """
+    line = json.dumps({"query": query, "result": output, "error": error}, ensure_ascii=False)
+    pipe = get_redis().pipeline()
+    pipe.rpush(_key(batch_id, "results"), line)
+    pipe.expire(_key(batch_id, "results"), BATCH_TTL)
+    pipe.hincrby(_key(batch_id, "meta"), "failed" if error else "done", 1)
+    pipe.hmget(_key(batch_id, "meta"), "total", "done", "failed")
+    total, done, failed = pipe.execute()[-1]
+    if total is not None and int(done) + int(failed) >= int(total):
+        mark_complete(batch_id)
+
+
+def mark_complete(batch_id: str):
+    get_redis().hset(_key(batch_id, "meta"), "status", "complete")
+
+
+def progress(batch_id: str):
+    """Aggregerad status för en batch, eller None om den inte finns."""
+    meta = get_redis().hgetall(_key(batch_id, "meta"))
+    if not meta:
+        return None
+    meta = {k.decode(): v.decode() for k, v in meta.items()}
+    total, done, failed = int(meta["total"]), int(meta["done"]), int(meta["failed"])
+    return {
+        "batch_id": batch_id,
+        "status": meta["status"],
+        "total": total,
+        "duplicates": int(meta["duplicates"]),
+        "done": done,
+        "failed": failed,
+        "pending": total - done - failed,
+    }
+
+
+def iter_results(batch_id: str, chunk_size: int = 500):
+    """Strömma batchens resultat som NDJSON-rader, en Redis-rundresa per chunk."""
+    r = get_redis()
+    start = 0
+    while True:
+        lines = r.lrange(_key(batch_id, "results"), start, start + chunk_size - 1)
+        if not lines:
+            return
+        for line in lines:
+            yield line + b"\n"
+        start += len(lines)
+
+
+# Lånar ut lediga platser: utgångna lån släpps, sedan tas nästa objekt ur kön per ledig plats.
+# Lånen ligger i en sorterad mängd med utgångstid (Redis-klockan) som poäng.
+_LEASE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now)
+local leased = {}
+local i = 4
+while ARGV[i] and redis.call('ZCARD', KEYS[2]) < limit do
+    local item = redis.call('LPOP', KEYS[1])
+    if not item then
+        break
+    end
+    redis.call('ZADD', KEYS[2], now + ttl, ARGV[i])
+    table.insert(leased, ARGV[i])
+    table.insert(leased, item)
+    i = i + 1
+end
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[3]))
+return leased
+"""
+
+_RENEW_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+return redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[2]), ARGV[1])
+"""
+
+
+def enqueue_items(batch_id: str, people: list):
+    """Lägg batchens objekt i en väntelista; de köas som tasks först när en plats blir ledig."""
+    if not people:
+        return
+    key = _key(batch_id, "queue")
+    pipe = get_redis().pipeline()
+    pipe.rpush(key, *[json.dumps(person, ensure_ascii=False) for person in people])
+    pipe.expire(key, BATCH_TTL)
+    pipe.execute()
+
+
+def lease_next(batch_id: str, limit: int = BATCH_CONCURRENCY, ttl: int = BATCH_LEASE_TTL) -> list:
+    """Låna lediga platser (högst limit samtidigt) och returnera [(lån-id, objekt)] att köa."""
+    ids = [str(uuid.uuid4()) for _ in range(limit)]
+    leased = get_redis().eval(_LEASE_SCRIPT, 2, _key(batch_id, "queue"), _key(batch_id, "leases"),
+                              limit, ttl, BATCH_TTL, *ids)
+    return [(leased[i].decode(), json.loads(leased[i + 1])) for i in range(0, len(leased), 2)]
+
+
+def renew_lease(batch_id: str, lease_id: str, ttl: int = BATCH_LEASE_TTL):
+    """Förläng ett lån när tasken börjar ett nytt försök."""
+    get_redis().eval(_RENEW_SCRIPT, 1, _key(batch_id, "leases"), lease_id, ttl)
+
+
+def release_lease(batch_id: str, lease_id: str):
+    get_redis().zrem(_key(batch_id, "leases"), lease_id)
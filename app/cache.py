@@ -0,0 +1,220 @@
+# app/cache.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import redis
+from dotenv import load_dotenv
+from .config import logger
+from .database import SessionLocal
+from .models import Person
+from .persistence import fingerprint
+from .query import normalize_query, query_hash
+from . import search
+from .redis_client import get_redis
+
+load_dotenv()
+
+# Nivåer som slås upp i ordning: processlokal LRU, Redis, SQL-lagret (exakt söknyckel)
+# och namnsökningen, som hittar samma person trots stavningsvarianter av namnet
+CACHE_TIERS = [t.strip() for t in os.getenv("CACHE_TIERS", "memory,redis,sql,search").split(",") if t.strip()]
+SEARCH_ACCEPT_SCORE = float(os.getenv("SEARCH_ACCEPT_SCORE", "0.9"))
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", "86400"))
+CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("CACHE_STALE_WHILE_REVALIDATE", "604800"))
+CACHE_LRU_SIZE = int(os.getenv("CACHE_LRU_SIZE", "1024"))
+
+REDIS_PREFIX = "scrape:result:"
+
+FRESH = "fresh"
+STALE = "stale"
+
+
+class LRUCache:
+    """Trådsäker LRU med fast maxstorlek."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_lru = LRUCache(CACHE_LRU_SIZE)
+
+
+def freshness(stored_at: float, now: float = None):
+    """Klassa en post som färsk, inaktuell (får serveras medan den förnyas) eller utgången (None)."""
+    age = (now or time.time()) - stored_at
+    if age <= CACHE_MAX_AGE:
+        return FRESH
+    if age <= CACHE_MAX_AGE + CACHE_STALE_WHILE_REVALIDATE:
+        return STALE
+    return None
+
+
+def _lookup_redis(key: str):
+    try:
+        raw = get_redis().get(REDIS_PREFIX + key)
+    except redis.RedisError as e:
+        logger.warning("Redis cache lookup failed: %s", e)
+        return None
+    return json.loads(raw) if raw else None
+
+
+def _store_redis(key: str, entry: dict):
+    try:
+        get_redis().set(REDIS_PREFIX + key, json.dumps(entry, ensure_ascii=False),
+                        ex=CACHE_MAX_AGE + CACHE_STALE_WHILE_REVALIDATE)
+    except redis.RedisError as e:
+        logger.warning("Redis cache store failed: %s", e)
+
+
+def _person_entry(person: Person):
+    # Färskheten räknas från senaste skrapningen, också när den inte ändrade något
+    checked_at = person.checked_at or person.updated_at if person is not None else None
+    if checked_at is None:
+        return None
+    stored_at = (checked_at - datetime(1970, 1, 1)).total_seconds()
+    return {"payload": person.to_dict(), "stored_at": stored_at}
+
+
+def _lookup_sql(first_name: str, last_name: str, city: str):
+    db = SessionLocal()
+    try:
+        person = (
+            db.query(Person)
+            .filter(Person.query_key == normalize_query(first_name, last_name, city))
+            .order_by(Person.updated_at.desc())
+            .first()
+        )
+        return _person_entry(person)
+    finally:
+        db.close()
+
+
+def _lookup_search(first_name: str, last_name: str, city: str):
+    db = SessionLocal()
+    try:
+        hits = search.search(db, f"{first_name} {last_name}", city=city, limit=1,
+                             min_similarity=SEARCH_ACCEPT_SCORE, partial=False)
+        return _person_entry(db.get(Person, hits[0]["id"])) if hits else None
+    finally:
+        db.close()
+
+
+def lookup(first_name: str, last_name: str, city: str):
+    """Slå upp en sökning genom cachenivåerna; returnerar (payload, färskhet) eller (None, None).
+
+    En inaktuell träff avslutar inte sökningen: en lägre nivå kan ha en nyare post som
+    en uppdatering i en annan process skrivit, och den nyaste posten vinner.
+    """
+    key = query_hash(first_name, last_name, city)
+    best, best_tier = None, None
+    for tier in CACHE_TIERS:
+        if tier == "memory":
+            entry = _lru.get(key)
+        elif tier == "redis":
+            entry = _lookup_redis(key)
+        elif tier == "sql":
+            entry = _lookup_sql(first_name, last_name, city)
+        elif tier == "search":
+            entry = _lookup_search(first_name, last_name, city)
+        else:
+            continue
+        if entry is None or freshness(entry["stored_at"]) is None:
+            continue
+        if best is None or entry["stored_at"] > best["stored_at"]:
+            best, best_tier = entry, tier
+        if freshness(best["stored_at"]) == FRESH:
+            break
+    if best is None:
+        return None, None
+
+    state = freshness(best["stored_at"])
+    # Fyll på de snabbare nivåerna ovanför träffen
+    for upper in CACHE_TIERS[:CACHE_TIERS.index(best_tier)]:
+        if upper == "memory":
+            _lru.set(key, best)
+        elif upper == "redis":
+            _store_redis(key, best)
+    logger.info("Cache %s hit in %s tier for query %s.", state, best_tier, key)
+    return best["payload"], state
+
+
+def store(first_name: str, last_name: str, city: str, payload: dict, stored_at: float = None):
+    """Lägg ett nyskrapat resultat i minnes- och Redis-nivåerna."""
+    key = query_hash(first_name, last_name, city)
+    entry = {"payload": payload, "stored_at": stored_at or time.time()}
+    if "memory" in CACHE_TIERS:
+        _lru.set(key, entry)
+    if "redis" in CACHE_TIERS:
+        _store_redis(key, entry)
+
+
+def reference(first_name: str, last_name: str, city: str, payload: dict) -> dict:
+    """Litet taskresultat som pekar ut personen istället för att bära hela posten.
+
+    Fingeravtrycket av posten gör att hydrate bara godtar en cachad post med exakt samma innehåll.
+    """
+    return {"person_id": payload["id"], "query_hash": query_hash(first_name, last_name, city),
+            "fingerprint": _payload_fingerprint(payload)}
+
+
+def _payload_fingerprint(payload: dict) -> str:
+    return fingerprint(payload)[:16]
+
+
+def is_reference(result) -> bool:
+    return isinstance(result, dict) and "person_id" in result and "full_name" not in result
+
+
+def hydrate(result):
+    """Hela PersonOutput-posten för ett taskresultat; referenser slås upp i cachen och sedan i databasen.
+
+    En cachad post används bara om den är den som tasken skrev (samma fingeravtryck); efter
+    en uppdatering kan processens LRU annars ha kvar den tidigare versionen av personen.
+    """
+    if not is_reference(result):
+        return result
+    key, person_id, expected = result.get("query_hash"), result["person_id"], result.get("fingerprint")
+    if key and expected:
+        for tier in CACHE_TIERS:
+            if tier == "memory":
+                entry = _lru.get(key)
+            elif tier == "redis":
+                entry = _lookup_redis(key)
+            else:
+                continue
+            if entry and entry["payload"].get("id") == person_id \
+                    and _payload_fingerprint(entry["payload"]) == expected:
+                return entry["payload"]
+    db = SessionLocal()
+    try:
+        person = db.get(Person, person_id)
+        return person.to_dict() if person else None
+    finally:
+        db.close()
@@ -0,0 +1,135 @@
+# app/celery_app.py
+from celery import Celery
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
+CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
+
+# "monolith": en task gör allt; "pipeline": fetch -> extract -> persist på separata köer
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "monolith")
+
+# Taskresultat: "reference" lagrar bara person-id (API:t hämtar posten ur cache/databas), "full" hela posten
+RESULT_MODE = os.getenv("RESULT_MODE", "reference")
+RESULT_SERIALIZER = os.getenv("RESULT_SERIALIZER", "json")  # "msgpack" ger mindre resultat
+RESULT_COMPRESSION = os.getenv("RESULT_COMPRESSION") or None  # t.ex. "zlib", "bzip2" eller "lzma"
+RESULT_EXPIRES = int(os.getenv("RESULT_EXPIRES", "3600"))  # sekunder innan resultat tas bort ur backend
+
+_COMPRESSORS = {"zlib": "zlib", "bzip2": "bz2", "lzma": "lzma"}
+
+
+def compressed_serializer(serializer: str, compression: str) -> str:
+    """Registrera serializer+komprimering i kombu och returnera namnet.
+
+    Celerys resultatbackends använder inte result_compression, så komprimeringen
+    ligger i serialiseraren istället.
+    """
+    import importlib
+    from kombu import serialization
+
+    name = f"{serializer}+{compression}"
+    if name not in serialization.registry._encoders:
+        codec = importlib.import_module(_COMPRESSORS[compression])
+
+        def encode(obj):
+            _, _, payload = serialization.dumps(obj, serializer=serializer)
+            return codec.compress(payload.encode("utf-8") if isinstance(payload, str) else payload)
+
+        def decode(data):
+            content_type, content_encoding, _ = serialization.registry._encoders[serializer]
+            return serialization.loads(codec.decompress(data), content_type, content_encoding,
+                                       accept=[content_type])
+
+        serialization.register(name, encode, decode, content_type=f"application/x-{name}",
+                               content_encoding="binary")
+    return name
+
+
+celery_app = Celery('tasks', broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND)
+RESULT_FORMAT = compressed_serializer(RESULT_SERIALIZER, RESULT_COMPRESSION) if RESULT_COMPRESSION else RESULT_SERIALIZER
+# Backenden avkodar med sin egen inställning, så API och workers måste ha samma RESULT_SERIALIZER/-COMPRESSION
+celery_app.conf.update(
+    result_serializer=RESULT_FORMAT,
+    result_accept_content=[RESULT_FORMAT],
+    result_expires=RESULT_EXPIRES,
+)
+
+# Tasks refereras med namn så att webbprocessen kan köa dem utan att importera
+# app.tasks (och därmed Selenium, parsers och chromedriver-kontroller)
+SCRAPE_AND_STORE = "app.tasks.scrape_and_store"
+SCRAPE_BATCH_ITEM = "app.tasks.scrape_batch_item"
+FINALIZE_BATCH = "app.tasks.finalize_batch"
+DRIVER_POOL_STATS = "app.tasks.driver_pool_stats"
+PIPELINE_FETCH = "app.tasks.pipeline_fetch"
+PIPELINE_EXTRACT = "app.tasks.pipeline_extract"
+PIPELINE_PERSIST = "app.tasks.pipeline_persist"
+SCRAPE_MANY = "app.tasks.scrape_many"
+# Moduler som bara workern laddar; startup-testet och bench_startup kontrollerar att API:t klarar sig utan dem
+WORKER_ONLY_MODULES = ["selenium", "bs4", "lxml", "httpx", "psutil", "app.scraper", "app.tasks", "app.driver_pool"]
+
+# Varje pipelinesteg har egen kö så att de kan köras av workers med olika poolmodell:
+# fetch (webbläsarbunden, liten prefork-pool), parse (CPU-bunden) och persist (I/O-bunden, trådar)
+QUEUE_DEFAULT = "celery"
+QUEUE_FETCH = "fetch"
+QUEUE_PARSE = "parse"
+QUEUE_PERSIST = "persist"
+# Asynkron hämtning: en process med många sidor i luften (worker med --pool solo)
+QUEUE_ASYNC_FETCH = "fetch_async"
+
+# Batcher: "item" köar en task per person, "async" delar upp batchen i bitar för scrape_many
+BATCH_FETCH_MODE = os.getenv("BATCH_FETCH_MODE", "item")
+ASYNC_BATCH_CHUNK = int(os.getenv("ASYNC_BATCH_CHUNK", "100"))
+
+celery_app.conf.task_routes = {
+    PIPELINE_FETCH: {"queue": QUEUE_FETCH},
+    PIPELINE_EXTRACT: {"queue": QUEUE_PARSE},
+    PIPELINE_PERSIST: {"queue": QUEUE_PERSIST},
+    SCRAPE_MANY: {"queue": QUEUE_ASYNC_FETCH},
+}
+
+
+def pipeline_signature(first_name: str, last_name: str, city: str, task_id: str = None, **kwargs):
+    """Kedjan fetch -> extract -> persist; sista stegets id är pipelinens resultat-id."""
+    from celery import chain
+    from celery.utils import uuid
+
+    task_id = task_id or uuid()
+    return chain(
+        celery_app.signature(PIPELINE_FETCH, args=(first_name, last_name, city),
+                             kwargs={**kwargs, "result_id": task_id}),
+        celery_app.signature(PIPELINE_EXTRACT),
+        celery_app.signature(PIPELINE_PERSIST).set(task_id=task_id),
+    )
+
+
+def send_scrape(first_name: str, last_name: str, city: str, task_id: str = None, **kwargs):
+    """Köa en scrape (monolitisk task eller pipeline beroende på PIPELINE_MODE) och returnera AsyncResult."""
+    if PIPELINE_MODE == "pipeline":
+        return pipeline_signature(first_name, last_name, city, task_id=task_id, **kwargs).apply_async()
+    return celery_app.send_task(SCRAPE_AND_STORE, args=(first_name, last_name, city), kwargs=kwargs, task_id=task_id)
+
+
+def batch_item_signature(batch_id: str, first_name: str, last_name: str, city: str):
+    return celery_app.signature(SCRAPE_BATCH_ITEM, args=(batch_id, first_name, last_name, city))
+
+
+def dispatch_batch_items(batch_id: str) -> int:
+    """Köa batchobjekt för batchens lediga platser; varje avslutat objekt köar nästa."""
+    from . import batch
+
+    leased = batch.lease_next(batch_id)
+    for lease_id, person in leased:
+        batch_item_signature(batch_id, person["first_name"], person["last_name"], person["city"]) \
+            .apply_async(task_id=lease_id)
+    return len(leased)
+
+
+def finalize_batch_signature(batch_id: str):
+    return celery_app.signature(FINALIZE_BATCH, args=(batch_id,), immutable=True)
+
+
+def scrape_many_signature(people: list, batch_id: str = None):
+    """people är en lista med {"first_name", "last_name", "city"}."""
+    return celery_app.signature(SCRAPE_MANY, args=(people,), kwargs={"batch_id": batch_id})
@@ -0,0 +1,4 @@
+# app/celery_worker.py
+# Ingångspunkt för workern (celery -A app.celery_worker.celery_app worker); registrerar tasks
+from .celery_app import celery_app
+from . import tasks  # noqa: F401
@@ -0,0 +1,89 @@
+# app/coalesce.py
+import os
+import uuid
+import redis
+from dotenv import load_dotenv
+from .config import logger
+from .query import query_hash
+from .redis_client import get_redis
+
+load_dotenv()
+
+COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "1") == "1"
+COALESCE_TTL = int(os.getenv("COALESCE_TTL", "600"))
+
+INFLIGHT_PREFIX = "scrape:inflight:"
+COLLAPSED_PREFIX = "scrape:collapsed:"
+COLLAPSED_TOTAL_KEY = "scrape:collapsed:total"
+
+# Ta bara bort nyckeln om den fortfarande pekar på vår task (den kan ha gått ut och tagits av en ny)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1], KEYS[2])
+end
+return 0
+"""
+
+
+def submit(first_name: str, last_name: str, city: str, enqueue) -> dict:
+    """Köa en scrape om ingen identisk redan pågår, annars återanvänd den pågående taskens id.
+
+    enqueue(task_id) anropas bara av den första förfrågan för en normaliserad sökning.
+    """
+    if not COALESCE_ENABLED:
+        task_id = str(uuid.uuid4())
+        enqueue(task_id)
+        return {"task_id": task_id, "coalesced": False, "coalesced_requests": 0}
+
+    key = query_hash(first_name, last_name, city)
+    inflight_key = INFLIGHT_PREFIX + key
+    try:
+        r = get_redis()
+        for _ in range(3):
+            task_id = str(uuid.uuid4())
+            if r.set(inflight_key, task_id, nx=True, ex=COALESCE_TTL):
+                try:
+                    enqueue(task_id)
+                except Exception:
+                    r.delete(inflight_key)
+                    raise
+                return {"task_id": task_id, "coalesced": False, "coalesced_requests": 0}
+
+            existing = r.get(inflight_key)
+            if existing is None:
+                # Nyckeln gick ut mellan SET och GET; försök ta den igen
+                continue
+            pipe = r.pipeline()
+            pipe.incr(COLLAPSED_PREFIX + key)
+            pipe.expire(COLLAPSED_PREFIX + key, COALESCE_TTL)
+            pipe.incr(COLLAPSED_TOTAL_KEY)
+            collapsed, _, _ = pipe.execute()
+            logger.info("Coalesced request for query %s onto task %s (%s collapsed).", key, existing.decode(), collapsed)
+            return {"task_id": existing.decode(), "coalesced": True, "coalesced_requests": collapsed}
+    except redis.RedisError as e:
+        logger.warning("Request coalescing unavailable, enqueuing directly: %s", e)
+
+    task_id = str(uuid.uuid4())
+    enqueue(task_id)
+    return {"task_id": task_id, "coalesced": False, "coalesced_requests": 0}
+
+
+def release(first_name: str, last_name: str, city: str, task_id: str):
+    """Släpp in-flight-nyckeln när tasken är klar så att nästa förfrågan får en ny scrape."""
+    if not COALESCE_ENABLED:
+        return
+    key = query_hash(first_name, last_name, city)
+    try:
+        get_redis().eval(_RELEASE_SCRIPT, 2, INFLIGHT_PREFIX + key, COLLAPSED_PREFIX + key, task_id)
+    except redis.RedisError as e:
+        logger.warning("Failed to release in-flight key for task %s: %s", task_id, e)
+
+
+def collapsed_total():
+    """Totalt antal förfrågningar som slagits ihop med en redan pågående task (None utan Redis)."""
+    try:
+        value = get_redis().get(COLLAPSED_TOTAL_KEY)
+    except redis.RedisError as e:
+        logger.warning("Coalescing stats unavailable: %s", e)
+        return None
+    return int(value) if value else 0
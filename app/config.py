@@ -1,7 +1,14 @@
 # app/config.py
+import atexit
+import contextvars
+import copy
 import logging
+import logging.handlers
 import os
 import json
+import queue
+import threading
+import time
 from sentry_sdk import init as sentry_init
 from sentry_sdk.integrations.logging import LoggingIntegration
 from dotenv import load_dotenv
@@ -9,38 +16,191 @@ from dotenv import load_dotenv
 load_dotenv()
 
 SENTRY_DSN = os.getenv("SENTRY_DSN")  # Lägg till i .env
+# Andel transaktioner som spåras vid låg trafik, och tak för antal spårade per minut vid hög
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0.05"))
+SENTRY_TRACES_PER_MINUTE = float(os.getenv("SENTRY_TRACES_PER_MINUTE", "60"))
+
+# Transaktioner som aldrig spåras (skrapning av mätvärden, SSE-strömmar som lever länge)
+UNTRACED_TRANSACTIONS = ("/metrics", "/task-events/")
+
+# Loggning: "text" eller "json" (en JSON-post per rad), och om posterna skrivs från en bakgrundstråd
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"
+
+# Sammanhang som följer med varje logpost inom en task (task-id, sökningens hash)
+log_context = contextvars.ContextVar("log_context", default={})
+
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def bind_log_context(**fields):
+    """Lägg till fält i loggkontexten; återställ med reset_log_context(token)."""
+    return log_context.set({**log_context.get(), **fields})
+
+
+def reset_log_context(token):
+    log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Kopierar loggkontexten till posten i den anropande tråden, innan den köas."""
+
+    def filter(self, record):
+        for key, value in log_context.get().items():
+            setattr(record, key, value)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """En JSON-post per rad med tid, nivå, logger, meddelande och kontext-/extra-fält."""
+
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Formaterat redan i den loggande tråden (ContextQueueHandler)
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Det vanliga textformatet med kontextfälten sist på raden."""
+
+    def format(self, record):
+        line = super().format(record)
+        context = " ".join(f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        return f"{line} [{context}]" if context else line
+
+
+def make_formatter(fmt: str = None) -> logging.Formatter:
+    if (fmt or LOG_FORMAT) == "json":
+        return JsonFormatter()
+    return TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+class ContextQueueHandler(logging.handlers.QueueHandler):
+    """Köhandler som behåller undantaget skilt från meddelandet.
+
+    Standardens prepare() formaterar in traceback i msg och nollställer exc_info, så att
+    JsonFormatter aldrig ser något undantag. Här slås bara argumenten ihop och undantaget
+    formateras till exc_text i den loggande tråden (traceback-objekten ska inte hållas i kön).
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def make_queue_handler(handler: logging.Handler):
+    """Köhandler som loggarna skrivs till och en startad QueueListener som skriver dem till handler."""
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    queue_handler = ContextQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    return queue_handler, listener
+
+
+_listener = None
+
+
+def stop_logging():
+    """Töm kön och stoppa lyssnartråden."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_listener_after_fork():
+    # Lyssnartråden följer inte med vid fork (prefork-workers); barnet får en egen kö och tråd
+    global _listener
+    if _listener is None:
+        return
+    logger = logging.getLogger("merinfo_scraper")
+    for index, handler in enumerate(logger.handlers):
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.handlers[index], _listener = make_queue_handler(_listener.handlers[0])
+
 
 # Setup logging
 def setup_logging():
+    global _listener
     logger = logging.getLogger("merinfo_scraper")
-    logger.setLevel(logging.INFO)
-
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    logger.setLevel(LOG_LEVEL)
 
     # Create console handler
     ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-    ch.setFormatter(formatter)
+    ch.setLevel(LOG_LEVEL)
+    ch.setFormatter(make_formatter())
 
-    # Add handler to logger
+    # Add handler to logger; med LOG_ASYNC skrivs posterna av en QueueListener-tråd
     if not logger.handlers:
-        logger.addHandler(ch)
+        if LOG_ASYNC:
+            handler, _listener = make_queue_handler(ch)
+            atexit.register(stop_logging)
+            os.register_at_fork(after_in_child=_restart_listener_after_fork)
+        else:
+            handler = ch
+            handler.addFilter(ContextFilter())
+        logger.addHandler(handler)
 
     return logger
 
 logger = setup_logging()
 
-# Load selectors from selectors.json
-selectors_config = {}
-try:
-    with open('app/selectors.json', 'r', encoding='utf-8') as f:
-        selectors_config = json.load(f)
-    logger.info("Selectors loaded successfully.")
-except Exception as e:
-    logger.error(f"Error loading selectors: {e}")
+class AdaptiveTraceSampler:
+    """traces_sampler för Sentry: basandel som sänks när trafiken skulle ge fler spår än taket.
+
+    Andelen räknas om varje minut från förra minutens antal transaktioner.
+    """
+
+    def __init__(self, base_rate: float = SENTRY_TRACES_SAMPLE_RATE,
+                 per_minute: float = SENTRY_TRACES_PER_MINUTE, window: float = 60.0):
+        self.base_rate = base_rate
+        self.per_minute = per_minute
+        self.window = window
+        self.rate = base_rate
+        self._count = 0
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _current_rate(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                per_minute = self._count * 60.0 / (now - self._window_start)
+                expected = per_minute * self.base_rate
+                self.rate = self.base_rate if not self.per_minute or expected <= self.per_minute \
+                    else self.per_minute / per_minute
+                self._count = 0
+                self._window_start = now
+            self._count += 1
+            return self.rate
+
+    def __call__(self, sampling_context: dict) -> float:
+        # Följ beslutet från en uppströms tjänst så att spår inte klipps av
+        parent = sampling_context.get("parent_sampled")
+        if parent is not None:
+            return float(parent)
+        name = (sampling_context.get("transaction_context") or {}).get("name") or ""
+        if any(untraced in name for untraced in UNTRACED_TRANSACTIONS):
+            return 0.0
+        return self._current_rate()
+
 
 # Initialize Sentry
 if SENTRY_DSN:
@@ -51,7 +211,7 @@ if SENTRY_DSN:
     sentry_init(
         dsn=SENTRY_DSN,
         integrations=[sentry_logging],
-        traces_sample_rate=1.0
+        traces_sampler=AdaptiveTraceSampler(),
     )
     logger.info("Sentry initialized.")
 else:
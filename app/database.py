@@ -1,7 +1,8 @@
 # app/database.py
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 import os
 from dotenv import load_dotenv
 
@@ -9,8 +10,95 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./persons.db")
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Postgres: anslutningspool per process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# "transaction": bakom en pooler i transaktionsläge (t.ex. PgBouncer) poolar poolern,
+# så processen håller inga egna anslutningar och använder inga förberedda satser
+DB_POOLER_MODE = os.getenv("DB_POOLER_MODE", "session")
+
+# SQLite: sätts som pragman på varje ny anslutning
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# Skapa tabellerna vid start istället för via Alembic (standard för lokal SQLite)
+DB_AUTO_CREATE = os.getenv("DB_AUTO_CREATE", "1") == "1"
+
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str = DATABASE_URL, is_async: bool = False) -> dict:
+    """Motorinställningar för databasen i url (delas av den synkrona och asynkrona motorn)."""
+    if _is_sqlite(url):
+        return {"connect_args": {"check_same_thread": False}} if not is_async else {}
+    options = {"pool_pre_ping": DB_POOL_PRE_PING}
+    if DB_POOLER_MODE == "transaction":
+        options["poolclass"] = NullPool
+        if is_async:
+            # asyncpg cachar förberedda satser per anslutning, vilket inte fungerar i transaktionsläge
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.close()
+
+
+def make_engine(url: str = DATABASE_URL):
+    engine = create_engine(url, **engine_options(url))
+    if _is_sqlite(url):
+        event.listen(engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Asynkrona URL:er för läs-API:t; drivrutinen laddas först när den asynkrona motorn behövs
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+_async_sessionmaker = None
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+def get_async_sessionmaker():
+    """Sessionsfabrik för den asynkrona motorn, skapad vid första anropet."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        url = async_database_url()
+        async_engine = create_async_engine(url, **engine_options(url, is_async=True))
+        if _is_sqlite(url):
+            event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+        _async_sessionmaker = async_sessionmaker(async_engine, expire_on_commit=False)
+    return _async_sessionmaker
+
+
+async def get_async_db():
+    """FastAPI-beroende som ger en asynkron session per request."""
+    async with get_async_sessionmaker()() as session:
+        yield session
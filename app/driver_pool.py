@@ -0,0 +1,235 @@
+# app/driver_pool.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psutil
+from dotenv import load_dotenv
+from .config import logger
+
+load_dotenv()
+
+# Poolen lever per worker-process och skapas vid Celerys worker_process_init
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "1"))
+DRIVER_POOL_PREWARM = int(os.getenv("DRIVER_POOL_PREWARM", "1"))
+DRIVER_MAX_PAGES = int(os.getenv("DRIVER_MAX_PAGES", "50"))
+DRIVER_IDLE_TIMEOUT = float(os.getenv("DRIVER_IDLE_TIMEOUT", "300"))
+DRIVER_REAP_INTERVAL = float(os.getenv("DRIVER_REAP_INTERVAL", "60"))
+DRIVER_MAX_RSS_MB = float(os.getenv("DRIVER_MAX_RSS_MB", "1024"))
+DRIVER_ACQUIRE_TIMEOUT = float(os.getenv("DRIVER_ACQUIRE_TIMEOUT", "60"))
+
+
+class PooledDriver:
+    """En WebDriver tillsammans med dess livscykeldata."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.pages = 0
+
+    def is_healthy(self) -> bool:
+        """Kontrollera att webbläsarsessionen fortfarande svarar."""
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def rss_mb(self) -> float:
+        """Summera RSS för chromedriver och alla dess Chrome-processer."""
+        try:
+            root = psutil.Process(self.driver.service.process.pid)
+            processes = [root] + root.children(recursive=True)
+        except Exception:
+            return 0.0
+        total = 0
+        for process in processes:
+            try:
+                total += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.warning("Error while quitting driver: %s", e)
+
+
+class DriverPool:
+    """Pool av varma Chrome WebDrivers som återanvänds mellan tasks."""
+
+    def __init__(self, factory, size: int = DRIVER_POOL_SIZE, max_pages: int = DRIVER_MAX_PAGES,
+                 idle_timeout: float = DRIVER_IDLE_TIMEOUT, max_rss_mb: float = DRIVER_MAX_RSS_MB):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.idle_timeout = idle_timeout
+        self.max_rss_mb = max_rss_mb
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._live = 0
+        self._counters = {"hits": 0, "misses": 0, "recycles": 0}
+        self._recycle_reasons = {}
+        self._reaper = None
+        self._reaper_stop = threading.Event()
+
+    def _create(self) -> PooledDriver:
+        pooled = PooledDriver(self.factory())
+        with self._lock:
+            self._live += 1
+        return pooled
+
+    def _recycle(self, pooled: PooledDriver, reason: str):
+        pooled.quit()
+        with self._lock:
+            self._live -= 1
+            self._counters["recycles"] += 1
+            self._recycle_reasons[reason] = self._recycle_reasons.get(reason, 0) + 1
+        logger.info("Recycled driver after %s pages (reason: %s).", pooled.pages, reason)
+
+    def warm(self, count: int = DRIVER_POOL_PREWARM):
+        """Starta drivers i förväg så att första tasken slipper kallstart."""
+        for _ in range(min(count, self.size) - len(self._idle)):
+            pooled = self._create()
+            with self._lock:
+                self._idle.append(pooled)
+        logger.info("Driver pool warmed with %s driver(s).", len(self._idle))
+
+    def acquire(self) -> PooledDriver:
+        if not self._slots.acquire(timeout=DRIVER_ACQUIRE_TIMEOUT):
+            raise RuntimeError("Timed out waiting for a free WebDriver.")
+        try:
+            while True:
+                with self._lock:
+                    pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    break
+                if time.monotonic() - pooled.last_used > self.idle_timeout:
+                    self._recycle(pooled, "idle")
+                elif not pooled.is_healthy():
+                    self._recycle(pooled, "unhealthy")
+                else:
+                    with self._lock:
+                        self._counters["hits"] += 1
+                    return pooled
+
+            with self._lock:
+                self._counters["misses"] += 1
+            return self._create()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, pooled: PooledDriver, failed: bool = False):
+        try:
+            pooled.pages += 1
+            pooled.last_used = time.monotonic()
+            if failed and not pooled.is_healthy():
+                self._recycle(pooled, "crash")
+            elif pooled.pages >= self.max_pages:
+                self._recycle(pooled, "max_pages")
+            elif self.max_rss_mb and pooled.rss_mb() > self.max_rss_mb:
+                self._recycle(pooled, "memory")
+            else:
+                with self._lock:
+                    self._idle.append(pooled)
+        finally:
+            self._slots.release()
+
+    def reap_idle(self) -> int:
+        """Stäng drivers som legat oanvända längre än idle_timeout."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [p for p in self._idle if now - p.last_used > self.idle_timeout]
+            self._idle = [p for p in self._idle if p not in expired]
+        for pooled in expired:
+            self._recycle(pooled, "idle")
+        return len(expired)
+
+    def start_reaper(self, interval: float = DRIVER_REAP_INTERVAL):
+        """Kör reap_idle periodiskt så att en tyst worker inte håller kvar Chrome."""
+        if interval <= 0 or self._reaper is not None:
+            return
+
+        def run():
+            while not self._reaper_stop.wait(interval):
+                try:
+                    self.reap_idle()
+                except Exception as e:
+                    logger.warning("Idle driver reaper failed: %s", e)
+
+        self._reaper = threading.Thread(target=run, name="driver-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    @contextmanager
+    def driver(self):
+        """Låna en driver för en sidladdning och lämna tillbaka den efteråt."""
+        pooled = self.acquire()
+        try:
+            yield pooled.driver
+        except Exception:
+            self.release(pooled, failed=True)
+            raise
+        else:
+            self.release(pooled)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "recycle_reasons": dict(self._recycle_reasons),
+                "idle": len(self._idle),
+                "live": self._live,
+                "size": self.size,
+            }
+
+    def close(self):
+        self._reaper_stop.set()
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+        for pooled in idle:
+            pooled.quit()
+        logger.info("Driver pool closed.")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(factory=None, warm: bool = True) -> DriverPool:
+    """Skapa processens driverpool (anropas från worker_process_init)."""
+    global _pool
+    if factory is None:
+        from .scraper import init_driver
+        factory = init_driver
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool(factory)
+            _pool.start_reaper()
+    if warm:
+        try:
+            _pool.warm()
+        except Exception as e:
+            logger.error("Failed to warm driver pool: %s", e)
+    return _pool
+
+
+def get_pool() -> DriverPool:
+    """Returnera processens pool, och skapa den om workern inte körde init (t.ex. solo-pool)."""
+    if _pool is None:
+        return init_pool(warm=False)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
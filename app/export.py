@@ -0,0 +1,180 @@
+# app/export.py
+"""Strömmande export av lagrade personer med barnrader som NDJSON, CSV eller Parquet.
+
+Användning: python -m app.export [--format ndjson|csv|parquet] [--since 2024-01-01T00:00:00] [--output FIL]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from sqlalchemy import func, select
+from sqlalchemy.orm import selectinload
+from .config import logger
+from .database import SessionLocal
+from .models import Person
+from .persistence import CHILD_SETS, PERSON_FIELDS
+
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+CSV_COLUMNS = ["id", *PERSON_FIELDS, "updated_at", *[key for _, key, _ in CHILD_SETS]]
+
+
+def export_watermark(db, since: datetime = None):
+    """Senaste updated_at bland raderna som exporteras; blir --since för nästa inkrementella export."""
+    stmt = select(func.max(Person.updated_at))
+    if since is not None:
+        stmt = stmt.where(Person.updated_at > since)
+    return db.execute(stmt).scalar()
+
+
+def _row(person: Person) -> dict:
+    row = {"id": person.id, **{field: getattr(person, field) for field in PERSON_FIELDS}}
+    row["updated_at"] = person.updated_at.isoformat() if person.updated_at else None
+    for _, key, columns in CHILD_SETS:
+        row[key] = [{column: getattr(child, column) for column in columns} for child in getattr(person, key)]
+    return row
+
+
+def iter_chunks(db, since: datetime = None, until: datetime = None, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Personer i (updated_at, id)-ordning, chunk för chunk, utan att hela resultatet läses in.
+
+    yield_per strömmar raderna från en serverside-markör och selectinload hämtar
+    barnraderna med en fråga per samling och chunk.
+    """
+    stmt = (
+        select(Person)
+        .options(*[selectinload(getattr(Person, key)) for _, key, _ in CHILD_SETS])
+        .order_by(Person.updated_at, Person.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    if since is not None:
+        stmt = stmt.where(Person.updated_at > since)
+    if until is not None:
+        stmt = stmt.where(Person.updated_at <= until)
+    for partition in db.execute(stmt).scalars().partitions():
+        # Identitetskartan håller svaga referenser, så chunkens objekt släpps när den är skriven
+        yield [_row(person) for person in partition]
+
+
+def _ndjson(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows).encode("utf-8")
+
+
+def _csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for rows in chunks:
+        for row in rows:
+            # Barnsamlingarna skrivs som JSON i var sin kolumn
+            writer.writerow({**row, **{key: json.dumps(row[key], ensure_ascii=False) for _, key, _ in CHILD_SETS}})
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    fields = [pa.field("id", pa.int64())]
+    fields += [pa.field(field, pa.string()) for field in PERSON_FIELDS]
+    fields.append(pa.field("updated_at", pa.string()))
+    for _, key, columns in CHILD_SETS:
+        fields.append(pa.field(key, pa.list_(pa.struct([pa.field(column, pa.string()) for column in columns]))))
+    return pa.schema(fields)
+
+
+class _Drain(io.RawIOBase):
+    """Skrivbar ström som samlar byte tills de hämtas, så att Parquet kan skickas i delar."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _parquet(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    sink = _Drain()
+    # En radgrupp per chunk; filfoten skrivs när skrivaren stängs
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd") as writer:
+        for rows in chunks:
+            writer.write_batch(pa.RecordBatch.from_pylist(rows, schema=schema))
+            data = sink.take()
+            if data:
+                yield data
+    yield sink.take()
+
+
+_WRITERS = {"ndjson": _ndjson, "csv": _csv, "parquet": _parquet}
+
+
+def stream_export(fmt: str = "ndjson", since: datetime = None, until: datetime = None,
+                  chunk_size: int = EXPORT_CHUNK_SIZE, db=None):
+    """Exportera som en generator av byte; sessionen stängs när generatorn tar slut."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    own_session = db is None
+    db = db or SessionLocal()
+    try:
+        yield from _WRITERS[fmt](iter_chunks(db, since, until, chunk_size))
+    finally:
+        if own_session:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exportera lagrade personer med barnrader.")
+    parser.add_argument("--format", choices=sorted(_WRITERS), default="ndjson")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="Bara personer uppdaterade efter denna tidpunkt (ISO 8601), t.ex. förra exportens vattenmärke.")
+    parser.add_argument("--output", default=None, help="Utfil (standard: stdout).")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        watermark = export_watermark(db, args.since)
+    finally:
+        db.close()
+    if watermark is None:
+        logger.info("Nothing to export.")
+        return
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for data in stream_export(args.format, args.since, watermark, args.chunk_size):
+            out.write(data)
+    finally:
+        if args.output:
+            out.close()
+    # Vattenmärket på stderr så att stdout kan pipas vidare
+    print(f"watermark={watermark.isoformat()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
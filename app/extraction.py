@@ -0,0 +1,200 @@
+# app/extraction.py
+import re
+import lxml.etree
+import lxml.html
+from .config import logger
+from . import selector_registry
+
+# Fält som extraheras: (utdatafält, nyckel i selectors.json, hur värdet tas fram)
+FIELDS = [
+    ("full_name", "person_name", "text"),
+    ("age", "person_age", "age"),
+    ("city", "person_city", "text"),
+    ("address", "person_address", "strings"),
+    ("phone_number", "phone_number", "text"),
+    ("birthday", "birthday_indicator", "birthday"),
+]
+
+_SELECTOR_RE = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:\.[\w-]+|\[[^\]]+\])*)$")
+_PART_RE = re.compile(r"\.([\w-]+)|\[([^\]]+)\]")
+_ATTR_RE = re.compile(
+    r"""^\s*([\w-]+)\s*(?:([~^$*]?=)\s*(?:'([^']*)'|"([^"]*)"|([^\s'"]+)))?\s*$"""
+)
+
+
+def _attr_test(name: str, op: str, value: str):
+    if op is None:
+        return lambda el: el.get(name) is not None
+    if op == "=":
+        return lambda el: el.get(name) == value
+    if op == "^=":
+        return lambda el: value != "" and (el.get(name) or "").startswith(value)
+    if op == "$=":
+        return lambda el: value != "" and (el.get(name) or "").endswith(value)
+    if op == "*=":
+        return lambda el: value != "" and value in (el.get(name) or "")
+    return lambda el: value in (el.get(name) or "").split()
+
+
+def compile_selector(selector: str):
+    """Kompilera en enkel CSS-selektor (tagg, .klass, [attr]) till ett predikat för lxml-element."""
+    match = _SELECTOR_RE.match(selector.strip()) if selector else None
+    if not match:
+        raise ValueError(f"Unsupported selector for compiled extraction: {selector!r}")
+
+    tag = match.group("tag")
+    tests = []
+    if tag and tag != "*":
+        tag = tag.lower()
+        tests.append(lambda el: el.tag == tag)
+    for class_name, attr in _PART_RE.findall(match.group("rest")):
+        if class_name:
+            tests.append(lambda el, c=class_name: c in (el.get("class") or "").split())
+            continue
+        attr_match = _ATTR_RE.match(attr)
+        if not attr_match:
+            raise ValueError(f"Unsupported attribute selector: [{attr}]")
+        name, op, *values = attr_match.groups()
+        value = next((v for v in values if v is not None), None)
+        tests.append(_attr_test(name.lower(), op, value))
+
+    return lambda el: all(test(el) for test in tests)
+
+
+# Element vars text BeautifulSoup inte räknar som sidtext
+_NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+def _strings(el):
+    """Textnoder under ett element, i dokumentordning (motsvarar BeautifulSoups _all_strings).
+
+    Text i script/style/template och kommentarer hoppas över; deras svans hör till föräldern.
+    """
+    if not isinstance(el.tag, str) or el.tag in _NON_TEXT_TAGS:
+        return
+    if el.text:
+        yield el.text
+    for child in el:
+        yield from _strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _text(el) -> str:
+    return "".join(_strings(el))
+
+
+def _soup_string(el):
+    """Motsvarighet till BeautifulSoups Tag.string: texten om elementet har exakt ett barn."""
+    children = list(el)
+    if not children:
+        return el.text
+    if len(children) == 1 and not el.text and not children[0].tail and isinstance(children[0].tag, str):
+        return _soup_string(children[0])
+    return None
+
+
+def _value_text(el):
+    return _text(el).strip()
+
+
+def _value_age(el):
+    text = _text(el)
+    if 'år' not in text.lower():
+        return None
+    return text.strip().split(' ')[0]
+
+
+def _value_strings(el):
+    return " ".join(s.strip() for s in _strings(el) if s.strip())
+
+
+def _value_birthday(el):
+    string = _soup_string(el)
+    if not (string and 'fyller' in string.lower()):
+        return None
+    return _text(el.getparent()).strip()
+
+
+_VALUE_FUNCS = {
+    "text": _value_text,
+    "age": _value_age,
+    "strings": _value_strings,
+    "birthday": _value_birthday,
+}
+
+# Fält som bara söker första träffen; övriga fortsätter tills värdefunktionen ger ett värde
+_FIRST_MATCH_KINDS = {"text", "strings"}
+
+
+class ExtractionPlan:
+    """Förkompilerade selektorer som samlar alla fält i en enda genomgång av dokumentet."""
+
+    def __init__(self, selectors: dict):
+        self.fields = []
+        for field, key, kind in FIELDS:
+            selector = selectors.get(key)
+            matcher = compile_selector(selector) if selector else None
+            self.fields.append((field, matcher, _VALUE_FUNCS[kind], kind in _FIRST_MATCH_KINDS))
+
+    def extract(self, page_source: str) -> dict:
+        data = {field: None for field, _, _, _ in self.fields}
+        pending = [f for f in self.fields if f[1] is not None]
+        if not pending:
+            return data
+
+        try:
+            try:
+                root = lxml.html.document_fromstring(page_source)
+            except ValueError:
+                # lxml vägrar str med XML-kodningsdeklaration
+                root = lxml.html.document_fromstring(page_source.encode("utf-8"))
+        except lxml.etree.ParserError:
+            # Tom sida (eller bara blanktecken): inga fält, som med bs4
+            return data
+
+        for el in root.iter():
+            if not isinstance(el.tag, str):
+                continue
+            for entry in pending:
+                field, matcher, value_func, first_match = entry
+                if not matcher(el):
+                    continue
+                value = value_func(el)
+                if value is not None or first_match:
+                    data[field] = value
+                    pending = [f for f in pending if f is not entry]
+            if not pending:
+                break
+
+        return data
+
+
+# Kompilerade planer per selektorversion, så att en omladdning inte kompilerar om per sida
+_plans = {}
+_MAX_PLANS = 4
+
+
+def get_plan(selector_set=None):
+    """Extraktionsplanen för aktuell (eller given) selektorversion, eller None om den kräver bs4."""
+    selector_set = selector_set or selector_registry.current()
+    if selector_set.version not in _plans:
+        try:
+            plan = ExtractionPlan(selector_set.selectors)
+            logger.info("Compiled extraction plan with %s fields for selectors %s.", len(plan.fields), selector_set.version)
+        except ValueError as e:
+            # Giltig CSS som den kompilerade motorn inte stöder; extract_page tar bs4-vägen
+            logger.warning("Selectors %s not supported by compiled extraction: %s", selector_set.version, e)
+            plan = None
+        if len(_plans) >= _MAX_PLANS:
+            _plans.pop(next(iter(_plans)))
+        _plans[selector_set.version] = plan
+    return _plans[selector_set.version]
+
+
+def extract(page_source: str, selector_set=None) -> dict:
+    """Extrahera persondata ur sidkällan med den kompilerade planen."""
+    plan = get_plan(selector_set)
+    if plan is None:
+        raise ValueError("Current selectors are not supported by compiled extraction.")
+    return plan.extract(page_source)
@@ -0,0 +1,52 @@
+# app/listing.py
+import base64
+import json
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from .models import Person
+
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 500
+
+# Barnsamlingarna laddas med en extra fråga per samling för hela sidan, inte per person
+_CHILDREN = (selectinload(Person.cohabitants), selectinload(Person.vehicles), selectinload(Person.companies))
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Avkoda en markör från encode_cursor; ValueError om den är ogiltig."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+async def list_persons(db: AsyncSession, city: str = None, age: str = None,
+                       limit: int = LIST_DEFAULT_LIMIT, cursor: str = None) -> dict:
+    """En sida personer i id-ordning med keyset-paginering.
+
+    Sidan hämtas med WHERE id > markör istället för OFFSET, så kostnaden är densamma
+    oavsett hur långt in i tabellen man bläddrat; filtren täcks av (city/age, id)-indexen.
+    """
+    stmt = select(Person).options(*_CHILDREN).order_by(Person.id).limit(limit + 1)
+    if city is not None:
+        stmt = stmt.where(Person.city == city)
+    if age is not None:
+        stmt = stmt.where(Person.age == age)
+    if cursor:
+        stmt = stmt.where(Person.id > decode_cursor(cursor))
+
+    persons = list((await db.execute(stmt)).scalars())
+    next_cursor = encode_cursor(persons[limit - 1].id) if len(persons) > limit else None
+    return {"items": persons[:limit], "next_cursor": next_cursor}
+
+
+async def get_person(db: AsyncSession, person_id: int):
+    stmt = select(Person).options(*_CHILDREN).where(Person.id == person_id)
+    return (await db.execute(stmt)).scalar_one_or_none()
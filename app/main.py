@@ -1,14 +1,30 @@
 # app/main.py
-from fastapi import FastAPI, HTTPException
-from .schemas import PersonInput, PersonOutput
-from .tasks import scrape_and_store
+from datetime import datetime
+from typing import Optional, Union
+from celery import chord
+from fastapi import Depends, FastAPI, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from .schemas import PersonInput, PersonOutput, PersonPage, SearchResult, TaskStatus, BatchInput, BatchStatus
+from .celery_app import (
+    celery_app, send_scrape, dispatch_batch_items, finalize_batch_signature, scrape_many_signature,
+    BATCH_FETCH_MODE, ASYNC_BATCH_CHUNK,
+)
 from .config import logger
+from . import coalesce, cache, batch, listing, export, search, metrics
+from .task_events import TaskEventHub, stream_task_events
 import os
-from .database import SessionLocal, Base, engine
+from .database import SessionLocal, Base, engine, get_async_db, DB_AUTO_CREATE
+from .models import Person
 from fastapi.middleware.cors import CORSMiddleware
 
-# Skapa databastabellerna vid start
-Base.metadata.create_all(bind=engine)
+# Skapa databastabellerna vid start, om schemat inte hanteras med Alembic (DB_AUTO_CREATE=0)
+if DB_AUTO_CREATE:
+    Base.metadata.create_all(bind=engine)
+    # create_all lägger inte till nya index på befintliga tabeller
+    for index in Person.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
 
 app = FastAPI(
     title="Merinfo Scraper API",
@@ -23,6 +39,9 @@ origins = [
     # Lägg till fler ursprung om det behövs
 ]
 
+# En delad Redis pub/sub-anslutning per process för alla väntande SSE-klienter
+task_event_hub = TaskEventHub()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -31,17 +50,136 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/scrape-person/", response_model=PersonOutput)
-def scrape_person(person: PersonInput):
-    logger.info(f"Received request to scrape person: {person.first_name} {person.last_name} in {person.city}")
-    task = scrape_and_store.delay(person.first_name, person.last_name, person.city)
-    logger.info(f"Task {task.id} started for scraping.")
-    return {"id": task.id, "message": "Scraping in progress. Use task ID to retrieve results."}
+@app.post("/scrape-person/", response_model=Union[PersonOutput, TaskStatus])
+def scrape_person(person: PersonInput, response: Response):
+    logger.info("Received request to scrape person: %s %s in %s", person.first_name, person.last_name, person.city)
+
+    # Färska cacheträffar besvaras direkt utan att någon task köas
+    cached, state = cache.lookup(person.first_name, person.last_name, person.city)
+    if state == cache.FRESH:
+        response.headers["X-Cache"] = "fresh"
+        return cached
+
+    # Identiska pågående sökningar slås ihop till en och samma task
+    status = coalesce.submit(
+        person.first_name, person.last_name, person.city,
+        lambda task_id: send_scrape(
+            person.first_name, person.last_name, person.city,
+            task_id=task_id, refresh=state == cache.STALE,
+        ),
+    )
+    if not status["coalesced"]:
+        logger.info("Task %s started for scraping.", status['task_id'])
+
+    # Inaktuella träffar serveras direkt medan en uppdatering körs i bakgrunden
+    if state == cache.STALE:
+        response.headers["X-Cache"] = "stale"
+        response.headers["X-Refresh-Task-Id"] = status["task_id"]
+        return cached
+
+    response.headers["X-Cache"] = "miss"
+    return {**status, "message": "Scraping in progress. Use task ID to retrieve results."}
+
+@app.post("/scrape-batch/", response_model=BatchStatus)
+def scrape_batch(request: BatchInput):
+    if len(request.people) > batch.BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {batch.BATCH_MAX_SIZE} people.")
+    unique = batch.dedupe(request.people)
+    batch_id = batch.create_batch(len(unique), len(request.people) - len(unique))
+
+    people = [p.dict() for p in unique]
+    if not people:
+        batch.mark_complete(batch_id)
+    elif BATCH_FETCH_MODE == "async":
+        # En chord med en task per bit; finalize_batch markerar batchen klar när alla är färdiga
+        header = [scrape_many_signature(people[i:i + ASYNC_BATCH_CHUNK], batch_id)
+                  for i in range(0, len(people), ASYNC_BATCH_CHUNK)]
+        chord(header)(finalize_batch_signature(batch_id))
+    else:
+        # Objekten väntar i Redis och köas allteftersom batchens platser blir lediga
+        batch.enqueue_items(batch_id, people)
+        dispatch_batch_items(batch_id)
+    logger.info("Batch %s started with %s people (%s duplicates).", batch_id, len(unique), len(request.people) - len(unique))
+    return batch.progress(batch_id)
+
+@app.get("/scrape-batch/{batch_id}", response_model=BatchStatus)
+def get_batch_status(batch_id: str):
+    status = batch.progress(batch_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return status
+
+@app.get("/scrape-batch/{batch_id}/results")
+def get_batch_results(batch_id: str):
+    if batch.progress(batch_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found.")
+    return StreamingResponse(batch.iter_results(batch_id), media_type="application/x-ndjson")
+
+@app.get("/coalescing-stats/")
+def coalescing_stats():
+    return {"collapsed_total": coalesce.collapsed_total()}
+
+@app.get("/persons", response_model=PersonPage)
+async def list_persons(
+    city: Optional[str] = None,
+    age: Optional[str] = None,
+    limit: int = Query(listing.LIST_DEFAULT_LIMIT, ge=1, le=listing.LIST_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Lagrade personer i id-ordning; skicka next_cursor som cursor för nästa sida."""
+    try:
+        return await listing.list_persons(db, city=city, age=age, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Deklareras före /persons/{person_id} så att "search" inte tolkas som ett id
+@app.get("/persons/search", response_model=SearchResult)
+def search_persons(
+    q: str = Query(..., min_length=1),
+    city: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Namnsökning som tål skiftläge, å/ä/ö, bindestreck och mindre stavfel."""
+    db = SessionLocal()
+    try:
+        return {"query": search.fold(q), "items": search.search(db, q, city=city, limit=limit)}
+    finally:
+        db.close()
+
+@app.get("/persons/{person_id}", response_model=PersonOutput)
+async def get_person(person_id: int, db: AsyncSession = Depends(get_async_db)):
+    person = await listing.get_person(db, person_id)
+    if person is None:
+        raise HTTPException(status_code=404, detail="Person not found.")
+    return person
+
+@app.get("/export")
+def export_persons(format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$"), since: Optional[datetime] = None):
+    """Strömmande export av personer med barnrader; X-Export-Watermark är nästa anrops since."""
+    db = SessionLocal()
+    try:
+        watermark = export.export_watermark(db, since)
+    finally:
+        db.close()
+    headers = {"Content-Disposition": f'attachment; filename="persons.{format}"'}
+    if watermark is not None:
+        headers["X-Export-Watermark"] = watermark.isoformat()
+    return StreamingResponse(
+        export.stream_export(format, since=since, until=watermark),
+        media_type=export.FORMATS[format],
+        headers=headers,
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    content, content_type = metrics.render()
+    return Response(content=content, media_type=content_type)
 
 @app.get("/task-result/{task_id}", response_model=PersonOutput)
 def get_task_result(task_id: str):
-    from celery.result import AsyncResult
-    task = AsyncResult(task_id)
+    # Med appen explicit: i trådpoolen är Celerys current_app standardappen, med annan serializer
+    task = celery_app.AsyncResult(task_id)
     if task.state == 'PENDING':
         # Jobben har inte körts ännu
         raise HTTPException(status_code=202, detail="Task is still processing.")
@@ -49,6 +187,42 @@ def get_task_result(task_id: str):
         # Tasken misslyckades
         raise HTTPException(status_code=500, detail=str(task.info))
     elif task.state == 'SUCCESS':
-        return task.result
+        # Med RESULT_MODE=reference innehåller backenden bara person-id; posten hämtas ur cache/databas
+        person = cache.hydrate(task.result)
+        if person is None:
+            raise HTTPException(status_code=404, detail="Person no longer stored.")
+        return person
     else:
-        raise HTTPException(status_code=400, detail="Unknown task state.")
\ No newline at end of file
+        raise HTTPException(status_code=400, detail="Unknown task state.")
+
+def _task_state_event(task_id: str) -> dict:
+    # Med appen explicit: i trådpoolen är Celerys current_app standardappen, med annan serializer
+    task = celery_app.AsyncResult(task_id)
+    event = {"task_id": task_id, "state": task.state}
+    if task.state == 'SUCCESS':
+        event["result"] = cache.hydrate(task.result)
+    elif task.state == 'FAILURE':
+        event["error"] = str(task.info)
+    return event
+
+async def _current_task_state(task_id: str) -> dict:
+    return await run_in_threadpool(_task_state_event, task_id)
+
+async def _resolve_task_event(event: dict) -> dict:
+    # Workern publicerar samma referens som den lagrar; klienten får hela posten
+    if cache.is_reference(event.get("result")):
+        event["result"] = await run_in_threadpool(cache.hydrate, event["result"])
+    return event
+
+@app.get("/task-events/{task_id}")
+async def task_events(task_id: str):
+    """Server-Sent Events med taskens tillstånd (PENDING, STARTED, RETRY, SUCCESS/FAILURE)."""
+    return StreamingResponse(
+        stream_task_events(task_event_hub, task_id, _current_task_state, _resolve_task_event),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.on_event("shutdown")
+async def close_task_event_hub():
+    await task_event_hub.close()
\ No newline at end of file
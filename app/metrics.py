@@ -0,0 +1,132 @@
+# app/metrics.py
+"""Prometheus-mätvärden för API:t och Celery-workern.
+
+Prefork-workers skriver sina värden till PROMETHEUS_MULTIPROC_DIR och huvudprocessen
+aggregerar dem när /metrics läses. Kö-djup och antal Chrome-processer mäts vid läsningen.
+"""
+import os
+import shutil
+
+from dotenv import load_dotenv
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST,
+)
+from prometheus_client.core import GaugeMetricFamily
+from .config import logger
+
+load_dotenv()
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))  # workerns /metrics-port
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_QUEUES = [q.strip() for q in os.getenv("METRICS_QUEUES", "celery,fetch,parse,persist,fetch_async").split(",") if q.strip()]
+
+# Katalogen måste finnas innan de första mätvärdena skapas nedan
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+# Sidladdningar tar sekunder; databas och extraktion millisekunder
+_BROWSER_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60)
+_FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+DRIVER_STARTUP = Histogram("scraper_driver_startup_seconds", "Time to start a Chrome WebDriver.",
+                           buckets=_BROWSER_BUCKETS)
+DRIVER_GET = Histogram("scraper_driver_get_seconds", "Time spent in driver.get().", buckets=_BROWSER_BUCKETS)
+DRIVER_WAIT = Histogram("scraper_driver_wait_seconds", "Time spent waiting for merinfo-content.",
+                        buckets=_BROWSER_BUCKETS)
+EXTRACT = Histogram("scraper_extract_seconds", "Time to parse and extract a page.", ["engine"],
+                    buckets=_FAST_BUCKETS)
+FIELD_MISSES = Counter("scraper_field_misses_total", "Extracted pages where a field had no value.", ["field"])
+PERSIST = Histogram("scraper_persist_seconds", "Time to store a person in the database.", buckets=_FAST_BUCKETS)
+TASK_OUTCOMES = Counter("scraper_task_outcomes_total", "Finished Celery tasks by outcome.", ["task", "outcome"])
+TASK_RETRIES = Counter("scraper_task_retries_total", "Celery task retries.", ["task"])
+
+
+def live_chrome_processes(root_pid: int = None) -> int:
+    """Antal chrome/chromedriver-processer under en process (standard: den aktuella)."""
+    # Importeras här så att API-processen inte laddar psutil vid start
+    import psutil
+
+    try:
+        children = psutil.Process(root_pid).children(recursive=True)
+    except psutil.Error:
+        return 0
+    count = 0
+    for child in children:
+        try:
+            if "chrome" in child.name().lower():
+                count += 1
+        except psutil.Error:
+            continue
+    return count
+
+
+class RuntimeCollector:
+    """Mäter kö-djup i brokern och levande Chrome-processer när /metrics läses."""
+
+    def __init__(self, queues=None):
+        self.queues = METRICS_QUEUES if queues is None else queues
+
+    def describe(self):
+        # Namnen räcker vid registreringen; då ska inte Redis frågas
+        yield GaugeMetricFamily("scraper_queue_depth", "Messages waiting in a Celery queue.", labels=["queue"])
+        yield GaugeMetricFamily("scraper_live_chrome_processes", "Chrome processes under this process.")
+
+    def collect(self):
+        depth = GaugeMetricFamily("scraper_queue_depth", "Messages waiting in a Celery queue.", labels=["queue"])
+        try:
+            from .redis_client import get_redis
+            pipe = get_redis().pipeline()
+            for queue in self.queues:
+                pipe.llen(queue)
+            for queue, length in zip(self.queues, pipe.execute()):
+                depth.add_metric([queue], length)
+        except Exception as e:
+            logger.warning("Queue depth unavailable: %s", e)
+        yield depth
+        yield GaugeMetricFamily("scraper_live_chrome_processes", "Chrome processes under this process.",
+                                value=live_chrome_processes())
+
+
+def build_registry() -> CollectorRegistry:
+    """Registret som exponeras: multiprocess-aggregat om katalogen är satt, annars processens eget."""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    registry.register(RuntimeCollector())
+    return registry
+
+
+_registry = None
+
+
+def render():
+    """(innehåll, content-type) för ett /metrics-svar."""
+    global _registry
+    if _registry is None:
+        _registry = build_registry()
+    return generate_latest(_registry), CONTENT_TYPE_LATEST
+
+
+def reset_multiprocess_dir():
+    """Töm multiprocess-katalogen vid workerstart så att döda processers värden inte ligger kvar."""
+    if MULTIPROC_DIR and os.path.isdir(MULTIPROC_DIR):
+        for name in os.listdir(MULTIPROC_DIR):
+            path = os.path.join(MULTIPROC_DIR, name)
+            shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+
+
+def start_worker_server(port: int = METRICS_PORT):
+    from prometheus_client import start_http_server
+    global _registry
+    _registry = _registry or build_registry()
+    start_http_server(port, registry=_registry)
+    logger.info("Worker metrics served on port %s.", port)
+
+
+def mark_process_dead(pid: int):
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
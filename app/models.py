@@ -1,5 +1,6 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -15,17 +16,48 @@ class Person(Base):
     birthday = Column(String)
     national_id = Column(String)
     marital_status = Column(String)
+    query_key = Column(String, index=True)  # Normaliserad sökning som senast gav personen
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    checked_at = Column(DateTime)  # Senaste skrapningen, även när inget ändrades; cachens färskhet
+    fingerprint = Column(String(64))  # Hash av normaliserad data inkl. barnrader, för ändringsdetektering
+    selector_version = Column(String(12))  # Selektorversionen som senaste extraktionen gjordes med
     cohabitants = relationship("Cohabitant", back_populates="person", cascade="all, delete")
     vehicles = relationship("Vehicle", back_populates="person", cascade="all, delete")
     companies = relationship("CompanyEngagement", back_populates="person", cascade="all, delete")
 
+    # Sammansatta index för keyset-paginering (filter, id) i GET /persons
+    __table_args__ = (
+        Index("ix_persons_city_id", "city", "id"),
+        Index("ix_persons_age_id", "age", "id"),
+        Index("ix_persons_city_age_id", "city", "age", "id"),
+        # Inkrementell export i (updated_at, id)-ordning
+        Index("ix_persons_updated_at_id", "updated_at", "id"),
+    )
+
+    def to_dict(self) -> dict:
+        """Personen och dess relationer i samma form som PersonOutput."""
+        return {
+            "id": self.id,
+            "full_name": self.full_name,
+            "age": self.age,
+            "city": self.city,
+            "address": self.address,
+            "phone_number": self.phone_number,
+            "birthday": self.birthday,
+            "national_id": self.national_id,
+            "marital_status": self.marital_status,
+            "cohabitants": [{"name": co.name, "age": co.age} for co in self.cohabitants],
+            "vehicles": [{"make_model": veh.make_model, "model_year": veh.model_year, "owner": veh.owner, "registration": veh.registration} for veh in self.vehicles],
+            "companies": [{"company_name": comp.company_name, "position": comp.position, "company_url": comp.company_url} for comp in self.companies]
+        }
+
 class Cohabitant(Base):
     __tablename__ = "cohabitants"
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     age = Column(String)
-    person_id = Column(Integer, ForeignKey('persons.id'))
+    person_id = Column(Integer, ForeignKey('persons.id'), index=True)
     person = relationship("Person", back_populates="cohabitants")
 
 class Vehicle(Base):
@@ -36,7 +68,7 @@ class Vehicle(Base):
     model_year = Column(String)
     owner = Column(String)
     registration = Column(String)
-    person_id = Column(Integer, ForeignKey('persons.id'))
+    person_id = Column(Integer, ForeignKey('persons.id'), index=True)
     person = relationship("Person", back_populates="vehicles")
 
 class CompanyEngagement(Base):
@@ -46,5 +78,14 @@ class CompanyEngagement(Base):
     company_name = Column(String, nullable=False)
     position = Column(String)
     company_url = Column(String)
-    person_id = Column(Integer, ForeignKey('persons.id'))
-    person = relationship("Person", back_populates="companies")
\ No newline at end of file
+    person_id = Column(Integer, ForeignKey('persons.id'), index=True)
+    person = relationship("Person", back_populates="companies")
+
+class PageSnapshot(Base):
+    __tablename__ = "page_archive"
+
+    id = Column(Integer, primary_key=True, index=True)
+    page_hash = Column(String(64), nullable=False, index=True)  # sha256 av rå sidkälla, nyckel i arkivet
+    query_key = Column(String, index=True)
+    person_id = Column(Integer, ForeignKey('persons.id'), index=True)
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,171 @@
+# app/persistence.py
+import hashlib
+import json
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal_column, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from .models import Person, Cohabitant, Vehicle, CompanyEngagement, PageSnapshot
+from .search import index_person
+
+PERSON_FIELDS = ("full_name", "age", "city", "address", "phone_number", "birthday", "national_id", "marital_status")
+
+# Barntabell, nyckel i skrapad data och kolumner som sparas/returneras
+CHILD_SETS = (
+    (Cohabitant, "cohabitants", ("name", "age")),
+    (Vehicle, "vehicles", ("make_model", "model_year", "owner", "registration")),
+    (CompanyEngagement, "companies", ("company_name", "position", "company_url")),
+)
+
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _person_values(data: dict, query_key: str = None) -> dict:
+    values = {field: data.get(field) for field in PERSON_FIELDS}
+    values["query_key"] = query_key
+    values["selector_version"] = data.get("selector_version")
+    values["updated_at"] = values["checked_at"] = datetime.utcnow()
+    return values
+
+
+def _upsert_person(db: Session, values: dict):
+    """INSERT ... ON CONFLICT (full_name) DO UPDATE; returnerar (slutlig rad, infogades raden).
+
+    "Infogades" är None när databasen inte kan avgöra det i samma rundresa (SQLite).
+    """
+    table = Person.__table__
+    returning = [table.c.id] + [table.c[field] for field in PERSON_FIELDS]
+    dialect = db.get_bind().dialect.name
+    dialect_insert = _UPSERT_DIALECTS.get(dialect)
+
+    if dialect_insert is not None:
+        stmt = dialect_insert(table).values(**values)
+        # Tomma fält i en ny skrapning skriver inte över tidigare kända värden
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.full_name],
+            set_={
+                field: func.coalesce(stmt.excluded[field], table.c[field])
+                for field in values if field != "full_name"
+            },
+        )
+        if dialect == "postgresql":
+            # xmax = 0 för en rad som just infogats, inte för en som uppdaterats vid konflikt
+            row = db.execute(stmt.returning(*returning, literal_column("xmax = 0").label("inserted"))).one()
+            return row, row.inserted
+        return db.execute(stmt.returning(*returning)).one(), None
+
+    # Övriga databaser: slå upp och uppdatera eller infoga
+    person_id = db.execute(select(table.c.id).where(table.c.full_name == values["full_name"])).scalar()
+    if person_id is None:
+        return db.execute(insert(table).values(**values).returning(*returning)).one(), True
+    changes = {field: value for field, value in values.items() if value is not None and field != "full_name"}
+    return db.execute(update(table).where(table.c.id == person_id).values(**changes).returning(*returning)).one(), False
+
+
+def _normalize(value):
+    if value is None:
+        return None
+    return " ".join(str(value).split()) or None
+
+
+def _child_items(data: dict, key: str, columns) -> list:
+    return [{column: item.get(column) for column in columns} for item in data.get(key) or []]
+
+
+def fingerprint(data: dict) -> str:
+    """Hash av normaliserad persondata inklusive barnmängderna (ordningsoberoende)."""
+    canonical = {field: _normalize(data.get(field)) for field in PERSON_FIELDS}
+    for _, key, columns in CHILD_SETS:
+        rows = [[_normalize(item.get(column)) for column in columns] for item in data.get(key) or []]
+        canonical[key] = sorted(rows, key=lambda row: [value or "" for value in row])
+    encoded = json.dumps(canonical, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _sync_children(db: Session, model, columns, person_id: int, items: list):
+    """Skriv bara skillnaden mellan lagrade och skrapade barnrader."""
+    table = model.__table__
+    current = db.execute(
+        select(table.c.id, *[table.c[column] for column in columns]).where(table.c.person_id == person_id)
+    ).all()
+    wanted = Counter(tuple(item[column] for column in columns) for item in items)
+    stale_ids = []
+    for row in current:
+        values = tuple(row[1:])
+        if wanted[values] > 0:
+            wanted[values] -= 1
+        else:
+            stale_ids.append(row.id)
+    if stale_ids:
+        db.execute(delete(model).where(table.c.id.in_(stale_ids)))
+    additions = [dict(zip(columns, values), person_id=person_id) for values, count in wanted.items() for _ in range(count)]
+    if additions:
+        db.execute(insert(model), additions)
+
+
+def _has_snapshot(db: Session, person_id: int, page_hash: str) -> bool:
+    snapshots = PageSnapshot.__table__
+    return db.execute(
+        select(snapshots.c.id).where(snapshots.c.person_id == person_id, snapshots.c.page_hash == page_hash).limit(1)
+    ).first() is not None
+
+
+def save_person(db: Session, data: dict, query_key: str = None, commit: bool = True) -> dict:
+    """Spara en skrapad person med barnrader i en transaktion och returnera PersonOutput-data.
+
+    Personens fingeravtryck jämförs med det lagrade: är det oförändrat skrivs bara kontrolltiden,
+    annars upsertas personen och bara skillnaden i barnraderna skrivs. Utdata byggs från
+    lagrad/returnerad rad och minnesdatan istället för att relationerna laddas om. Med
+    commit=False lämnas transaktionen öppen så att anroparen kan samla flera personer per commit.
+    """
+    table = Person.__table__
+    values = _person_values(data, query_key)
+    values["fingerprint"] = fingerprint(data)
+    existing = db.execute(
+        select(table.c.id, table.c.fingerprint, table.c.query_key, table.c.selector_version,
+               *[table.c[field] for field in PERSON_FIELDS])
+        .where(table.c.full_name == values["full_name"])
+    ).first()
+
+    unchanged = existing is not None and existing.fingerprint == values["fingerprint"]
+    if unchanged:
+        # Oförändrad person: bara kontrolltiden, och en ny söknyckel eller selektorversion, skrivs.
+        # updated_at behålls (ingen onupdate) så att inkrementell export inte tar med raden igen
+        changes = {field: values[field] for field in ("query_key", "selector_version")
+                   if values[field] and getattr(existing, field) != values[field]}
+        db.execute(update(table).where(table.c.id == existing.id).values(
+            **changes, checked_at=values["checked_at"], updated_at=table.c.updated_at,
+        ))
+        row, new_person = existing, False
+    else:
+        row, inserted = _upsert_person(db, values)
+        index_person(db, row.id, row.full_name, row.city)
+        # En samtidig sparning kan ha infogat personen efter uppslaget ovan; barnraderna skrivs
+        # därför direkt bara när upserten bevisligen infogade raden, annars synkas de
+        new_person = existing is None and bool(inserted)
+
+    output = {"id": row.id, **{field: getattr(row, field) for field in PERSON_FIELDS}}
+    for model, key, columns in CHILD_SETS:
+        items = _child_items(data, key, columns)
+        output[key] = items
+        if unchanged:
+            continue
+        if new_person:
+            if items:
+                db.execute(insert(model), [{**item, "person_id": row.id} for item in items])
+        else:
+            _sync_children(db, model, columns, row.id, items)
+
+    # Index från person/sökning till den arkiverade sidan, i samma transaktion. Även när de
+    # extraherade fälten är oförändrade kan sidan skilja sig i delar som ännu inte extraheras,
+    # så en ny sida indexeras alltid; omextrahering ska gå mot den senaste
+    page_hash = data.get("page_hash")
+    if page_hash and not (unchanged and _has_snapshot(db, row.id, page_hash)):
+        db.execute(insert(PageSnapshot).values(
+            page_hash=page_hash, query_key=query_key, person_id=row.id, fetched_at=datetime.utcnow()
+        ))
+
+    if commit:
+        db.commit()
+    return output
@@ -0,0 +1,12 @@
+# app/query.py
+import hashlib
+
+
+def normalize_query(first_name: str, last_name: str, city: str) -> str:
+    """Normalisera en sökning så att skiftläge och extra blanksteg inte ger olika nycklar."""
+    return "|".join(" ".join(part.casefold().split()) for part in (first_name, last_name, city))
+
+
+def query_hash(first_name: str, last_name: str, city: str) -> str:
+    """Kort, stabil hash av den normaliserade sökningen (används som nyckel i Redis)."""
+    return hashlib.sha1(normalize_query(first_name, last_name, city).encode("utf-8")).hexdigest()
@@ -0,0 +1,45 @@
+# app/ratelimit.py
+import os
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from .redis_client import get_redis
+
+load_dotenv()
+
+# Artighetsgräns mot målsajten, delad av alla workers via Redis
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "2"))  # förfrågningar per sekund och värd
+HOST_RATE_BURST = float(os.getenv("HOST_RATE_BURST", "5"))
+
+RATE_PREFIX = "ratelimit:host:"
+
+# Token bucket som fylls på i takt med Redis-klockan; returnerar väntetid i sekunder (0 = beviljad)
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def acquire(host: str, rate: float = HOST_RATE_LIMIT, burst: float = HOST_RATE_BURST) -> float:
+    """Försök ta en token för värden; returnerar 0 om beviljad, annars sekunder att vänta."""
+    if rate <= 0:
+        return 0.0
+    return float(get_redis().eval(_TOKEN_BUCKET_SCRIPT, 1, RATE_PREFIX + host, rate, burst))
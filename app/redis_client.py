@@ -0,0 +1,18 @@
+# app/redis_client.py
+import os
+import redis
+from dotenv import load_dotenv
+
+load_dotenv()
+
+REDIS_URL = os.getenv("REDIS_URL", os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0"))
+
+_client = None
+
+
+def get_redis() -> redis.Redis:
+    """Delad Redis-klient (med egen anslutningspool) för processen."""
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(REDIS_URL, socket_timeout=5, socket_connect_timeout=2)
+    return _client
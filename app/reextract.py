@@ -0,0 +1,93 @@
+# app/reextract.py
+"""Extrahera om arkiverade sidor med nuvarande selectors.json och uppdatera databasen.
+
+Användning: python -m app.reextract [--workers N] [--since 2024-01-01] [--limit N]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from sqlalchemy import func, select
+from .archive import load_page
+from .config import logger
+from .database import SessionLocal
+from .models import PageSnapshot
+from .persistence import save_person
+from .scraper import extract_page
+
+
+def latest_snapshots(db, since: datetime = None, limit: int = None):
+    """Senaste arkiverade sidan per person: (page_hash, query_key)."""
+    latest = select(func.max(PageSnapshot.id).label("id")).where(PageSnapshot.person_id.isnot(None))
+    if since is not None:
+        latest = latest.where(PageSnapshot.fetched_at >= since)
+    latest = latest.group_by(PageSnapshot.person_id).subquery()
+    stmt = (
+        select(PageSnapshot.page_hash, PageSnapshot.query_key)
+        .join(latest, PageSnapshot.id == latest.c.id)
+        .order_by(PageSnapshot.id)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return db.execute(stmt).all()
+
+
+def _extract_snapshot(snapshot):
+    """Körs i poolens processer: dekomprimera och extrahera en arkiverad sida."""
+    page_hash, query_key = snapshot
+    try:
+        return query_key, extract_page(load_page(page_hash)), None
+    except Exception as e:
+        return query_key, None, f"{page_hash}: {e}"
+
+
+def reextract(workers: int = None, since: datetime = None, limit: int = None,
+              chunk_size: int = 64, commit_every: int = 500) -> dict:
+    db = SessionLocal()
+    stats = {"pages": 0, "updated": 0, "skipped": 0, "errors": 0}
+    started = time.perf_counter()
+    try:
+        snapshots = latest_snapshots(db, since, limit)
+        stats["pages"] = len(snapshots)
+        logger.info("Re-extracting %s archived pages with %s processes.", len(snapshots), workers or os.cpu_count())
+
+        # Parsning sker parallellt i processpoolen; skrivningar samlas i huvudprocessen
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for query_key, data, error in pool.map(_extract_snapshot, snapshots, chunksize=chunk_size):
+                if error:
+                    logger.error("Re-extraction failed for %s", error)
+                    stats["errors"] += 1
+                    continue
+                if not data.get("full_name"):
+                    stats["skipped"] += 1
+                    continue
+                save_person(db, data, query_key=query_key, commit=False)
+                stats["updated"] += 1
+                if stats["updated"] % commit_every == 0:
+                    db.commit()
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    logger.info("Re-extraction finished: %s", stats)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extrahera om arkiverade sidor och uppdatera databasen.")
+    parser.add_argument("--workers", type=int, default=None, help="Antal processer (standard: antal CPU:er).")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="Bara sidor hämtade från och med detta datum (ISO 8601).")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=64)
+    args = parser.parse_args()
+    print(reextract(args.workers, args.since, args.limit, args.chunk_size))
+
+
+if __name__ == "__main__":
+    main()
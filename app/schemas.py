@@ -130,14 +130,94 @@ class PersonOutput(BaseModel):
             }
         }
 
+class PersonPage(BaseModel):
+    items: List[PersonOutput] = Field(default_factory=list)
+    next_cursor: Optional[str] = Field(None, example="eyJpZCI6IDUwfQ")
+
+    class Config:
+        orm_mode = True
+        schema_extra = {
+            "example": {
+                "items": [],
+                "next_cursor": "eyJpZCI6IDUwfQ"
+            }
+        }
+
+class SearchHit(BaseModel):
+    id: int = Field(..., example=1)
+    full_name: str = Field(..., example="Carl-Filip Grönlund")
+    city: Optional[str] = Field(None, example="Borlänge")
+    score: float = Field(..., example=1.0)
+
+class SearchResult(BaseModel):
+    query: str = Field(..., example="carl filip gronlund")
+    items: List[SearchHit] = Field(default_factory=list)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "query": "carl filip gronlund",
+                "items": [
+                    {
+                        "id": 1,
+                        "full_name": "Carl-Filip Grönlund",
+                        "city": "Borlänge",
+                        "score": 1.0
+                    }
+                ]
+            }
+        }
+
 class TaskStatus(BaseModel):
     task_id: str = Field(..., example="celery_task_id")
     message: str = Field(..., example="Scraping in progress. Use task ID to retrieve results.")
+    coalesced: bool = Field(False, example=False)
+    coalesced_requests: int = Field(0, example=0)
     
     class Config:
         schema_extra = {
             "example": {
                 "task_id": "celery_task_id",
-                "message": "Scraping in progress. Use task ID to retrieve results."
+                "message": "Scraping in progress. Use task ID to retrieve results.",
+                "coalesced": False,
+                "coalesced_requests": 0
+            }
+        }
+
+class BatchInput(BaseModel):
+    people: List[PersonInput] = Field(..., min_items=1)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "people": [
+                    {
+                        "first_name": "Carl-Filip",
+                        "last_name": "Grönlund",
+                        "city": "Borlänge"
+                    }
+                ]
+            }
+        }
+
+class BatchStatus(BaseModel):
+    batch_id: str = Field(..., example="2f1c9a8e-5d7b-4f0e-9a51-0c8f6e2d3b41")
+    status: str = Field(..., example="running")
+    total: int = Field(..., example=1000)
+    duplicates: int = Field(0, example=12)
+    done: int = Field(0, example=640)
+    failed: int = Field(0, example=3)
+    pending: int = Field(0, example=357)
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "batch_id": "2f1c9a8e-5d7b-4f0e-9a51-0c8f6e2d3b41",
+                "status": "running",
+                "total": 1000,
+                "duplicates": 12,
+                "done": 640,
+                "failed": 3,
+                "pending": 357
             }
         }
\ No newline at end of file
@@ -1,6 +1,11 @@
 # app/scraper.py
+import logging
 import os
+import re
 import json
+import threading
+import time
+import httpx
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
@@ -8,7 +13,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from dotenv import load_dotenv
-from .config import logger, selectors_config
+from .config import logger
+from .driver_pool import get_pool
+from . import extraction, archive, metrics, selector_registry
 
 # Ladda miljövariabler från .env
 load_dotenv()
@@ -18,14 +25,81 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_DRIVER_PATH = os.path.join(BASE_DIR, "driver", "linux64", "chromedriver") if os.name != 'nt' else os.path.join(BASE_DIR, "driver", "win64", "chromedriver")
 CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", DEFAULT_DRIVER_PATH)
 
-# Kontrollera att chromedriver finns i rätt sökväg
-if not os.path.exists(CHROMEDRIVER_PATH):
-    logger.error(f"Chromedriver not found at {CHROMEDRIVER_PATH}. Please ensure it exists.")
-    raise FileNotFoundError(f"Chromedriver not found at {CHROMEDRIVER_PATH}")
+# Basadress för sökningar; kan pekas om mot en lokal ersättare vid benchmark
+MERINFO_BASE_URL = os.getenv("MERINFO_BASE_URL", "https://www.merinfo.se")
 
+# Val av hämtningsbackend: "selenium" (alltid webbläsare) eller "http" (HTTP med fallback till webbläsare)
+FETCH_BACKEND = os.getenv("FETCH_BACKEND", "selenium")
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "5"))
+HTTP_USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
 
-def init_driver() -> webdriver.Chrome:
+# Extraktionsmotor: "compiled" (lxml, en genomgång) eller "bs4" (ursprunglig BeautifulSoup-väg)
+EXTRACTION_ENGINE = os.getenv("EXTRACTION_ENGINE", "compiled")
+
+# Samma markör som WebDriverWait väntar på; saknas den krävs JS-rendering
+CONTENT_MARKER_RE = re.compile(r"""id\s*=\s*["']merinfo-content["']""")
+
+# Webbläsarprofil: "performance" laddar bara det som behövs för merinfo-content, "default" är Chromes vanliga beteende
+DRIVER_PROFILE = os.getenv("DRIVER_PROFILE", "performance")
+DRIVER_PAGE_LOAD_STRATEGY = os.getenv("DRIVER_PAGE_LOAD_STRATEGY", "eager")  # driver.get väntar inte på bilder/CSS
+DRIVER_BLOCK_RESOURCES = [t.strip() for t in os.getenv("DRIVER_BLOCK_RESOURCES", "image,font,stylesheet,media").split(",") if t.strip()]
+DRIVER_BLOCK_HOSTS = [h.strip() for h in os.getenv(
+    "DRIVER_BLOCK_HOSTS",
+    "google-analytics.com,googletagmanager.com,doubleclick.net,googlesyndication.com,"
+    "adservice.google.com,facebook.net,hotjar.com,cookiebot.com,adnxs.com",
+).split(",") if h.strip()]
+DRIVER_WINDOW_SIZE = os.getenv("DRIVER_WINDOW_SIZE", "1024,768")
+
+# CDP blockerar på URL-mönster, så resurstyperna översätts till filändelser
+RESOURCE_URL_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "stylesheet": ["*.css*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*"],
+}
+
+PERFORMANCE_ARGUMENTS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+]
+
+# Överförda byte för dokumentet och alla resurser enligt Resource Timing
+TRANSFER_SIZE_SCRIPT = """
+return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))
+    .reduce(function (total, entry) { return total + (entry.transferSize || 0); }, 0);
+"""
+
+
+def blocked_url_patterns(resource_types=None, hosts=None) -> list:
+    """URL-mönster för Network.setBlockedURLs utifrån resurstyper och tredjepartsvärdar."""
+    patterns = []
+    for resource_type in DRIVER_BLOCK_RESOURCES if resource_types is None else resource_types:
+        patterns.extend(RESOURCE_URL_PATTERNS.get(resource_type, []))
+    patterns.extend(f"*{host}*" for host in (DRIVER_BLOCK_HOSTS if hosts is None else hosts))
+    return patterns
+
+
+def init_driver(profile: str = None) -> webdriver.Chrome:
     """Initialisera en Chrome WebDriver med konfigurationer."""
+    profile = profile or DRIVER_PROFILE
+    if profile not in ("performance", "default"):
+        raise ValueError(f"Unknown driver profile: {profile}")
+
+    # Kontrollera att chromedriver finns i rätt sökväg
+    if not os.path.exists(CHROMEDRIVER_PATH):
+        logger.error("Chromedriver not found at %s. Please ensure it exists.", CHROMEDRIVER_PATH)
+        raise FileNotFoundError(f"Chromedriver not found at {CHROMEDRIVER_PATH}")
+
     try:
         chrome_options = Options()
         chrome_options.add_argument("--headless")  # Headless-läge
@@ -33,86 +107,220 @@ def init_driver() -> webdriver.Chrome:
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
 
-        driver = webdriver.Chrome(executable_path=CHROMEDRIVER_PATH, options=chrome_options)
-        logger.info("Chrome WebDriver initialized successfully.")
+        if profile == "performance":
+            chrome_options.page_load_strategy = DRIVER_PAGE_LOAD_STRATEGY
+            chrome_options.add_argument(f"--window-size={DRIVER_WINDOW_SIZE}")
+            for argument in PERFORMANCE_ARGUMENTS:
+                chrome_options.add_argument(argument)
+            if "image" in DRIVER_BLOCK_RESOURCES:
+                # Bilder utan filändelse stoppas via innehållsinställningen
+                chrome_options.add_experimental_option(
+                    "prefs", {"profile.managed_default_content_settings.images": 2}
+                )
+
+        with metrics.DRIVER_STARTUP.time():
+            driver = webdriver.Chrome(executable_path=CHROMEDRIVER_PATH, options=chrome_options)
+        if profile == "performance":
+            patterns = blocked_url_patterns()
+            if patterns:
+                driver.execute_cdp_cmd("Network.enable", {})
+                driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        logger.info("Chrome WebDriver initialized successfully with %s profile.", profile)
         return driver
     except Exception as e:
-        logger.error(f"Failed to initialize Chrome WebDriver: {e}")
+        logger.error("Failed to initialize Chrome WebDriver: %s", e)
         raise RuntimeError(f"Failed to initialize Chrome WebDriver: {e}")
 
 
-def fetch_page_source(driver: webdriver.Chrome, url: str) -> str:
-    """Navigera till en URL och hämta sidkällan."""
+def fetch_page_source(driver: webdriver.Chrome, url: str, stats: dict = None) -> str:
+    """Navigera till en URL och hämta sidkällan.
+
+    Tid till merinfo-content och överförda byte loggas per hämtning och fylls i stats om den anges.
+    """
     try:
-        logger.info(f"Navigating to URL: {url}")
+        logger.info("Navigating to URL: %s", url)
+        started = time.perf_counter()
         driver.get(url)
+        loaded = time.perf_counter()
         WebDriverWait(driver, 10).until(
             EC.presence_of_element_located((By.ID, "merinfo-content"))
         )
-        logger.info("Page loaded successfully.")
-        return driver.page_source
+        finished = time.perf_counter()
+        metrics.DRIVER_GET.observe(loaded - started)
+        metrics.DRIVER_WAIT.observe(finished - loaded)
+        content_ms = (finished - started) * 1000
+        page_source = driver.page_source
+        transferred = driver.execute_script(TRANSFER_SIZE_SCRIPT) or 0
+        logger.info("Page loaded successfully: merinfo-content after %.0f ms, %s bytes transferred.", content_ms, transferred)
+        if stats is not None:
+            stats.update(content_ms=content_ms, bytes_transferred=transferred)
+        return page_source
     except Exception as e:
-        logger.error(f"Error fetching page source from URL {url}: {e}")
+        logger.error("Error fetching page source from URL %s: %s", url, e)
         raise RuntimeError(f"Failed to fetch page source from {url}: {e}")
 
 
-def extract_data_from_page(soup: BeautifulSoup) -> dict:
-    """Extrahera data från HTML-sidan."""
+def has_content_marker(page_source: str) -> bool:
+    """Kontrollera om sidan innehåller det serverrenderade merinfo-content-elementet."""
+    return CONTENT_MARKER_RE.search(page_source) is not None
+
+
+class Fetcher:
+    """Gränssnitt för backends som hämtar sidkällan för en URL."""
+
+    name = "base"
+
+    def fetch(self, url: str) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SeleniumFetcher(Fetcher):
+    """Hämtar sidor med en varm Chrome WebDriver ur processens pool."""
+
+    name = "selenium"
+
+    def fetch(self, url: str) -> str:
+        with get_pool().driver() as driver:
+            return fetch_page_source(driver, url)
+
+
+class HttpFetcher(Fetcher):
+    """Hämtar serverrenderade sidor över en delad keep-alive-pool (HTTP/2, gzip/brotli)."""
+
+    name = "http"
+
+    def __init__(self, fallback: Fetcher = None, client: httpx.Client = None):
+        self.fallback = fallback
+        self.client = client or httpx.Client(
+            http2=True,
+            timeout=HTTP_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+            headers={
+                "User-Agent": HTTP_USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml",
+                "Accept-Encoding": "gzip, deflate, br",
+                "Accept-Language": "sv-SE,sv;q=0.9",
+            },
+        )
+
+    def fetch(self, url: str) -> str:
+        try:
+            logger.info("Fetching URL over HTTP: %s", url)
+            response = self.client.get(url)
+            response.raise_for_status()
+            page_source = response.text
+        except httpx.HTTPError as e:
+            if self.fallback is None:
+                logger.error("Error fetching page source from URL %s: %s", url, e)
+                raise RuntimeError(f"Failed to fetch page source from {url}: {e}")
+            logger.warning("HTTP fetch failed for %s (%s), falling back to %s.", url, e, self.fallback.name)
+            return self.fallback.fetch(url)
+
+        if has_content_marker(page_source):
+            logger.info("Page loaded successfully over HTTP.")
+            return page_source
+        if self.fallback is None:
+            raise RuntimeError(f"Content marker missing in HTTP response from {url}")
+        logger.info("Content marker missing for %s, falling back to %s.", url, self.fallback.name)
+        return self.fallback.fetch(url)
+
+    def close(self):
+        self.client.close()
+
+
+FETCHER_BACKENDS = {
+    "selenium": lambda: SeleniumFetcher(),
+    "http": lambda: HttpFetcher(fallback=SeleniumFetcher()),
+}
+
+_fetchers = {}
+_fetchers_lock = threading.Lock()
+
+
+def get_fetcher(backend: str = None) -> Fetcher:
+    """Returnera processens delade fetcher för en backend (standard: FETCH_BACKEND)."""
+    backend = backend or FETCH_BACKEND
+    if backend not in FETCHER_BACKENDS:
+        raise ValueError(f"Unknown fetch backend: {backend}")
+    with _fetchers_lock:
+        if backend not in _fetchers:
+            _fetchers[backend] = FETCHER_BACKENDS[backend]()
+        return _fetchers[backend]
+
+
+def close_fetchers():
+    with _fetchers_lock:
+        fetchers = list(_fetchers.values())
+        _fetchers.clear()
+    for fetcher in fetchers:
+        fetcher.close()
+
+
+def extract_data_from_page(soup: BeautifulSoup, selectors: selector_registry.SelectorSet = None) -> dict:
+    """Extrahera data från HTML-sidan med förkompilerade selektorer (standard: registrets aktuella)."""
+    selectors = selectors or selector_registry.current()
     data = {}
 
     # Hämta fullständigt namn
     try:
-        full_name_tag = soup.select_one(selectors_config.get("person_name"))
+        full_name_tag = selectors.select_one("person_name", soup)
         data['full_name'] = full_name_tag.text.strip() if full_name_tag else None
-        logger.info(f"Full name extracted: {data['full_name']}")
+        logger.debug("Full name extracted: %s", data['full_name'])
     except Exception as e:
-        logger.error(f"Error extracting full name: {e}")
+        logger.error("Error extracting full name: %s", e)
         data['full_name'] = None
 
     # Hämta ålder
     try:
-        age_tags = soup.select(selectors_config.get("person_age"))
+        age_tags = selectors.select("person_age", soup)
         age_text = next((tag.text.strip().split(' ')[0] for tag in age_tags if 'år' in tag.text.lower()), None)
         data['age'] = age_text
-        logger.info(f"Age extracted: {data['age']}")
+        logger.debug("Age extracted: %s", data['age'])
     except Exception as e:
-        logger.error(f"Error extracting age: {e}")
+        logger.error("Error extracting age: %s", e)
         data['age'] = None
 
     # Hämta stad
     try:
-        city_tag = soup.select_one(selectors_config.get("person_city"))
+        city_tag = selectors.select_one("person_city", soup)
         data['city'] = city_tag.text.strip() if city_tag else None
-        logger.info(f"City extracted: {data['city']}")
+        logger.debug("City extracted: %s", data['city'])
     except Exception as e:
-        logger.error(f"Error extracting city: {e}")
+        logger.error("Error extracting city: %s", e)
         data['city'] = None
 
     # Hämta adress
     try:
-        address_tag = soup.select_one(selectors_config.get("person_address"))
+        address_tag = selectors.select_one("person_address", soup)
         data['address'] = " ".join(address_tag.stripped_strings) if address_tag else None
-        logger.info(f"Address extracted: {data['address']}")
+        logger.debug("Address extracted: %s", data['address'])
     except Exception as e:
-        logger.error(f"Error extracting address: {e}")
+        logger.error("Error extracting address: %s", e)
         data['address'] = None
 
     # Hämta telefonnummer
     try:
-        phone_tag = soup.select_one(selectors_config.get("phone_number"))
+        phone_tag = selectors.select_one("phone_number", soup)
         data['phone_number'] = phone_tag.text.strip() if phone_tag else None
-        logger.info(f"Phone number extracted: {data['phone_number']}")
+        logger.debug("Phone number extracted: %s", data['phone_number'])
     except Exception as e:
-        logger.error(f"Error extracting phone number: {e}")
+        logger.error("Error extracting phone number: %s", e)
         data['phone_number'] = None
 
     # Hämta födelsedag
     try:
-        birthday_indicator = soup.find('span', class_='mi-font-bold', text=lambda x: x and 'fyller' in x.lower())
+        birthday_indicator = soup.find('span', class_='mi-font-bold', string=lambda x: x and 'fyller' in x.lower())
         data['birthday'] = birthday_indicator.parent.text.strip() if birthday_indicator else None
-        logger.info(f"Birthday extracted: {data['birthday']}")
+        logger.debug("Birthday extracted: %s", data['birthday'])
     except Exception as e:
-        logger.error(f"Error extracting birthday: {e}")
+        logger.error("Error extracting birthday: %s", e)
         data['birthday'] = None
 
     # Lägg till andra fält om det krävs
@@ -120,26 +328,55 @@ def extract_data_from_page(soup: BeautifulSoup) -> dict:
     return data
 
 
-def scrape_merinfo(first_name: str, last_name: str, city: str) -> dict:
-    """Utför scraping för att hämta information om en person."""
+def extract_page(page_source: str, engine: str = None) -> dict:
+    """Extrahera data ur sidkällan med vald extraktionsmotor."""
+    engine = engine or EXTRACTION_ENGINE
+    if engine not in ("bs4", "compiled"):
+        raise ValueError(f"Unknown extraction engine: {engine}")
+    # Samma uppsättning för hela sidan även om registret laddas om under tiden
+    selectors = selector_registry.current()
+    if engine == "compiled" and extraction.get_plan(selectors) is None:
+        engine = "bs4"
+    with metrics.EXTRACT.labels(engine).time():
+        if engine == "bs4":
+            data = extract_data_from_page(BeautifulSoup(page_source, 'html.parser'), selectors)
+        else:
+            data = extraction.extract(page_source, selectors)
+    for field, value in data.items():
+        if value is None:
+            metrics.FIELD_MISSES.labels(field).inc()
+    data['selector_version'] = selectors.version
+    return data
+
+
+def build_search_url(first_name: str, last_name: str, city: str) -> str:
     query = f"{first_name}+{last_name}+{city}"
-    search_url = f"https://www.merinfo.se/search?q={query}"
+    return f"{MERINFO_BASE_URL}/search?q={query}"
+
+
+def fetch_search_page(first_name: str, last_name: str, city: str, backend: str = None) -> str:
+    """Hämta sökresultatsidan för en person med vald backend."""
+    return get_fetcher(backend).fetch(build_search_url(first_name, last_name, city))
 
-    driver = init_driver()
+
+def scrape_merinfo(first_name: str, last_name: str, city: str, backend: str = None) -> dict:
+    """Utför scraping för att hämta information om en person."""
     try:
-        # Hämta sidans HTML
-        page_source = fetch_page_source(driver, search_url)
+        # Hämta sidans HTML med vald backend
+        page_source = fetch_search_page(first_name, last_name, city, backend=backend)
 
-        # Skapa BeautifulSoup-objekt
-        soup = BeautifulSoup(page_source, 'html.parser')
+        # Arkivera rå sidkälla så att den kan extraheras om utan ny hämtning
+        page_hash = archive.store_page(page_source) if archive.ARCHIVE_ENABLED else None
 
         # Extrahera data
-        data = extract_data_from_page(soup)
-        logger.info(f"Data extracted successfully: {json.dumps(data, ensure_ascii=False)}")
+        data = extract_page(page_source)
+        if page_hash:
+            data['page_hash'] = page_hash
+        logger.info("Data extracted successfully for %s.", data.get('full_name'))
+        # Hela posten serialiseras bara när DEBUG faktiskt skrivs
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Extracted data: %s", json.dumps(data, ensure_ascii=False))
         return data
     except Exception as e:
-        logger.error(f"Scraping process failed: {e}")
+        logger.error("Scraping process failed: %s", e)
         raise e
-    finally:
-        driver.quit()
-        logger.info("Driver closed.")
@@ -0,0 +1,247 @@
+# app/search.py
+"""Namnsökning över lagrade personer med normaliserade token och trigramlikhet.
+
+Exakta träffar på det vikta namnet slås upp i ett vanligt B-trädindex. Ungefärliga
+träffar hämtas i SQLite ur en FTS5-tabell med trigram-tokeniseraren och i Postgres med pg_trgm.
+Indexet hålls i synk från save_person; bygg om det med: python -m app.search --rebuild
+"""
+import argparse
+import os
+import time
+import unicodedata
+from sqlalchemy import event, select, text
+from .config import logger
+from .database import Base, SessionLocal
+from .models import Person
+
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "200"))
+SEARCH_MIN_SIMILARITY = float(os.getenv("SEARCH_MIN_SIMILARITY", "0.3"))
+
+SEARCH_TABLE = "person_search"
+SEARCH_KEY_TABLE = "person_search_key"  # SQLite: vikt namn och ort med B-trädindex (i Postgres är det SEARCH_TABLE)
+
+_PUNCTUATION = str.maketrans({c: " " for c in "-‐‑–—_.,'’´`\"()/"})
+
+
+def fold(value: str) -> str:
+    """Skiftlägesvikning, å/ä/ö- och diakritikavvikning samt bindestreck till blanksteg."""
+    if not value:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", value.casefold().translate(_PUNCTUATION))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.replace("ø", "o").replace("æ", "ae").replace("ß", "ss").split())
+
+
+def trigrams(value: str) -> set:
+    """Trigram som i pg_trgm: varje ord med två blanksteg före och ett efter."""
+    grams = set()
+    for word in value.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a: str, b: str) -> float:
+    """Andel gemensamma trigram (som pg_trgm similarity)."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def word_similarity(query: str, name: str) -> float:
+    """Hur stor del av sökningens trigram som finns i namnet; tål att bara en del av namnet anges."""
+    tq = trigrams(query)
+    if not tq:
+        return 0.0
+    return len(tq & trigrams(name)) / len(tq)
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(target, connection, **kwargs):
+    """Skapa sökindexet (idempotent); körs efter varje create_all."""
+    dialect = _dialect(connection)
+    if dialect == "sqlite":
+        connection.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(name, city, tokenize='trigram')"
+        ))
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_KEY_TABLE} (person_id INTEGER PRIMARY KEY, name TEXT NOT NULL, city TEXT)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_KEY_TABLE}_name_city ON {SEARCH_KEY_TABLE} (name, city)"
+        ))
+    elif dialect == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+            "person_id INTEGER PRIMARY KEY REFERENCES persons(id) ON DELETE CASCADE, name TEXT, city TEXT)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_name_trgm ON {SEARCH_TABLE} USING gin (name gin_trgm_ops)"
+        ))
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{SEARCH_TABLE}_name_city ON {SEARCH_TABLE} (name, city)"
+        ))
+
+
+def _upsert_statements(dialect: str) -> list:
+    if dialect == "sqlite":
+        # FTS5 saknar ON CONFLICT; rowid är personens id och INSERT OR REPLACE ersätter raden
+        return [
+            text(f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, name, city) VALUES (:id, :name, :city)"),
+            text(f"INSERT OR REPLACE INTO {SEARCH_KEY_TABLE} (person_id, name, city) VALUES (:id, :name, :city)"),
+        ]
+    if dialect == "postgresql":
+        return [text(
+            f"INSERT INTO {SEARCH_TABLE} (person_id, name, city) VALUES (:id, :name, :city) "
+            "ON CONFLICT (person_id) DO UPDATE SET name = excluded.name, city = excluded.city"
+        )]
+    return []
+
+
+def _index_params(person_id: int, full_name: str, city: str = None) -> dict:
+    return {"id": person_id, "name": fold(full_name), "city": fold(city)}
+
+
+def index_person(db, person_id: int, full_name: str, city: str = None):
+    """Lägg in eller ersätt en persons rad i sökindexet (i anroparens transaktion)."""
+    params = _index_params(person_id, full_name, city)
+    for stmt in _upsert_statements(_dialect(db.get_bind())):
+        db.execute(stmt, params)
+
+
+def _fts_phrase(token: str) -> str:
+    return '"' + token.replace('"', '""') + '"'
+
+
+def _exact_candidates(db, dialect: str, name: str, city: str):
+    table = SEARCH_KEY_TABLE if dialect == "sqlite" else SEARCH_TABLE
+    sql = f"SELECT person_id, name, city FROM {table} WHERE name = :name"
+    if city:
+        sql += " AND city = :city"
+    return db.execute(text(sql + " LIMIT :limit"), {"name": name, "city": city, "limit": SEARCH_CANDIDATES}).all()
+
+
+def _sqlite_candidates(db, name: str, city: str, limit: int):
+    # Trigram-FTS matchar delsträngar om minst tre tecken; kortare token filtreras i omrankningen
+    tokens = [t for t in name.split() if len(t) >= 3]
+    if not tokens:
+        return []
+    # Alla token i valfri ordning först, sedan alla utom ett (stavfel i ett token) och sist
+    # något av namnets trigram, där bm25-rangordningen behövs för att de bästa ska komma med
+    queries = [(" AND ".join(_fts_phrase(t) for t in tokens), "")]
+    if len(tokens) > 1:
+        queries.append((" OR ".join(
+            "(" + " AND ".join(_fts_phrase(t) for t in tokens[:i] + tokens[i + 1:]) + ")" for i in range(len(tokens))
+        ), ""))
+    queries.append((" OR ".join(_fts_phrase(g) for g in sorted(trigrams(name)) if g.strip() == g), " ORDER BY rank"))
+    for query, order in queries:
+        match = f"name : ({query})"
+        if city and len(city) >= 3:
+            match += f" AND city : {_fts_phrase(city)}"
+        rows = db.execute(text(
+            f"SELECT rowid, name, city FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH :match{order} LIMIT :limit"
+        ), {"match": match, "limit": limit}).all()
+        if rows:
+            return rows
+    return []
+
+
+def _postgres_candidates(db, name: str, city: str, limit: int):
+    sql = f"SELECT person_id, name, city FROM {SEARCH_TABLE} WHERE name % :name"
+    if city:
+        sql += " AND city = :city"
+    sql += " ORDER BY name <-> :name LIMIT :limit"
+    return db.execute(text(sql), {"name": name, "city": city, "limit": limit}).all()
+
+
+def search(db, query: str, city: str = None, limit: int = 10,
+           min_similarity: float = SEARCH_MIN_SIMILARITY, partial: bool = True) -> list:
+    """Sök personer på namn (och ev. ort); returnerar träffar sorterade på likhet.
+
+    Med partial=False måste hela namnet likna sökningen, vilket används när en träff
+    ska ersätta en skrapning; annars räcker det att sökningen täcks av namnet.
+    """
+    name, city = fold(query), fold(city) or None
+    if not name:
+        return []
+    dialect = _dialect(db.get_bind())
+    if dialect not in ("sqlite", "postgresql"):
+        return []
+    # Exakt träff på vikt namn är en indexuppslagning; ungefärlig sökning bara om den missar
+    candidates = _exact_candidates(db, dialect, name, city)
+    if not candidates and dialect == "sqlite":
+        candidates = _sqlite_candidates(db, name, city, SEARCH_CANDIDATES)
+    elif not candidates:
+        candidates = _postgres_candidates(db, name, city, SEARCH_CANDIDATES)
+
+    hits = []
+    for person_id, indexed_name, indexed_city in candidates:
+        if city and indexed_city != city:
+            continue
+        score = similarity(name, indexed_name)
+        if partial:
+            # Delvis namn rankas under fullständiga träffar med samma täckning
+            score = max(score, 0.9 * word_similarity(name, indexed_name))
+        if score >= min_similarity:
+            hits.append({"id": person_id, "score": round(score, 4)})
+    hits.sort(key=lambda hit: (-hit["score"], hit["id"]))
+    hits = hits[:limit]
+
+    if hits:
+        rows = {row.id: row for row in db.execute(
+            select(Person.id, Person.full_name, Person.city).where(Person.id.in_([hit["id"] for hit in hits]))
+        )}
+        hits = [{**hit, "full_name": rows[hit["id"]].full_name, "city": rows[hit["id"]].city}
+                for hit in hits if hit["id"] in rows]
+    return hits
+
+
+def rebuild(db, chunk_size: int = 5000) -> int:
+    """Bygg om sökindexet från persons-tabellen."""
+    dialect = _dialect(db.get_bind())
+    statements = _upsert_statements(dialect)
+    if not statements:
+        return 0
+    db.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    if dialect == "sqlite":
+        db.execute(text(f"DELETE FROM {SEARCH_KEY_TABLE}"))
+    count = 0
+    people = db.execute(select(Person.id, Person.full_name, Person.city).execution_options(yield_per=chunk_size))
+    for partition in people.partitions():
+        params = [_index_params(*row) for row in partition]
+        for stmt in statements:
+            db.execute(stmt, params)
+        count += len(partition)
+    db.commit()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sök personer eller bygg om sökindexet.")
+    parser.add_argument("query", nargs="?", help="Namn att söka efter.")
+    parser.add_argument("--city", default=None)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--rebuild", action="store_true", help="Bygg om indexet från persons-tabellen.")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            started = time.perf_counter()
+            count = rebuild(db)
+            logger.info("Rebuilt search index with %s persons in %.1f s.", count, time.perf_counter() - started)
+        if args.query:
+            for hit in search(db, args.query, city=args.city, limit=args.limit):
+                print(hit)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# app/selector_registry.py
+"""Register över CSS-selektorerna i selectors.json, validerade och förkompilerade vid laddning.
+
+Selektorerna kompileras med soupsieve när de läses in; en ogiltig selektor stoppar starten
+istället för att ge ett fel per fält och sida. `:contains()` skrivs om till soupsieves
+`:-soup-contains()`. Registret laddas om när filen ändras eller när en ny uppsättning
+publiceras i Redis (python -m app.selector_registry --publish), utan omstart av workers.
+Varje uppsättning har en version (hash av innehållet) som följer med extraherade poster.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+import soupsieve
+from dotenv import load_dotenv
+from .config import logger
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SELECTORS_PATH = os.getenv("SELECTORS_PATH", os.path.join(BASE_DIR, "selectors.json"))
+SELECTORS_REDIS_KEY = os.getenv("SELECTORS_REDIS_KEY", "selectors:config")  # tom sträng stänger av Redis
+SELECTORS_RELOAD_INTERVAL = float(os.getenv("SELECTORS_RELOAD_INTERVAL", "5"))  # sekunder mellan ändringskontroller
+
+# Nycklar som är text att matcha mot, inte selektorer
+LITERAL_KEYS = {"marital_status_header"}
+
+_CONTAINS_RE = re.compile(r":contains\(")
+
+
+class SelectorError(ValueError):
+    """En eller flera selektorer gick inte att kompilera."""
+
+
+def normalize_selector(selector: str) -> str:
+    """Skriv om föråldrade pseudoklasser till soupsieves namn."""
+    return _CONTAINS_RE.sub(":-soup-contains(", selector.strip())
+
+
+def selector_version(selectors: dict) -> str:
+    encoded = json.dumps(selectors, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:12]
+
+
+class SelectorSet:
+    """En validerad uppsättning selektorer med kompilerade soupsieve-mönster och version."""
+
+    def __init__(self, raw: dict, source: str = None):
+        if not isinstance(raw, dict):
+            raise SelectorError("Selector config must be a JSON object.")
+        self.selectors = {}
+        self.compiled = {}
+        errors = []
+        for key, value in raw.items():
+            if not isinstance(value, str) or not value.strip():
+                errors.append(f"{key}: expected a non-empty string")
+                continue
+            if key in LITERAL_KEYS:
+                self.selectors[key] = value
+                continue
+            selector = normalize_selector(value)
+            try:
+                self.compiled[key] = soupsieve.compile(selector)
+            except soupsieve.SelectorSyntaxError as e:
+                errors.append(f"{key}: {selector!r}: {e}")
+                continue
+            self.selectors[key] = selector
+        if errors:
+            raise SelectorError(f"Invalid selectors{f' in {source}' if source else ''}: " + "; ".join(errors))
+        self.version = selector_version(self.selectors)
+        self.source = source
+
+    def get(self, key: str, default=None):
+        return self.selectors.get(key, default)
+
+    def select_one(self, key: str, soup):
+        return self.compiled[key].select_one(soup)
+
+    def select(self, key: str, soup):
+        return self.compiled[key].select(soup)
+
+
+def load_file(path: str = SELECTORS_PATH) -> SelectorSet:
+    with open(path, "r", encoding="utf-8") as f:
+        return SelectorSet(json.load(f), source=path)
+
+
+class SelectorRegistry:
+    """Håller processens aktuella SelectorSet och byter det när filen eller Redis-värdet ändras.
+
+    Kontrollen görs högst var SELECTORS_RELOAD_INTERVAL:e sekund, från anroparens tråd.
+    En ogiltig ny uppsättning loggas och den gamla behålls.
+    """
+
+    def __init__(self, path: str = SELECTORS_PATH, redis_key: str = SELECTORS_REDIS_KEY,
+                 interval: float = SELECTORS_RELOAD_INTERVAL):
+        self.path = path
+        self.redis_key = redis_key
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._file_mtime = os.stat(path).st_mtime_ns
+        self._redis_digest = None
+        self._checked = time.monotonic()
+        # Första laddningen får misslyckas högljutt
+        self._current = load_file(path)
+        self._check_redis()
+
+    def current(self) -> SelectorSet:
+        if self.interval >= 0 and time.monotonic() - self._checked >= self.interval:
+            self.check()
+        return self._current
+
+    def check(self) -> bool:
+        """Ladda om vid ändring; returnerar True om uppsättningen byttes."""
+        with self._lock:
+            self._checked = time.monotonic()
+            # Redis har företräde framför filen när ett värde är publicerat
+            return self._check_redis() or (self._redis_digest is None and self._check_file())
+
+    def _swap(self, selector_set: SelectorSet) -> bool:
+        if selector_set.version == self._current.version:
+            return False
+        logger.info("Selectors reloaded from %s: version %s -> %s.",
+                    selector_set.source, self._current.version, selector_set.version)
+        self._current = selector_set
+        return True
+
+    def _check_file(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.warning("Selector file unavailable, keeping version %s: %s", self._current.version, e)
+            return False
+        if mtime == self._file_mtime:
+            return False
+        self._file_mtime = mtime
+        try:
+            return self._swap(load_file(self.path))
+        except (OSError, ValueError) as e:
+            logger.error("Ignoring invalid selector file, keeping version %s: %s", self._current.version, e)
+            return False
+
+    def _check_redis(self) -> bool:
+        if not self.redis_key:
+            return False
+        try:
+            from .redis_client import get_redis
+            value = get_redis().get(self.redis_key)
+        except Exception as e:
+            logger.debug("Selector check in Redis unavailable: %s", e)
+            return False
+        if value is None:
+            if self._redis_digest is not None:
+                # Värdet togs bort: tillbaka till filen
+                self._redis_digest = None
+                self._file_mtime = None
+            return False
+        digest = hashlib.sha256(value).hexdigest()
+        if digest == self._redis_digest:
+            return False
+        self._redis_digest = digest
+        try:
+            return self._swap(SelectorSet(json.loads(value), source=f"redis:{self.redis_key}"))
+        except ValueError as e:
+            logger.error("Ignoring invalid selectors in Redis, keeping version %s: %s", self._current.version, e)
+            return False
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> SelectorRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = SelectorRegistry()
+    return _registry
+
+
+def current() -> SelectorSet:
+    """Processens aktuella, validerade selektorer."""
+    return get_registry().current()
+
+
+def publish(path: str = SELECTORS_PATH, redis_key: str = SELECTORS_REDIS_KEY) -> str:
+    """Validera en selektorfil och publicera den i Redis; workers byter till den vid nästa kontroll."""
+    from .redis_client import get_redis
+
+    selector_set = load_file(path)
+    get_redis().set(redis_key, json.dumps(selector_set.selectors, ensure_ascii=False))
+    return selector_set.version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validera eller publicera selektorer.")
+    parser.add_argument("path", nargs="?", default=SELECTORS_PATH)
+    parser.add_argument("--publish", action="store_true", help="Publicera i Redis efter validering.")
+    args = parser.parse_args()
+
+    if args.publish:
+        print(f"Published selectors version {publish(args.path)} to {SELECTORS_REDIS_KEY}")
+    else:
+        selector_set = load_file(args.path)
+        print(f"{len(selector_set.selectors)} selectors OK, version {selector_set.version}")
+
+
+if __name__ == "__main__":
+    main()
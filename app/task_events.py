@@ -0,0 +1,160 @@
+# app/task_events.py
+import asyncio
+import json
+import os
+from collections import defaultdict
+
+import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+from .config import logger
+from .redis_client import REDIS_URL, get_redis
+
+load_dotenv()
+
+CHANNEL_PREFIX = "task-events:"
+SSE_KEEPALIVE = float(os.getenv("SSE_KEEPALIVE", "15"))
+SSE_TIMEOUT = float(os.getenv("SSE_TIMEOUT", "600"))
+
+TERMINAL_STATES = {"SUCCESS", "FAILURE"}
+
+# Läggs i klientköerna när prenumerationen bekräftats; händelser kan ha missats innan dess
+RESYNC = None
+
+
+def publish(task_id: str, state: str, result=None, error: str = None):
+    """Publicera en tillståndsändring för en task (anropas från workern)."""
+    event = {"task_id": task_id, "state": state}
+    if result is not None:
+        event["result"] = result
+    if error is not None:
+        event["error"] = error
+    try:
+        get_redis().publish(CHANNEL_PREFIX + task_id, json.dumps(event, ensure_ascii=False))
+    except redis.RedisError as e:
+        logger.warning("Failed to publish %s event for task %s: %s", state, task_id, e)
+
+
+class TaskEventHub:
+    """En delad pub/sub-anslutning per API-process som fördelar händelser till väntande klienter."""
+
+    def __init__(self, url: str = REDIS_URL):
+        self.url = url
+        self._waiters = defaultdict(set)
+        self._reader = None
+        self._lock = asyncio.Lock()
+        self._ready = asyncio.Event()
+
+    async def start(self, timeout: float = SSE_KEEPALIVE):
+        """Starta läsaren och vänta tills prenumerationen är bekräftad av Redis."""
+        async with self._lock:
+            if self._reader is None:
+                self._reader = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            # Klienten får RESYNC när anslutningen väl är uppe
+            logger.warning("Task event subscription not confirmed within %ss.", timeout)
+
+    async def _run(self):
+        while True:
+            client = aioredis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+                async for message in pubsub.listen():
+                    if message["type"] == "psubscribe":
+                        self._resync()
+                        continue
+                    if message["type"] != "pmessage":
+                        continue
+                    task_id = message["channel"].decode()[len(CHANNEL_PREFIX):]
+                    for queue in list(self._waiters.get(task_id, ())):
+                        queue.put_nowait(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Task event subscription failed, reconnecting: %s", e)
+                await asyncio.sleep(1)
+            finally:
+                self._ready.clear()
+                await pubsub.aclose()
+                await client.aclose()
+
+    def _resync(self):
+        """Prenumerationen är (åter) aktiv: be varje väntande klient läsa tillståndet en gång."""
+        self._ready.set()
+        for waiters in list(self._waiters.values()):
+            for queue in list(waiters):
+                queue.put_nowait(RESYNC)
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._waiters[task_id].add(queue)
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        waiters = self._waiters.get(task_id)
+        if waiters is not None:
+            waiters.discard(queue)
+            if not waiters:
+                del self._waiters[task_id]
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(w) for w in self._waiters.values())
+
+    async def close(self):
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except asyncio.CancelledError:
+                pass
+            self._reader = None
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['state'].lower()}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+async def stream_task_events(hub: TaskEventHub, task_id: str, current_state, resolve=None):
+    """SSE-ström för en task: nuvarande tillstånd först, sedan varje ändring fram till slutläget.
+
+    current_state är en korutin som returnerar taskens nuvarande händelse; den anropas
+    efter prenumerationen så att ingen ändring hinner missas däremellan. resolve är en
+    valfri korutin som kompletterar publicerade händelser (t.ex. referenser till hela poster).
+    """
+    await hub.start()
+    queue = hub.subscribe(task_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SSE_TIMEOUT
+    try:
+        event = await current_state(task_id)
+        yield format_sse(event)
+        if event["state"] in TERMINAL_STATES:
+            return
+
+        while loop.time() < deadline:
+            try:
+                raw = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if raw is RESYNC:
+                # Hubben har återanslutit; ändringar under avbrottet kommer aldrig som händelser
+                state = event["state"]
+                event = await current_state(task_id)
+                if event["state"] != state:
+                    yield format_sse(event)
+                if event["state"] in TERMINAL_STATES:
+                    return
+                continue
+            event = json.loads(raw)
+            if resolve is not None:
+                event = await resolve(event)
+            yield format_sse(event)
+            if event["state"] in TERMINAL_STATES:
+                return
+    finally:
+        hub.unsubscribe(task_id, queue)
@@ -1,127 +1,384 @@
 # app/tasks.py
-from celery import Celery
+from celery.exceptions import Retry
+from celery.signals import (
+    worker_init, worker_process_init, worker_process_shutdown, task_postrun,
+    task_prerun, task_success, task_failure, task_retry,
+)
+import asyncio
 import os
-from .scraper import scrape_merinfo
+from .celery_app import (
+    celery_app, SCRAPE_AND_STORE, SCRAPE_BATCH_ITEM, FINALIZE_BATCH, DRIVER_POOL_STATS,
+    PIPELINE_FETCH, PIPELINE_EXTRACT, PIPELINE_PERSIST, SCRAPE_MANY, RESULT_MODE, dispatch_batch_items,
+)
+from . import driver_pool, coalesce, cache, batch, ratelimit, task_events, archive, metrics
+from .scraper import (
+    scrape_merinfo, fetch_search_page, extract_page, close_fetchers, build_search_url, MERINFO_BASE_URL,
+)
 from .database import SessionLocal
-from .models import Person, Cohabitant, Vehicle, CompanyEngagement
-from .schemas import PersonOutput
+from .persistence import save_person
 from sqlalchemy.orm import Session
-from .config import logger
+from .config import logger, bind_log_context, reset_log_context
+from .query import normalize_query, query_hash
 from dotenv import load_dotenv
 
 load_dotenv()
 
-CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://redis:6379/0")
-CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://redis:6379/0")
+BATCH_ITEM_MAX_ATTEMPTS = int(os.getenv("BATCH_ITEM_MAX_ATTEMPTS", "3"))
 
-celery_app = Celery('tasks', broker=CELERY_BROKER_URL, backend=CELERY_RESULT_BACKEND)
 
-@celery_app.task(bind=True, max_retries=3)
-def scrape_and_store(self, first_name: str, last_name: str, city: str):
+@worker_init.connect
+def start_worker_metrics(**kwargs):
+    # Huvudprocessen serverar /metrics; prefork-barnen skriver till multiprocess-katalogen
+    metrics.reset_multiprocess_dir()
+    metrics.start_worker_server()
+
+
+@worker_process_init.connect
+def init_worker_driver_pool(**kwargs):
+    # Varje prefork-process får sin egen pool med varma drivers
+    driver_pool.init_pool()
+
+
+@worker_process_shutdown.connect
+def close_worker_driver_pool(**kwargs):
+    close_fetchers()
+    driver_pool.shutdown_pool()
+    metrics.mark_process_dead(os.getpid())
+
+
+def _fresh_cached(first_name: str, last_name: str, city: str):
+    cached, state = cache.lookup(first_name, last_name, city)
+    if state == cache.FRESH:
+        logger.info("Serving cached result for %s %s in %s", first_name, last_name, city)
+        return cached
+    return None
+
+
+def scrape_person(first_name: str, last_name: str, city: str, backend: str = None, refresh: bool = False) -> dict:
+    """Hämta, extrahera och spara en person; returnerar PersonOutput-data."""
+    # Färska resultat behöver ingen ny hämtning; refresh=True tvingar fram en (stale-while-revalidate)
+    if not refresh:
+        cached = _fresh_cached(first_name, last_name, city)
+        if cached is not None:
+            return cached
+
+    logger.info("Starting scrape task for %s %s in %s", first_name, last_name, city)
+    data = scrape_merinfo(first_name, last_name, city, backend=backend)
+    if not data or not data.get('full_name'):
+        raise ValueError("Person not found or scraping failed.")
+    return store_person(first_name, last_name, city, data)
+
+
+def store_person(first_name: str, last_name: str, city: str, data: dict) -> dict:
+    """Spara extraherad persondata och lägg resultatet i cachen."""
+    db: Session = SessionLocal()
+    try:
+        # Person och barnrader skrivs i en enda transaktion
+        with metrics.PERSIST.time():
+            output = save_person(db, data, query_key=normalize_query(first_name, last_name, city))
+        logger.info("Stored person %s with ID %s", output['full_name'], output['id'])
+    except Exception as e:
+        db.rollback()
+        logger.error("Database error: %s", e)
+        raise
+    finally:
+        db.close()
+
+    cache.store(first_name, last_name, city, output)
+    logger.info("Scraping and storing completed for %s", output['full_name'])
+    return output
+
+
+def task_result(first_name: str, last_name: str, city: str, output: dict) -> dict:
+    """Det som lagras i resultatbackenden: en referens till personen eller hela posten (RESULT_MODE)."""
+    if RESULT_MODE == "reference":
+        return cache.reference(first_name, last_name, city, output)
+    return output
+
+
+@celery_app.task(name=SCRAPE_AND_STORE, bind=True, max_retries=3)
+def scrape_and_store(self, first_name: str, last_name: str, city: str, backend: str = None, refresh: bool = False):
+    try:
+        output = scrape_person(first_name, last_name, city, backend=backend, refresh=refresh)
+        return task_result(first_name, last_name, city, output)
+    except Exception as e:
+        logger.error("Task failed: %s", e)
+        raise self.retry(exc=e, countdown=60)
+
+
+@task_postrun.connect(sender=scrape_and_store)
+def release_inflight_scrape(task_id=None, args=None, state=None, **kwargs):
+    # Retries behåller task-id:t, så nyckeln släpps först vid slutligt utfall
+    if state in ("SUCCESS", "FAILURE") and args and len(args) >= 3:
+        coalesce.release(args[0], args[1], args[2], task_id)
+
+
+# Tillståndsändringar publiceras så att /task-events kan pusha dem istället för att klienter pollar
+@task_prerun.connect(sender=scrape_and_store)
+def publish_task_started(task_id=None, **kwargs):
+    task_events.publish(task_id, "STARTED")
+
+
+@task_retry.connect(sender=scrape_and_store)
+def publish_task_retry(request=None, reason=None, **kwargs):
+    task_events.publish(request.id, "RETRY", error=str(reason))
+
+
+@task_success.connect(sender=scrape_and_store)
+def publish_task_success(sender=None, result=None, **kwargs):
+    task_events.publish(sender.request.id, "SUCCESS", result=result)
+
+
+@task_failure.connect(sender=scrape_and_store)
+def publish_task_failure(task_id=None, exception=None, **kwargs):
+    task_events.publish(task_id, "FAILURE", error=str(exception))
+
+
+# Pipelineläget: samma arbete som scrape_and_store men uppdelat på tre köer. Stegen skickar
+# en liten dict vidare; sidkällan går via arkivet (page_hash) och bara inline om arkivet är avstängt.
+# acks_late gör att ett steg som dör mitt i körningen levereras om istället för att tappas.
+# Mellanstegens retur går vidare i kedjans meddelande och lagras inte i resultatbackenden.
+@celery_app.task(name=PIPELINE_FETCH, bind=True, max_retries=3, acks_late=True, ignore_result=True)
+def pipeline_fetch(self, first_name: str, last_name: str, city: str, backend: str = None,
+                   refresh: bool = False, result_id: str = None):
+    query = {"first_name": first_name, "last_name": last_name, "city": city}
+    payload = {"query": query, "result_id": result_id}
+    if not refresh:
+        cached = _fresh_cached(first_name, last_name, city)
+        if cached is not None:
+            return {**payload, "cached": cached}
+
+    logger.info("Fetching page for %s %s in %s", first_name, last_name, city)
+    try:
+        page_source = fetch_search_page(first_name, last_name, city, backend=backend)
+    except Exception as e:
+        logger.error("Fetch failed: %s", e)
+        raise self.retry(exc=e, countdown=60)
+
+    if archive.ARCHIVE_ENABLED:
+        payload["page_hash"] = archive.store_page(page_source)
+    else:
+        payload["page_source"] = page_source
+    return payload
+
+
+@celery_app.task(name=PIPELINE_EXTRACT, acks_late=True, ignore_result=True)
+def pipeline_extract(payload: dict):
+    if "cached" in payload:
+        return payload
+    page_source = payload.pop("page_source", None)
+    if page_source is None:
+        page_source = archive.load_page(payload["page_hash"])
+
+    data = extract_page(page_source)
+    # Extraktion är deterministisk, så en sida utan träff görs inte om
+    if not data or not data.get('full_name'):
+        raise ValueError("Person not found or scraping failed.")
+    if payload.get("page_hash"):
+        data['page_hash'] = payload["page_hash"]
+    return {**payload, "data": data}
+
+
+@celery_app.task(name=PIPELINE_PERSIST, bind=True, max_retries=3, acks_late=True)
+def pipeline_persist(self, payload: dict):
+    query = payload["query"]
+    if "cached" in payload:
+        return task_result(query["first_name"], query["last_name"], query["city"], payload["cached"])
     try:
-        logger.info(f"Starting scrape task for {first_name} {last_name} in {city}")
-        data = scrape_merinfo(first_name, last_name, city)
-        if not data or not data.get('full_name'):
-            raise ValueError("Person not found or scraping failed.")
-        
-        db: Session = SessionLocal()
-        try:
-            # Kontrollera om personen redan finns
-            existing_person = db.query(Person).filter(Person.full_name == data.get('full_name')).first()
-            if existing_person:
-                logger.warning(f"Person {data.get('full_name')} already exists in the database.")
-                return {
-                    "id": existing_person.id,
-                    "full_name": existing_person.full_name,
-                    "age": existing_person.age,
-                    "city": existing_person.city,
-                    "address": existing_person.address,
-                    "phone_number": existing_person.phone_number,
-                    "birthday": existing_person.birthday,
-                    "national_id": existing_person.national_id,
-                    "marital_status": existing_person.marital_status,
-                    "cohabitants": [{"name": co.name, "age": co.age} for co in existing_person.cohabitants],
-                    "vehicles": [{"make_model": veh.make_model, "model_year": veh.model_year, "owner": veh.owner, "registration": veh.registration} for veh in existing_person.vehicles],
-                    "companies": [{"company_name": comp.company_name, "position": comp.position, "company_url": comp.company_url} for comp in existing_person.companies]
-                }
-    
-            # Skapa ny person
-            new_person = Person(
-                full_name=data.get('full_name'),
-                age=data.get('age'),
-                city=data.get('city'),
-                address=data.get('address'),
-                phone_number=data.get('phone_number'),
-                birthday=data.get('birthday'),
-                national_id=data.get('national_id'),
-                marital_status=data.get('marital_status')
-            )
-            db.add(new_person)
-            db.commit()
-            db.refresh(new_person)
-            logger.info(f"Added new person: {new_person.full_name} with ID {new_person.id}")
-            
-            # Lägg till cohabitants
-            for co in data.get('cohabitants', []):
-                cohabit = Cohabitant(
-                    name=co['name'],
-                    age=co['age'],
-                    person_id=new_person.id
-                )
-                db.add(cohabit)
-            db.commit()
-            logger.info(f"Added {len(data.get('cohabitants', []))} cohabitants.")
-            
-            # Lägg till vehicles
-            for veh in data.get('vehicles', []):
-                vehicle = Vehicle(
-                    make_model=veh['make_model'],
-                    model_year=veh.get('model_year'),
-                    owner=veh.get('owner'),
-                    registration=veh.get('registration'),
-                    person_id=new_person.id
-                )
-                db.add(vehicle)
-            db.commit()
-            logger.info(f"Added {len(data.get('vehicles', []))} vehicles.")
-            
-            # Lägg till company engagements
-            for comp in data.get('companies', []):
-                company = CompanyEngagement(
-                    company_name=comp['company_name'],
-                    position=comp.get('position'),
-                    company_url=comp.get('company_url'),
-                    person_id=new_person.id
-                )
-                db.add(company)
-            db.commit()
-            logger.info(f"Added {len(data.get('companies', []))} company engagements.")
-            
-            # Förbered output
-            output = {
-                "id": new_person.id,
-                "full_name": new_person.full_name,
-                "age": new_person.age,
-                "city": new_person.city,
-                "address": new_person.address,
-                "phone_number": new_person.phone_number,
-                "birthday": new_person.birthday,
-                "national_id": new_person.national_id,
-                "marital_status": new_person.marital_status,
-                "cohabitants": [{"name": co.name, "age": co.age} for co in new_person.cohabitants],
-                "vehicles": [{"make_model": veh.make_model, "model_year": veh.model_year, "owner": veh.owner, "registration": veh.registration} for veh in new_person.vehicles],
-                "companies": [{"company_name": comp.company_name, "position": comp.position, "company_url": comp.company_url} for comp in new_person.companies]
-            }
-            
-            logger.info(f"Scraping and storing completed for {new_person.full_name}")
-            return output
-
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Database error: {e}")
-            raise self.retry(exc=e, countdown=60)
-        finally:
-            db.close()
+        output = store_person(query["first_name"], query["last_name"], query["city"], payload["data"])
     except Exception as e:
-        logger.error(f"Task failed: {e}")
-        raise self.retry(excStream error:  (Request ID: req_555d593b0ed350d4a09f7a0277317ceb)
+        raise self.retry(exc=e, countdown=60)
+    return task_result(query["first_name"], query["last_name"], query["city"], output)
+
+
+# Persist-steget har pipelinens resultat-id, så dess retry/success/failure publiceras som för scrape_and_store
+task_retry.connect(publish_task_retry, sender=pipeline_persist)
+task_success.connect(publish_task_success, sender=pipeline_persist)
+task_failure.connect(publish_task_failure, sender=pipeline_persist)
+
+
+@task_prerun.connect(sender=pipeline_fetch)
+def publish_pipeline_started(kwargs=None, **extra):
+    if kwargs and kwargs.get("result_id"):
+        task_events.publish(kwargs["result_id"], "STARTED")
+
+
+@task_postrun.connect(sender=pipeline_persist)
+@task_postrun.connect(sender=pipeline_extract)
+@task_postrun.connect(sender=pipeline_fetch)
+def finish_pipeline(sender=None, args=None, kwargs=None, retval=None, state=None, **extra):
+    """Släpp coalescing-nyckeln och publicera fel när pipelinen når ett slutligt utfall."""
+    if state not in ("SUCCESS", "FAILURE"):
+        return
+    if sender is pipeline_fetch:
+        query = dict(zip(("first_name", "last_name", "city"), args or ()))
+        result_id = (kwargs or {}).get("result_id")
+    else:
+        payload = args[0] if args else {}
+        query, result_id = payload.get("query", {}), payload.get("result_id")
+    # Lyckade mellansteg lämnar över till nästa; persist (med result_id som eget id) avslutar
+    if not result_id or (state == "SUCCESS" and sender is not pipeline_persist) or len(query) < 3:
+        return
+    if state == "FAILURE" and sender is not pipeline_persist:
+        # Persist körs aldrig, så felet lagras under pipelinens id åt /task-result och sena SSE-klienter
+        if isinstance(retval, BaseException):
+            celery_app.backend.mark_as_failure(result_id, retval)
+        task_events.publish(result_id, "FAILURE", error=str(retval))
+    coalesce.release(query["first_name"], query["last_name"], query["city"], result_id)
+
+
+_QUERY_FIELDS = ("first_name", "last_name", "city")
+_log_tokens = {}
+
+
+def _task_query(sender, args, kwargs) -> dict:
+    """Sökningen en task gäller, ur argumenten eller pipelinens payload."""
+    args, kwargs = args or (), kwargs or {}
+    if args and isinstance(args[0], dict):
+        return args[0].get("query") or {}
+    if args and isinstance(args[0], list):
+        return {}  # scrape_many: många sökningar
+    if sender is scrape_batch_item:
+        args = args[1:]
+    query = dict(zip(_QUERY_FIELDS, args))
+    query.update((field, kwargs[field]) for field in _QUERY_FIELDS if field in kwargs)
+    return query
+
+
+@task_prerun.connect
+def bind_task_log_context(sender=None, task_id=None, args=None, kwargs=None, **extra):
+    # Alla logposter under tasken får task-id och sökningens hash, så att poster för samma
+    # sökning kan korreleras; själva meddelandena kan fortfarande innehålla namnen
+    fields = {"task_id": task_id, "task": sender.name}
+    query = _task_query(sender, args, kwargs)
+    if all(query.get(field) for field in _QUERY_FIELDS):
+        fields["query_hash"] = query_hash(*(query[field] for field in _QUERY_FIELDS))[:12]
+    _log_tokens[task_id] = bind_log_context(**fields)
+
+
+@task_postrun.connect
+def reset_task_log_context(task_id=None, **extra):
+    token = _log_tokens.pop(task_id, None)
+    if token is not None:
+        reset_log_context(token)
+
+
+@task_success.connect
+def count_task_success(sender=None, **kwargs):
+    metrics.TASK_OUTCOMES.labels(sender.name, "success").inc()
+
+
+@task_failure.connect
+def count_task_failure(sender=None, **kwargs):
+    metrics.TASK_OUTCOMES.labels(sender.name, "failure").inc()
+
+
+@task_retry.connect
+def count_task_retry(sender=None, **kwargs):
+    metrics.TASK_RETRIES.labels(sender.name).inc()
+
+
+# Batchernas tasks skriver sina resultat till batchens lista och behöver ingen plats i backenden.
+# Varje objekt håller ett lån på en av batchens platser (task-id = lån-id) och köar nästa objekt
+# när det är klart, så att högst BATCH_CONCURRENCY objekt per batch finns i brokern åt gången.
+# acks_late och reject_on_worker_lost levererar om objektet om workern dör, så att kedjan inte bryts.
+@celery_app.task(name=SCRAPE_BATCH_ITEM, bind=True, max_retries=None, ignore_result=True,
+                 acks_late=True, reject_on_worker_lost=True)
+def scrape_batch_item(self, batch_id: str, first_name: str, last_name: str, city: str, attempt: int = 0):
+    """Skrapa ett objekt i en batch med begränsad samtidighet och artighetsgräns per värd."""
+    query = {"first_name": first_name, "last_name": last_name, "city": city}
+    batch.renew_lease(batch_id, self.request.id)
+    try:
+        output = _fresh_cached(first_name, last_name, city)
+        if output is None:
+            # Bara riktiga hämtningar tar en token; väntan räknas inte som ett misslyckat försök
+            wait = ratelimit.acquire(ratelimit.host_of(MERINFO_BASE_URL))
+            if wait:
+                raise self.retry(countdown=wait)
+            output = scrape_person(first_name, last_name, city, refresh=True)
+    except Retry:
+        raise
+    except Exception as e:
+        if attempt + 1 < BATCH_ITEM_MAX_ATTEMPTS:
+            logger.warning("Batch %s item failed (attempt %s): %s", batch_id, attempt + 1, e)
+            raise self.retry(kwargs={"attempt": attempt + 1}, countdown=60)
+        logger.error("Batch %s item gave up after %s attempts: %s", batch_id, attempt + 1, e)
+        _finish_batch_item(batch_id, self.request.id, query, error=str(e))
+        return
+    _finish_batch_item(batch_id, self.request.id, query, output=output)
+
+
+def _finish_batch_item(batch_id: str, lease_id: str, query: dict, output: dict = None, error: str = None):
+    batch.record_result(batch_id, query, output=output, error=error)
+    batch.release_lease(batch_id, lease_id)
+    dispatch_batch_items(batch_id)
+
+
+def _extract_and_store(query: dict, page_source: str) -> dict:
+    page_hash = archive.store_page(page_source) if archive.ARCHIVE_ENABLED else None
+    data = extract_page(page_source)
+    if not data or not data.get('full_name'):
+        raise ValueError("Person not found or scraping failed.")
+    if page_hash:
+        data['page_hash'] = page_hash
+    return store_person(query["first_name"], query["last_name"], query["city"], data)
+
+
+async def _scrape_many(people: list, batch_id: str = None) -> dict:
+    from .async_fetch import make_async_fetcher
+
+    summary = {"done": 0, "failed": 0, "cached": 0}
+
+    def finish(query, output=None, error=None):
+        summary["failed" if error else "done"] += 1
+        if batch_id:
+            batch.record_result(batch_id, query, output=output, error=error)
+
+    to_fetch = []
+    for index, query in enumerate(people):
+        cached = await asyncio.to_thread(_fresh_cached, query["first_name"], query["last_name"], query["city"])
+        if cached is not None:
+            summary["cached"] += 1
+            finish(query, output=cached)
+        else:
+            to_fetch.append((index, build_search_url(query["first_name"], query["last_name"], query["city"])))
+
+    fetcher = make_async_fetcher()
+    try:
+        async for index, page_source, error in fetcher.stream(to_fetch):
+            query = people[index]
+            if error is None:
+                try:
+                    # Extraktion och databas i en tråd så att hämtningarna fortsätter under tiden
+                    output = await asyncio.to_thread(_extract_and_store, query, page_source)
+                except Exception as e:
+                    error = e
+            if error is not None:
+                logger.warning("Async scrape failed for item %s: %s", index, error)
+                finish(query, error=str(error))
+            else:
+                finish(query, output=output)
+    finally:
+        await fetcher.aclose()
+    summary["fetch"] = dict(fetcher.stats)
+    return summary
+
+
+@celery_app.task(name=SCRAPE_MANY, ignore_result=True)
+def scrape_many(people: list, batch_id: str = None):
+    """Skrapa många personer i en process med asynkron hämtning; resultaten går till batchen om den anges."""
+    summary = asyncio.run(_scrape_many(people, batch_id))
+    logger.info("Async scrape of %s people: %s", len(people), summary)
+    return summary
+
+
+@celery_app.task(name=FINALIZE_BATCH, ignore_result=True)
+def finalize_batch(batch_id: str):
+    batch.mark_complete(batch_id)
+    logger.info("Batch %s complete.", batch_id)
+
+
+@celery_app.task(name=DRIVER_POOL_STATS)
+def driver_pool_stats():
+    """Returnera träff-, miss- och återvinningsräknare för den aktuella processens driverpool."""
+    return driver_pool.get_pool().stats()
@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import archive, reextract
+from app.database import Base
+from app.models import Person
+from app.persistence import save_person
+
+CORPUS = Path(__file__).parent / "testdata" / "merinfo"
+
+
+def archived_files(root):
+    return sorted(p.name for p in Path(root).rglob("*") if p.is_file())
+
+
+def test_store_and_load_page_by_hash(tmp_path):
+    page = (CORPUS / "person_full.html").read_text(encoding="utf-8")
+    digest = archive.store_page(page, root=tmp_path)
+    assert digest == archive.page_hash(page)
+    assert archive.page_path(digest, tmp_path) == os.path.join(tmp_path, digest[:2], digest[2:4], f"{digest}.html.zst")
+    assert archive.load_page(digest, root=tmp_path) == page
+    # Samma sida lagras bara en gång och ingen temporär fil blir kvar
+    assert archive.store_page(page, root=tmp_path) == digest
+    assert archived_files(tmp_path) == [f"{digest}.html.zst"]
+
+
+def test_failed_write_leaves_no_partial_file(tmp_path, monkeypatch):
+    def broken_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(archive.os, "replace", broken_replace)
+    with pytest.raises(OSError):
+        archive.store_page("<html></html>", root=tmp_path)
+    assert archived_files(tmp_path) == []
+
+
+class CountingSession(Session):
+    commits = 0
+
+    def commit(self):
+        CountingSession.commits += 1
+        super().commit()
+
+
+def test_reextract_updates_people_from_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_DIR", str(tmp_path))
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, class_=CountingSession)
+    monkeypatch.setattr(reextract, "SessionLocal", SessionLocal)
+
+    # Lagrade poster med inaktuell ort som pekar på arkiverade sidor
+    with SessionLocal() as db:
+        for name, full_name in [("person_full", "Anna  Maria Svensson"), ("person_minimal", "Per Olsson")]:
+            digest = archive.store_page((CORPUS / f"{name}.html").read_text(encoding="utf-8"))
+            save_person(db, {"full_name": full_name, "city": "Okänd", "page_hash": digest}, query_key=name)
+
+    monkeypatch.setattr(CountingSession, "commits", 0)
+    stats = reextract.reextract(workers=1, commit_every=1)
+
+    assert stats["pages"] == 2 and stats["updated"] == 2 and stats["errors"] == 0
+    # En commit per sparad person plus den avslutande
+    assert CountingSession.commits == 3
+    with SessionLocal() as db:
+        cities = dict(db.execute(select(Person.full_name, Person.city)).all())
+    assert cities == {"Anna  Maria Svensson": "Falun", "Per Olsson": "Kiruna"}
@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+
+from app.async_fetch import AsyncFetcher, TokenBucket
+from app.scraper import Fetcher
+
+PAGE = '<html><body><div id="merinfo-content"><h1>Anna</h1></div></body></html>'
+
+
+class FakeBrowser(Fetcher):
+    name = "browser"
+
+    def fetch(self, url: str) -> str:
+        return PAGE
+
+
+def _fetcher(handler, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return AsyncFetcher(client=client, rate=0, host_rate=0, shared_host_limit=False, **kwargs)
+
+
+def test_stream_caps_inflight_pages_and_falls_back_for_js_pages():
+    state = {"inflight": 0, "peak": 0}
+
+    async def handler(request):
+        state["inflight"] += 1
+        state["peak"] = max(state["peak"], state["inflight"])
+        await asyncio.sleep(0.01)
+        state["inflight"] -= 1
+        if "js" in request.url.query.decode():
+            return httpx.Response(200, text="<html><script></script></html>")
+        return httpx.Response(200, text=PAGE)
+
+    async def run():
+        fetcher = _fetcher(handler, concurrency=4, fallback=FakeBrowser(), browser_workers=1)
+        items = [(i, f"http://standin/search?q={'js' if i == 3 else 'p'}{i}") for i in range(20)]
+        try:
+            results = [item async for item in fetcher.stream(items)]
+        finally:
+            await fetcher.aclose()
+        return fetcher, results
+
+    fetcher, results = asyncio.run(run())
+    assert sorted(key for key, _, _ in results) == list(range(20))
+    assert all(page == PAGE and error is None for _, page, error in results)
+    assert state["peak"] == 4
+    assert fetcher.stats == {"http": 19, "browser": 1, "failed": 0}
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    async def run():
+        bucket = TokenBucket(rate=50, burst=2)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(7):
+            await bucket.acquire()
+        return loop.time() - started
+
+    # Två ur bursten, fem till i 50/s
+    assert 0.08 <= asyncio.run(run()) < 0.3
@@ -0,0 +1,38 @@
+import fakeredis
+
+from app import batch
+
+PEOPLE = [{"first_name": f"Anna{i}", "last_name": "Andersson", "city": "Falun"} for i in range(5)]
+
+
+def _batch(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(batch, "get_redis", lambda: client)
+    batch_id = batch.create_batch(len(PEOPLE), 0)
+    batch.enqueue_items(batch_id, PEOPLE)
+    return batch_id
+
+
+def test_leases_bound_items_in_flight(monkeypatch):
+    batch_id = _batch(monkeypatch)
+    first = batch.lease_next(batch_id, limit=2)
+    assert [person for _, person in first] == PEOPLE[:2]
+    # Inga lediga platser: ingenting mer köas förrän ett lån släpps
+    assert batch.lease_next(batch_id, limit=2) == []
+    batch.release_lease(batch_id, first[0][0])
+    assert [person for _, person in batch.lease_next(batch_id, limit=2)] == [PEOPLE[2]]
+
+
+def test_expired_lease_frees_its_slot(monkeypatch):
+    batch_id = _batch(monkeypatch)
+    # En worker som dödas lämnar aldrig tillbaka sitt lån; det går ut efter ttl
+    assert len(batch.lease_next(batch_id, limit=1, ttl=0)) == 1
+    assert len(batch.lease_next(batch_id, limit=1)) == 1
+
+
+def test_batch_completes_with_last_result(monkeypatch):
+    batch_id = _batch(monkeypatch)
+    for i, person in enumerate(PEOPLE):
+        batch.record_result(batch_id, person, error="boom" if i == 0 else None, output=None if i == 0 else {"id": i})
+        assert batch.progress(batch_id)["status"] == ("complete" if i == len(PEOPLE) - 1 else "running")
+    assert batch.progress(batch_id)["failed"] == 1
@@ -0,0 +1,33 @@
+import time
+
+import fakeredis
+
+from app import cache
+
+
+def test_fresh_redis_entry_wins_over_stale_memory(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache, "get_redis", lambda: client)
+    monkeypatch.setattr(cache, "CACHE_TIERS", ["memory", "redis"])
+    monkeypatch.setattr(cache, "_lru", cache.LRUCache(16))
+
+    stale_at = time.time() - cache.CACHE_MAX_AGE - 60
+    key = cache.query_hash("Anna", "Andersson", "Falun")
+    cache._lru.set(key, {"payload": {"id": 1, "phone": "070-1"}, "stored_at": stale_at})
+    # En worker i en annan process har förnyat posten i Redis
+    cache._store_redis(key, {"payload": {"id": 1, "phone": "070-2"}, "stored_at": time.time()})
+
+    payload, state = cache.lookup("Anna", "Andersson", "Falun")
+    assert (payload["phone"], state) == ("070-2", cache.FRESH)
+    # Minnesnivån fylls på med den nyare posten
+    assert cache._lru.get(key)["payload"]["phone"] == "070-2"
+
+
+def test_stale_entry_is_served_when_no_tier_is_fresh(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(cache, "get_redis", lambda: client)
+    monkeypatch.setattr(cache, "CACHE_TIERS", ["memory", "redis"])
+    monkeypatch.setattr(cache, "_lru", cache.LRUCache(16))
+
+    cache.store("Anna", "Andersson", "Falun", {"id": 1}, stored_at=time.time() - cache.CACHE_MAX_AGE - 60)
+    assert cache.lookup("Anna", "Andersson", "Falun") == ({"id": 1}, cache.STALE)
@@ -0,0 +1,25 @@
+import fakeredis
+import redis
+
+from app import coalesce
+
+
+class DownRedis:
+    def get(self, key):
+        raise redis.ConnectionError("Connection refused")
+
+
+def test_collapsed_total_degrades_without_redis(monkeypatch):
+    monkeypatch.setattr(coalesce, "get_redis", lambda: DownRedis())
+    assert coalesce.collapsed_total() is None
+
+
+def test_collapsed_total_counts_coalesced_requests(monkeypatch):
+    client = fakeredis.FakeRedis()
+    monkeypatch.setattr(coalesce, "get_redis", lambda: client)
+    monkeypatch.setattr(coalesce, "COALESCE_ENABLED", True)
+    enqueued = []
+    for _ in range(3):
+        coalesce.submit("Anna", "Andersson", "Falun", enqueued.append)
+    assert len(enqueued) == 1
+    assert coalesce.collapsed_total() == 2
@@ -0,0 +1,45 @@
+import time
+
+from app.driver_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self):
+        self.quit_called = False
+
+    def execute_script(self, script):
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_reap_idle_closes_only_expired_drivers():
+    drivers = []
+
+    def factory():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    pool = DriverPool(factory, size=2, max_rss_mb=0, idle_timeout=60)
+    pool.warm(2)
+    pool._idle[0].last_used -= 120
+
+    assert pool.reap_idle() == 1
+    assert [d.quit_called for d in drivers] == [True, False]
+    stats = pool.stats()
+    assert stats["idle"] == 1 and stats["live"] == 1
+    assert stats["recycle_reasons"] == {"idle": 1}
+
+
+def test_reaper_thread_empties_quiet_pool():
+    pool = DriverPool(FakeDriver, size=1, max_rss_mb=0, idle_timeout=0)
+    pool.warm(1)
+    pool.start_reaper(interval=0.01)
+    try:
+        deadline = time.monotonic() + 2
+        while pool.stats()["live"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.stats()["live"] == 0
+    finally:
+        pool.close()
@@ -0,0 +1,30 @@
+import glob
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from app.extraction import ExtractionPlan, compile_selector
+from app import selector_registry
+from app.scraper import extract_data_from_page
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "merinfo")
+CORPUS = sorted(glob.glob(os.path.join(CORPUS_DIR, "*.html")))
+
+
+@pytest.mark.parametrize("path", CORPUS, ids=os.path.basename)
+def test_compiled_extraction_matches_bs4(path):
+    with open(path, encoding="utf-8") as f:
+        page_source = f.read()
+
+    expected = extract_data_from_page(BeautifulSoup(page_source, 'html.parser'))
+    assert ExtractionPlan(selector_registry.current().selectors).extract(page_source) == expected
+
+
+def test_corpus_is_not_empty():
+    assert len(CORPUS) >= 5
+
+
+def test_unsupported_selector_is_rejected():
+    with pytest.raises(ValueError):
+        compile_selector("h3:contains('Fordon på adressen')")
@@ -0,0 +1,68 @@
+import httpx
+import pytest
+
+from app import scraper
+
+URL = "https://www.merinfo.se/person/test"
+PAGE = '<html><body><div id="merinfo-content">Anna</div></body></html>'
+
+
+class StubBrowser(scraper.Fetcher):
+    name = "stub-browser"
+
+    def __init__(self):
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        return "browser:" + url
+
+
+def http_fetcher(handler, fallback):
+    return scraper.HttpFetcher(fallback=fallback, client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+
+def test_http_page_with_marker_skips_browser():
+    browser = StubBrowser()
+    fetcher = http_fetcher(lambda request: httpx.Response(200, text=PAGE), browser)
+    assert fetcher.fetch(URL) == PAGE
+    assert browser.urls == []
+
+
+def test_missing_marker_falls_back_to_browser():
+    browser = StubBrowser()
+    fetcher = http_fetcher(lambda request: httpx.Response(200, text="<html><body>Laddar…</body></html>"), browser)
+    assert fetcher.fetch(URL) == "browser:" + URL
+    assert browser.urls == [URL]
+
+
+def refuse(request):
+    raise httpx.ConnectError("Connection refused", request=request)
+
+
+@pytest.mark.parametrize("handler", [lambda request: httpx.Response(503), refuse])
+def test_http_error_falls_back_to_browser(handler):
+    browser = StubBrowser()
+    assert http_fetcher(handler, browser).fetch(URL) == "browser:" + URL
+    assert browser.urls == [URL]
+
+
+def test_http_error_without_fallback_raises():
+    fetcher = http_fetcher(lambda request: httpx.Response(503), None)
+    with pytest.raises(RuntimeError):
+        fetcher.fetch(URL)
+
+
+def test_get_fetcher_follows_fetch_backend(monkeypatch):
+    monkeypatch.setattr(scraper, "_fetchers", {})
+    monkeypatch.setattr(scraper, "FETCH_BACKEND", "http")
+    fetcher = scraper.get_fetcher()
+    try:
+        assert isinstance(fetcher, scraper.HttpFetcher)
+        assert isinstance(fetcher.fallback, scraper.SeleniumFetcher)
+        assert scraper.get_fetcher("http") is fetcher
+        assert isinstance(scraper.get_fetcher("selenium"), scraper.SeleniumFetcher)
+        with pytest.raises(ValueError):
+            scraper.get_fetcher("curl")
+    finally:
+        scraper.close_fetchers()
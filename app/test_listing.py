@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import listing
+from app.database import Base
+from app.models import Person, Vehicle
+
+
+def test_cursor_roundtrip_and_invalid_cursor():
+    assert listing.decode_cursor(listing.encode_cursor(12345)) == 12345
+    with pytest.raises(ValueError):
+        listing.decode_cursor("not-a-cursor")
+
+
+def test_keyset_pages_cover_filtered_rows_once():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(Person), [
+                {"full_name": f"Person {i}", "age": str(30 + i % 2), "city": "Borlänge" if i % 3 else "Umeå"}
+                for i in range(25)
+            ])
+            await conn.execute(insert(Vehicle), [{"make_model": "Volvo 240", "person_id": 2}])
+
+        seen, cursor = [], None
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            while True:
+                page = await listing.list_persons(db, city="Borlänge", limit=4, cursor=cursor)
+                seen.extend(person.id for person in page["items"])
+                cursor = page["next_cursor"]
+                if cursor is None:
+                    break
+            person = await listing.get_person(db, 2)
+        await engine.dispose()
+        return seen, person
+
+    seen, person = asyncio.run(run())
+    assert seen == [i + 1 for i in range(25) if i % 3]
+    # Barnsamlingarna är redan laddade och kan läsas utan lazy load
+    assert [v.make_model for v in person.vehicles] == ["Volvo 240"]
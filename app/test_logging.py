@@ -0,0 +1,51 @@
+import io
+import json
+import logging
+
+from app.config import JsonFormatter, bind_log_context, make_queue_handler, reset_log_context
+
+
+def test_json_records_carry_task_context_through_queue():
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(JsonFormatter())
+    handler, listener = make_queue_handler(target)
+    log = logging.getLogger("merinfo_scraper.test_logging")
+    log.addHandler(handler)
+    log.propagate = False
+    try:
+        token = bind_log_context(task_id="abc", query_hash="0123456789ab")
+        log.warning("Stored person %s with ID %s", "Anna Andersson", 7)
+        reset_log_context(token)
+        log.warning("Outside task")
+    finally:
+        listener.stop()
+        log.removeHandler(handler)
+
+    inside, outside = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert inside["message"] == "Stored person Anna Andersson with ID 7"
+    assert inside["level"] == "WARNING"
+    assert (inside["task_id"], inside["query_hash"]) == ("abc", "0123456789ab")
+    assert "task_id" not in outside
+
+
+def test_json_exception_survives_queue_handler():
+    stream = io.StringIO()
+    target = logging.StreamHandler(stream)
+    target.setFormatter(JsonFormatter())
+    handler, listener = make_queue_handler(target)
+    log = logging.getLogger("merinfo_scraper.test_logging_exc")
+    log.addHandler(handler)
+    log.propagate = False
+    try:
+        try:
+            raise ValueError("trasig sida")
+        except ValueError:
+            log.exception("Extraction failed for %s", "abc")
+    finally:
+        listener.stop()
+        log.removeHandler(handler)
+
+    entry = json.loads(stream.getvalue())
+    assert entry["message"] == "Extraction failed for abc"
+    assert "ValueError: trasig sida" in entry["exc_info"]
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app import cache, persistence
+from app.database import Base
+from app.models import PageSnapshot, Person, Vehicle
+from app.query import normalize_query
+from app.persistence import save_person
+
+PERSON = {"full_name": "Anna Andersson", "city": "Falun", "vehicles": [{"make_model": "Volvo V70"}]}
+
+
+def test_concurrent_save_of_new_person_writes_children_once(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'persons.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    upsert = persistence._upsert_person
+
+    def racing_upsert(db, values):
+        # En annan worker hinner spara samma nya person mellan uppslaget och upserten
+        monkeypatch.setattr(persistence, "_upsert_person", upsert)
+        with Session() as other:
+            save_person(other, dict(PERSON))
+        return upsert(db, values)
+
+    monkeypatch.setattr(persistence, "_upsert_person", racing_upsert)
+    with Session() as db:
+        save_person(db, dict(PERSON))
+        assert db.execute(select(func.count()).select_from(Vehicle)).scalar() == 1
+
+
+def test_new_page_is_indexed_when_person_is_unchanged():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        save_person(db, {**PERSON, "page_hash": "a" * 64})
+        save_person(db, {**PERSON, "page_hash": "a" * 64})
+        save_person(db, {**PERSON, "page_hash": "b" * 64})
+        hashes = db.execute(select(PageSnapshot.page_hash).order_by(PageSnapshot.id)).scalars().all()
+    assert hashes == ["a" * 64, "b" * 64]
+
+
+def test_unchanged_rescrape_refreshes_checked_at_but_not_updated_at(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(cache, "SessionLocal", Session)
+    with Session() as db:
+        output = save_person(db, dict(PERSON), query_key=normalize_query("Anna", "Andersson", "Falun"))
+        old = datetime.utcnow() - timedelta(seconds=cache.CACHE_MAX_AGE + 60)
+        db.execute(update(Person).where(Person.id == output["id"]).values(updated_at=old, checked_at=old))
+        db.commit()
+        assert cache._lookup_sql("Anna", "Andersson", "Falun") is not None
+        assert cache.freshness(cache._lookup_sql("Anna", "Andersson", "Falun")["stored_at"]) == cache.STALE
+
+        save_person(db, dict(PERSON), query_key=normalize_query("Anna", "Andersson", "Falun"))
+        person = db.get(Person, output["id"])
+        db.refresh(person)
+        assert person.updated_at == old and person.checked_at > old
+    assert cache.freshness(cache._lookup_sql("Anna", "Andersson", "Falun")["stored_at"]) == cache.FRESH
@@ -0,0 +1,29 @@
+from celery import Celery
+
+from app import tasks
+
+
+def test_failed_pipeline_step_stores_failure_under_result_id(monkeypatch):
+    backend = Celery("test-pipeline", broker="memory://", backend="cache+memory://").backend
+    monkeypatch.setattr(type(tasks.celery_app), "backend", property(lambda app: backend))
+    published, released = [], []
+    monkeypatch.setattr(tasks.task_events, "publish", lambda task_id, state, **kw: published.append((task_id, state)))
+    monkeypatch.setattr(tasks.coalesce, "release", lambda *args: released.append(args))
+
+    tasks.finish_pipeline(sender=tasks.pipeline_fetch, args=("Anna", "Andersson", "Falun"),
+                          kwargs={"result_id": "pipeline-1"}, retval=RuntimeError("fetch failed"), state="FAILURE")
+
+    meta = backend.get_task_meta("pipeline-1")
+    assert meta["status"] == "FAILURE"
+    assert published == [("pipeline-1", "FAILURE")]
+    assert released == [("Anna", "Andersson", "Falun", "pipeline-1")]
+
+
+def test_intermediate_success_does_not_finish_pipeline(monkeypatch):
+    backend = Celery("test-pipeline", broker="memory://", backend="cache+memory://").backend
+    monkeypatch.setattr(type(tasks.celery_app), "backend", property(lambda app: backend))
+    monkeypatch.setattr(tasks.coalesce, "release", lambda *args: (_ for _ in ()).throw(AssertionError("released")))
+
+    payload = {"query": {"first_name": "Anna", "last_name": "Andersson", "city": "Falun"}, "result_id": "pipeline-2"}
+    tasks.finish_pipeline(sender=tasks.pipeline_extract, args=(payload,), retval=payload, state="SUCCESS")
+    assert backend.get_task_meta("pipeline-2")["status"] == "PENDING"
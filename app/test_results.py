@@ -0,0 +1,52 @@
+from celery import Celery
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app import cache
+from app.celery_app import compressed_serializer
+from app.database import Base
+from app.persistence import save_person
+
+
+def test_reference_result_is_hydrated_from_database(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        output = save_person(db, {"full_name": "Anna Andersson", "city": "Falun",
+                                  "vehicles": [{"make_model": "Volvo V70"}]})
+    monkeypatch.setattr(cache, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(cache, "CACHE_TIERS", ["memory"])
+
+    reference = cache.reference("Anna", "Andersson", "Falun", output)
+    assert set(reference) == {"person_id", "query_hash", "fingerprint"}
+    assert cache.is_reference(reference) and not cache.is_reference(output)
+    hydrated = cache.hydrate(reference)
+    assert hydrated["full_name"] == "Anna Andersson"
+    assert hydrated["vehicles"][0]["make_model"] == "Volvo V70"
+    assert cache.hydrate(output) is output
+
+
+def test_refreshed_person_is_not_hydrated_from_stale_cache(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    monkeypatch.setattr(cache, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(cache, "CACHE_TIERS", ["memory"])
+    monkeypatch.setattr(cache, "_lru", cache.LRUCache(16))
+    with Session(engine) as db:
+        before = save_person(db, {"full_name": "Anna Andersson", "city": "Falun", "phone_number": "070-1"})
+    cache.store("Anna", "Andersson", "Falun", before)
+
+    # Uppdateringen skrevs av en worker; API-processens LRU har kvar den gamla posten
+    with Session(engine) as db:
+        after = save_person(db, {"full_name": "Anna Andersson", "city": "Falun", "phone_number": "070-2"})
+    assert cache.hydrate(cache.reference("Anna", "Andersson", "Falun", after))["phone_number"] == "070-2"
+    assert cache.hydrate(cache.reference("Anna", "Andersson", "Falun", before)) == before
+
+
+def test_compressed_msgpack_results_roundtrip():
+    app = Celery("test-results", broker="memory://", backend="cache+memory://")
+    app.conf.result_serializer = compressed_serializer("msgpack", "zlib")
+    app.conf.result_accept_content = [app.conf.result_serializer]
+    result = {"id": 1, "full_name": "Åsa Öberg", "cohabitants": [{"name": "Per Öberg", "age": "40"}]}
+    app.backend.store_result("task-1", result, "SUCCESS")
+    assert app.backend.get_task_meta("task-1")["result"] == result
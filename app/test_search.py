@@ -0,0 +1,28 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import search
+from app.database import Base
+from app.persistence import save_person
+
+
+def test_fold_handles_case_swedish_letters_and_hyphens():
+    assert search.fold("Carl-Filip  Grönlund") == "carl filip gronlund"
+    assert search.fold("ÅSA Ärlig-Öberg") == "asa arlig oberg"
+    assert search.fold("José Müller") == "jose muller"
+
+
+def test_search_finds_variants_of_stored_name():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        save_person(db, {"full_name": "Carl-Filip Grönlund", "city": "Borlänge"})
+        save_person(db, {"full_name": "Anna Andersson", "city": "Falun"})
+
+        exact = search.search(db, "Carl Filip Gronlund", city="borlange")
+        assert [(hit["full_name"], hit["score"]) for hit in exact] == [("Carl-Filip Grönlund", 1.0)]
+        assert search.search(db, "Grönlund Carl-Filip")[0]["full_name"] == "Carl-Filip Grönlund"
+        assert search.search(db, "Carl Filip Grönlnd")[0]["full_name"] == "Carl-Filip Grönlund"
+        assert search.search(db, "Carl Filip Gronlund", city="Falun") == []
+        # En träff som ska ersätta en skrapning måste likna hela namnet
+        assert search.search(db, "Grönlund", min_similarity=0.9, partial=False) == []
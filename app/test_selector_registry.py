@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from app.selector_registry import SelectorError, SelectorRegistry, SelectorSet
+
+
+def test_contains_is_rewritten_and_precompiled():
+    selectors = SelectorSet({"vehicles_section": "h3:contains('Fordon på adressen')", "marital_status_header": "Civilstatus"})
+    assert selectors.get("vehicles_section") == "h3:-soup-contains('Fordon på adressen')"
+    soup = BeautifulSoup("<h3>Fordon på adressen</h3><h3>Annat</h3>", "html.parser")
+    assert selectors.select_one("vehicles_section", soup).text == "Fordon på adressen"
+    assert selectors.get("marital_status_header") == "Civilstatus"
+
+
+def test_invalid_selectors_fail_fast():
+    with pytest.raises(SelectorError, match="person_name"):
+        SelectorSet({"person_name": "span..namn", "person_city": "span[dusk='summery-city']"})
+
+
+def test_registry_reloads_changed_file_and_keeps_last_good(tmp_path):
+    path = tmp_path / "selectors.json"
+    path.write_text(json.dumps({"person_name": "span.namn"}), encoding="utf-8")
+    registry = SelectorRegistry(str(path), redis_key="", interval=0)
+    first = registry.current().version
+
+    path.write_text(json.dumps({"person_name": "h1 span.namn"}), encoding="utf-8")
+    os.utime(path, ns=(0, 1))
+    assert registry.current().get("person_name") == "h1 span.namn"
+    assert registry.current().version != first
+
+    path.write_text(json.dumps({"person_name": "h1 span..namn"}), encoding="utf-8")
+    os.utime(path, ns=(0, 2))
+    assert registry.current().get("person_name") == "h1 span.namn"
@@ -0,0 +1,14 @@
+import json
+import os
+import subprocess
+import sys
+
+from app.celery_app import WORKER_ONLY_MODULES
+
+
+def test_api_does_not_import_worker_modules(tmp_path):
+    probe = f"import json, sys, app.main; print(json.dumps([m for m in {WORKER_ONLY_MODULES!r} if m in sys.modules]))"
+    # Skriv aldrig en databas i checkouten
+    env = {**os.environ, "DB_AUTO_CREATE": "0", "DATABASE_URL": f"sqlite:///{tmp_path / 'persons.db'}"}
+    completed = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True, env=env)
+    assert json.loads(completed.stdout.strip().splitlines()[-1]) == []
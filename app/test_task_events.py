@@ -0,0 +1,74 @@
+import asyncio
+
+import fakeredis
+
+from app import task_events
+
+
+class QueueHub:
+    """Hub där testet själv styr vad som hamnar i klientens kö."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+
+    async def start(self):
+        pass
+
+    def subscribe(self, task_id):
+        return self.queue
+
+    def unsubscribe(self, task_id, queue):
+        pass
+
+
+def test_keepalive_does_not_poll_state(monkeypatch):
+    monkeypatch.setattr(task_events, "SSE_KEEPALIVE", 0.01)
+    monkeypatch.setattr(task_events, "SSE_TIMEOUT", 0.1)
+    calls = []
+
+    async def current_state(task_id):
+        calls.append(task_id)
+        return {"task_id": task_id, "state": "PENDING"}
+
+    async def collect():
+        return [chunk async for chunk in task_events.stream_task_events(QueueHub(), "t1", current_state)]
+
+    chunks = asyncio.run(asyncio.wait_for(collect(), timeout=5))
+    assert calls == ["t1"]
+    assert chunks[1:] and set(chunks[1:]) == {": keepalive\n\n"}
+
+
+def test_resync_rereads_state_once(monkeypatch):
+    monkeypatch.setattr(task_events, "SSE_KEEPALIVE", 0.01)
+    states = iter(["PENDING", "SUCCESS"])
+
+    async def current_state(task_id):
+        return {"task_id": task_id, "state": next(states)}
+
+    async def collect():
+        hub = QueueHub()
+        hub.queue.put_nowait(task_events.RESYNC)
+        return [chunk async for chunk in task_events.stream_task_events(hub, "t1", current_state)]
+
+    chunks = asyncio.run(asyncio.wait_for(collect(), timeout=5))
+    assert chunks[0].startswith("event: pending")
+    assert chunks[-1].startswith("event: success")
+
+
+def test_hub_start_waits_for_subscription_and_resyncs(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(task_events.aioredis, "from_url", lambda url: fakeredis.aioredis.FakeRedis(server=server))
+
+    async def run():
+        hub = task_events.TaskEventHub("redis://test")
+        queue = hub.subscribe("t1")
+        await hub.start()
+        try:
+            # Redan väntande klienter får RESYNC när prenumerationen bekräftats
+            assert queue.get_nowait() is task_events.RESYNC
+            await fakeredis.aioredis.FakeRedis(server=server).publish(task_events.CHANNEL_PREFIX + "t1", "{}")
+            return await asyncio.wait_for(queue.get(), timeout=1)
+        finally:
+            await hub.close()
+
+    assert asyncio.run(run()) == b"{}"
@@ -0,0 +1,35 @@
+import time
+
+import pytest
+
+from app.config import AdaptiveTraceSampler
+
+
+def _context(name="/scrape-person/", parent=None):
+    return {"transaction_context": {"name": name}, "parent_sampled": parent}
+
+
+def test_rate_drops_when_traffic_would_exceed_cap():
+    sampler = AdaptiveTraceSampler(base_rate=0.5, per_minute=10)
+    for _ in range(100):
+        assert sampler(_context()) == 0.5
+    # Förra minuten hade 100 transaktioner: 50 spår vid basandelen, taket är 10
+    sampler._window_start = time.monotonic() - 60
+    assert sampler(_context()) == pytest.approx(0.1, rel=0.01)
+
+
+def test_rate_recovers_when_traffic_falls():
+    sampler = AdaptiveTraceSampler(base_rate=0.5, per_minute=10)
+    sampler.rate = 0.1
+    sampler._count = 5
+    sampler._window_start = time.monotonic() - 60
+    assert sampler(_context()) == 0.5
+
+
+def test_parent_decision_and_untraced_paths():
+    sampler = AdaptiveTraceSampler(base_rate=0.5, per_minute=10)
+    assert sampler(_context(parent=True)) == 1.0
+    assert sampler(_context(parent=False)) == 0.0
+    assert sampler(_context(name="/metrics")) == 0.0
+    # Uppströmsbeslut räknas inte in i fönstret
+    assert sampler._count == 0
@@ -0,0 +1,7 @@
+# benchmarks/__init__.py
+"""Offline-benchmarks för scraperns heta vägar.
+
+Kör med `python -m benchmarks run`; resultaten sparas som JSON under
+benchmarks/results/ och kan jämföras mellan commits med
+`python -m benchmarks compare`.
+"""
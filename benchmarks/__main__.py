@@ -0,0 +1,96 @@
+# benchmarks/__main__.py
+import argparse
+import importlib
+import logging
+import os
+import sys
+import tempfile
+
+SUITES = ["extract", "fetch", "persist", "concurrency", "logging", "results", "api", "startup"]
+
+
+def _configure_environment(workdir: str):
+    # Benchmarks körs helt offline: temporär SQLite-fil och in-memory-broker
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ["CELERY_BROKER_URL"] = "memory://"
+    os.environ["CELERY_RESULT_BACKEND"] = "cache+memory://"
+    os.environ["COALESCE_ENABLED"] = "0"
+    os.environ["CACHE_TIERS"] = "memory,sql"
+
+
+def run(args):
+    from .harness import format_table, save_results
+
+    workdir = tempfile.mkdtemp(prefix="intellifetch-bench-")
+    _configure_environment(workdir)
+    from app.config import logger
+    logger.setLevel(getattr(logging, args.log_level))
+
+    results = []
+    for suite in args.suite or SUITES:
+        module = importlib.import_module(f"benchmarks.bench_{suite}")
+        results.extend(module.run(args))
+
+    measured = [r for r in results if "skipped" not in r]
+    print(format_table(measured))
+    for r in results:
+        if "skipped" in r:
+            print(f"{r['name']}: skipped ({r['skipped']})")
+    print(f"Results saved to {save_results(results, args.output)}")
+
+    failures = [f"{r['name']}: {failure}" for r in results for failure in r.get("guard_failures", [])]
+    for failure in failures:
+        print(f"GUARD FAILED {failure}")
+    if failures:
+        sys.exit(1)
+
+
+def compare(args):
+    from .harness import compare as compare_results
+
+    rows, regressions = compare_results(args.baseline, args.current, args.metric, args.threshold)
+    for name, before, after, change in rows:
+        fmt = lambda v: f"{v:10.3f}" if v is not None else f"{'-':>10}"
+        delta = f"{change * 100:+7.1f}%" if change is not None else f"{'-':>8}"
+        print(f"{name:<40} {fmt(before)} {fmt(after)} {delta}")
+    if regressions:
+        print(f"Regressions above {args.threshold:.0%} in {args.metric}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Kör benchmarks och spara resultaten som JSON.")
+    run_parser.add_argument("--suite", action="append", choices=SUITES,
+                            help="Suite att köra (kan anges flera gånger, standard: alla).")
+    run_parser.add_argument("--iterations", type=int, default=200)
+    run_parser.add_argument("--corpus-size", type=int, default=50)
+    run_parser.add_argument("--latency", type=float, default=0.0,
+                            help="Svarslatens för den lokala ersättaren i sekunder.")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--startup-runs", type=int, default=10,
+                            help="Antal kalla interpreterstarter för startup-sviten.")
+    run_parser.add_argument("--startup-max-ms", type=float, default=1500,
+                            help="Högsta tillåtna p50 för import av app.main.")
+    run_parser.add_argument("--startup-max-rss-mb", type=float, default=120,
+                            help="Högsta tillåtna RSS efter import av app.main.")
+    run_parser.add_argument("--log-level", default="WARNING",
+                            choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    run_parser.add_argument("--output", help="Sökväg för resultat-JSON (standard: benchmarks/results/).")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Jämför två resultatfiler.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--metric", default="p95_ms")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# benchmarks/bench_api.py
+import itertools
+
+from .corpus import generate_queries
+from .harness import measure
+
+
+def run(options):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    client = TestClient(app)
+    payloads = itertools.cycle(
+        {"first_name": first, "last_name": last, "city": city}
+        for first, last, city in generate_queries(options.corpus_size)
+    )
+    task_ids = []
+
+    def post(payload):
+        response = client.post("/scrape-person/", json=payload)
+        task_ids.append(response.json().get("task_id"))
+
+    results = [measure("api.post_scrape_person", post, iterations=options.iterations, args_iter=payloads)]
+    results.append(measure(
+        "api.get_task_result", lambda task_id: client.get(f"/task-result/{task_id}"),
+        iterations=options.iterations, args_iter=itertools.cycle(task_ids),
+    ))
+    return results
@@ -0,0 +1,35 @@
+# benchmarks/bench_extract.py
+import itertools
+
+from .corpus import generate_pages, load_saved_pages
+from .harness import measure
+
+
+def run(options):
+    from bs4 import BeautifulSoup
+    from app.scraper import extract_data_from_page, extract_page
+
+    pages = [html for _, html in generate_pages(options.corpus_size)]
+    pages += [html for _, html in load_saved_pages()]
+
+    return [
+        measure(
+            "extract.compiled", lambda html: extract_page(html, engine="compiled"),
+            iterations=options.iterations, args_iter=itertools.cycle(pages), pages=len(pages),
+        ),
+        measure(
+            "extract.bs4", lambda html: extract_page(html, engine="bs4"),
+            iterations=options.iterations, args_iter=itertools.cycle(pages), pages=len(pages),
+        ),
+        measure(
+            "extract.bs4_parse_only", lambda html: BeautifulSoup(html, 'html.parser'),
+            iterations=options.iterations, args_iter=itertools.cycle(pages), pages=len(pages),
+        ),
+        measure(
+            "extract.data_from_soup",
+            extract_data_from_page,
+            iterations=options.iterations,
+            args_iter=itertools.cycle([BeautifulSoup(html, 'html.parser') for html in pages]),
+            pages=len(pages),
+        ),
+    ]
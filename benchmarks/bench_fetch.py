@@ -0,0 +1,94 @@
+# benchmarks/bench_fetch.py
+import asyncio
+import itertools
+import time
+
+from .corpus import generate_queries
+from .harness import RssSampler, measure, percentile, summarize
+from .standin import StandInServer
+
+
+def _search_urls(base_url: str, count: int):
+    return [f"{base_url}/search?q={first}+{last}+{city}" for first, last, city in generate_queries(count)]
+
+
+def _measure_async(base_url: str, options, concurrency: int) -> dict:
+    """Hämta lika många sidor som de andra profilerna, men många samtidigt i en event loop."""
+    from app.async_fetch import AsyncFetcher
+
+    urls = list(itertools.islice(itertools.cycle(_search_urls(base_url, options.corpus_size)), options.iterations))
+
+    async def fetch_all():
+        # Ingen hastighetsgräns här: det är samtidigheten som mäts, inte artighetsgränsen
+        fetcher = AsyncFetcher(concurrency=concurrency, rate=0, host_rate=0, shared_host_limit=False)
+        slots = asyncio.Semaphore(concurrency)
+        samples = []
+
+        async def timed(url):
+            # Latensen räknas från att sidan får plats i luften, inte från att den köades
+            async with slots:
+                t0 = time.perf_counter()
+                await fetcher.fetch(url)
+                samples.append(time.perf_counter() - t0)
+
+        try:
+            await asyncio.gather(*(timed(url) for url in urls))
+        finally:
+            await fetcher.aclose()
+        return samples
+
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        samples = asyncio.run(fetch_all())
+        wall_time = time.perf_counter() - started
+    return summarize(f"fetch.async.c{concurrency}", samples, wall_time, sampler.peak,
+                     standin_latency_ms=options.latency * 1000, concurrency=concurrency)
+
+
+def run(options):
+    from app.scraper import HttpFetcher, fetch_page_source, init_driver
+
+    results = []
+    with StandInServer(latency=options.latency) as server:
+        urls = itertools.cycle(_search_urls(server.base_url, options.corpus_size))
+
+        fetcher = HttpFetcher(fallback=None)
+        try:
+            results.append(measure(
+                "fetch.http", fetcher.fetch, iterations=options.iterations, args_iter=urls,
+                standin_latency_ms=options.latency * 1000,
+            ))
+        finally:
+            fetcher.close()
+
+        # Samma sidor från en process med många i luften; ops/s jämförs med fetch.http
+        for concurrency in (8, 32):
+            results.append(_measure_async(server.base_url, options, concurrency))
+
+        # Samma sidor med båda webbläsarprofilerna för att se vad prestandaprofilen sparar
+        for profile in ("default", "performance"):
+            try:
+                driver = init_driver(profile=profile)
+            except (FileNotFoundError, RuntimeError) as e:
+                results.append({"name": f"fetch.selenium.{profile}", "skipped": str(e)})
+                continue
+            fetch_stats = []
+
+            def fetch(url):
+                stats = {}
+                fetch_page_source(driver, url, stats=stats)
+                fetch_stats.append(stats)
+
+            try:
+                result = measure(
+                    f"fetch.selenium.{profile}", fetch,
+                    iterations=max(1, options.iterations // 10), warmup=1, args_iter=urls,
+                    standin_latency_ms=options.latency * 1000,
+                )
+            finally:
+                driver.quit()
+            result["content_ms_p50"] = percentile([s["content_ms"] for s in fetch_stats], 50)
+            result["bytes_transferred_p50"] = percentile([s["bytes_transferred"] for s in fetch_stats], 50)
+            results.append(result)
+
+    return results
@@ -0,0 +1,86 @@
+# benchmarks/bench_logging.py
+import itertools
+import json
+import logging
+import os
+
+from .corpus import generate_pages
+from .harness import measure
+
+# Fälten som extract_data_from_page loggade ett för ett på INFO
+FIELD_LABELS = (("full_name", "Full name"), ("age", "Age"), ("city", "City"), ("address", "Address"),
+                ("phone_number", "Phone number"), ("birthday", "Birthday"))
+
+
+def _logger(name: str, handler: logging.Handler) -> logging.Logger:
+    log = logging.getLogger(f"bench.logging.{name}")
+    log.handlers[:] = [handler]
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    return log
+
+
+def legacy_task_logging(log, url: str, data: dict):
+    """Loggningen i en skrapning före omläggningen: f-strängar, fält på INFO och hela posten som JSON."""
+    log.info(f"Starting scrape task for {data['full_name']} in {data['city']}")
+    log.info(f"Navigating to URL: {url}")
+    log.info(f"Page loaded successfully: merinfo-content after {812.0:.0f} ms, {48213} bytes transferred.")
+    for field, label in FIELD_LABELS:
+        log.info(f"{label} extracted: {data.get(field)}")
+    log.info(f"Data extracted successfully: {json.dumps(data, ensure_ascii=False)}")
+    log.info(f"Stored person {data['full_name']} with ID {42}")
+    log.info(f"Scraping and storing completed for {data['full_name']}")
+
+
+def structured_task_logging(log, url: str, data: dict):
+    """Samma skrapning med lat formatering, fälten på DEBUG och posten bara serialiserad för DEBUG."""
+    log.info("Starting scrape task for %s in %s", data['full_name'], data['city'])
+    log.info("Navigating to URL: %s", url)
+    log.info("Page loaded successfully: merinfo-content after %.0f ms, %s bytes transferred.", 812.0, 48213)
+    for field, label in FIELD_LABELS:
+        log.debug("%s extracted: %s", label, data.get(field))
+    log.info("Data extracted successfully for %s.", data.get('full_name'))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Extracted data: %s", json.dumps(data, ensure_ascii=False))
+    log.info("Stored person %s with ID %s", data['full_name'], 42)
+    log.info("Scraping and storing completed for %s", data['full_name'])
+
+
+def run(options):
+    from app.config import TextFormatter, JsonFormatter, bind_log_context, make_queue_handler, reset_log_context
+    from app.scraper import build_search_url, extract_page
+
+    tasks = [(build_search_url(*query), extract_page(html, engine="compiled"))
+             for query, html in generate_pages(options.corpus_size)]
+    devnull = open(os.devnull, "w", encoding="utf-8")
+    results = []
+    try:
+        # Före: synkron StreamHandler med textformat i den anropande tråden
+        sync_handler = logging.StreamHandler(devnull)
+        sync_handler.setFormatter(TextFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        legacy = _logger("legacy", sync_handler)
+        results.append(measure(
+            "logging.legacy_sync_text", lambda task: legacy_task_logging(legacy, *task),
+            iterations=options.iterations, args_iter=itertools.cycle(tasks),
+        ))
+
+        # Efter: JSON-poster via QueueHandler; skrivningen sker i QueueListener-tråden
+        json_handler = logging.StreamHandler(devnull)
+        json_handler.setFormatter(JsonFormatter())
+        queue_handler, listener = make_queue_handler(json_handler)
+        structured = _logger("structured", queue_handler)
+        token = bind_log_context(task_id="bench", query_hash="0123456789ab")
+        try:
+            results.append(measure(
+                "logging.structured_queue_json", lambda task: structured_task_logging(structured, *task),
+                iterations=options.iterations, args_iter=itertools.cycle(tasks),
+            ))
+        finally:
+            reset_log_context(token)
+            listener.stop()
+    finally:
+        devnull.close()
+
+    legacy_ms, structured_ms = results[0]["mean_ms"], results[1]["mean_ms"]
+    results[1]["saved_per_task_ms"] = legacy_ms - structured_ms
+    return results
@@ -0,0 +1,115 @@
+# benchmarks/bench_persist.py
+import random
+
+from sqlalchemy import event
+
+from .corpus import FIRST_NAMES, generate_queries, render_person_page
+from .harness import measure
+
+
+def _with_children(data: dict, rng: random.Random) -> dict:
+    """Lägg till syntetiska barnrader så att alla tabeller skrivs."""
+    last_name = data["full_name"].split()[-1]
+    return {
+        **data,
+        "cohabitants": [{"name": f"{rng.choice(FIRST_NAMES)} {last_name}", "age": str(rng.randint(1, 95))}
+                        for _ in range(rng.randint(1, 3))],
+        "vehicles": [{"make_model": "Volvo V70", "model_year": str(rng.randint(1995, 2024)),
+                      "owner": data["full_name"], "registration": f"ABC {rng.randint(100, 999)}"}],
+        "companies": [{"company_name": f"{last_name} Konsult AB", "position": "Styrelseledamot",
+                       "company_url": None}],
+    }
+
+
+def legacy_store(db, data: dict) -> dict:
+    """Den tidigare persistensen i scrape_and_store: fyra commits, refresh och omladdade relationer."""
+    from app.models import Person, Cohabitant, Vehicle, CompanyEngagement
+
+    existing = db.query(Person).filter(Person.full_name == data.get('full_name')).first()
+    if existing:
+        return existing.to_dict()
+    person = Person(**{k: data.get(k) for k in ("full_name", "age", "city", "address", "phone_number",
+                                                 "birthday", "national_id", "marital_status")})
+    db.add(person)
+    db.commit()
+    db.refresh(person)
+    for co in data.get('cohabitants', []):
+        db.add(Cohabitant(name=co['name'], age=co['age'], person_id=person.id))
+    db.commit()
+    for veh in data.get('vehicles', []):
+        db.add(Vehicle(make_model=veh['make_model'], model_year=veh.get('model_year'), owner=veh.get('owner'),
+                       registration=veh.get('registration'), person_id=person.id))
+    db.commit()
+    for comp in data.get('companies', []):
+        db.add(CompanyEngagement(company_name=comp['company_name'], position=comp.get('position'),
+                                 company_url=comp.get('company_url'), person_id=person.id))
+    db.commit()
+    return person.to_dict()
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def run(options):
+    from app import tasks
+    from app.database import Base, SessionLocal, engine
+    from app.extraction import extract
+    from app.persistence import save_person
+
+    Base.metadata.create_all(bind=engine)
+    counter = StatementCounter(engine)
+    rng = random.Random(options.seed)
+    total = options.iterations + 5
+
+    # Extrahera i förväg så att bara persistensen mäts; varje variant får egna unika namn
+    def scraped_batch(seed_offset: int):
+        queries = generate_queries(total, seed=options.seed + seed_offset)
+        return queries, [_with_children(extract(render_person_page(*q, seed=seed_offset)), rng)
+                         for q in queries]
+
+    results = []
+    for name, seed_offset, store in (
+        ("persist.legacy_four_commits", 1000, legacy_store),
+        ("persist.save_person", 2000, lambda db, data: save_person(db, data)),
+    ):
+        _, batch = scraped_batch(seed_offset)
+        # Gör namnen unika per variant så att båda mäter nyinsättningar
+        batch = [{**data, "full_name": f"{data['full_name']} {seed_offset}-{i}"} for i, data in enumerate(batch)]
+
+        def persist(data, store=store):
+            db = SessionLocal()
+            try:
+                store(db, data)
+            finally:
+                db.close()
+
+        before = counter.count
+        result = measure(name, persist, iterations=options.iterations, args_iter=iter(batch))
+        result["statements_per_person"] = (counter.count - before) / total
+        results.append(result)
+
+        if store is not legacy_store:
+            # Uppdateringskörning där inget ändrats: fingeravtrycket ska stoppa alla skrivningar
+            before = counter.count
+            result = measure(f"{name}_unchanged", persist, iterations=options.iterations, args_iter=iter(batch))
+            result["statements_per_person"] = (counter.count - before) / total
+            results.append(result)
+
+    queries, batch = scraped_batch(3000)
+    scraped = dict(zip(queries, batch))
+    original = tasks.scrape_merinfo
+    tasks.scrape_merinfo = lambda first, last, city, backend=None: scraped[(first, last, city)]
+    try:
+        results.append(measure(
+            "persist.scrape_and_store", lambda q: tasks.scrape_and_store.run(*q, refresh=True),
+            iterations=options.iterations, args_iter=iter(queries),
+        ))
+    finally:
+        tasks.scrape_merinfo = original
+    return results
@@ -0,0 +1,117 @@
+# benchmarks/bench_results.py
+import os
+import random
+import time
+import uuid
+
+from .bench_persist import _with_children
+from .corpus import generate_queries, render_person_page
+from .harness import summarize
+
+# Antal taskresultat som minnet räknas om till
+TASKS = 10_000
+
+# (resultatläge, serializer, komprimering)
+PROFILES = [
+    ("full", "json", None),
+    ("full", "msgpack", None),
+    ("full", "msgpack", "zlib"),
+    ("reference", "json", None),
+    ("reference", "msgpack", None),
+]
+
+
+def _people(count: int, seed: int = 0) -> list:
+    """Skrapade personer med barnrader, i samma form som save_person returnerar."""
+    from app.persistence import CHILD_SETS, PERSON_FIELDS
+    from app.scraper import extract_page
+
+    rng = random.Random(seed)
+    people = []
+    for i, query in enumerate(generate_queries(count, seed)):
+        data = _with_children(extract_page(render_person_page(*query, seed=seed), engine="compiled"), rng)
+        output = {"id": i + 1, **{field: data.get(field) for field in PERSON_FIELDS}}
+        output.update({key: data.get(key, []) for _, key, _ in CHILD_SETS})
+        people.append((query, output))
+    return people
+
+
+def _backend(url: str, serializer: str, compression: str):
+    from celery import Celery
+    from app.celery_app import RESULT_EXPIRES, compressed_serializer
+
+    app = Celery("bench-results", broker="memory://", backend=url)
+    app.conf.result_serializer = compressed_serializer(serializer, compression) if compression else serializer
+    app.conf.result_accept_content = [app.conf.result_serializer]
+    app.conf.result_expires = RESULT_EXPIRES
+    return app.backend
+
+
+def _results(mode: str, people: list) -> list:
+    from app import cache
+
+    if mode == "reference":
+        return [cache.reference(*query, output) for query, output in people]
+    return [output for _, output in people]
+
+
+def _profile_name(mode: str, serializer: str, compression: str) -> str:
+    return f"results.{mode}.{serializer}{'+' + compression if compression else ''}"
+
+
+def run(options):
+    people = _people(min(options.corpus_size, 200), options.seed)
+    results = []
+    for mode, serializer, compression in PROFILES:
+        # Storleken på det som lagras per task (resultat plus Celerys metadata), utan Redis
+        backend = _backend("cache+memory://", serializer, compression)
+        payloads = _results(mode, people)
+        sizes, samples = [], []
+        started = time.perf_counter()
+        for i in range(options.iterations):
+            result = payloads[i % len(payloads)]
+            t0 = time.perf_counter()
+            meta = backend._get_result_meta(result=result, state="SUCCESS", traceback=None, request=None)
+            meta["task_id"] = str(uuid.uuid4())
+            sizes.append(len(backend.encode(meta)))
+            samples.append(time.perf_counter() - t0)
+        wall_time = time.perf_counter() - started
+        results.append(summarize(
+            _profile_name(mode, serializer, compression), samples, wall_time, 0,
+            bytes_per_result=sum(sizes) / len(sizes),
+            payload_mb_per_10k=sum(sizes) / len(sizes) * TASKS / (1024 * 1024),
+        ))
+
+    # Verkligt Redis-minne per 10k resultat mäts bara mot en angiven testinstans
+    redis_url = os.getenv("BENCH_REDIS_URL")
+    if not redis_url:
+        results.append({"name": "results.redis_memory", "skipped": "BENCH_REDIS_URL not set"})
+        return results
+    results.extend(_measure_redis(redis_url, people))
+    return results
+
+
+def _measure_redis(redis_url: str, people: list) -> list:
+    import redis
+
+    client = redis.Redis.from_url(redis_url)
+    results = []
+    for mode, serializer, compression in PROFILES:
+        client.flushdb()
+        before = client.info("memory")["used_memory"]
+        backend = _backend(redis_url, serializer, compression)
+        payloads = _results(mode, people)
+        samples = []
+        started = time.perf_counter()
+        for i in range(TASKS):
+            t0 = time.perf_counter()
+            backend.store_result(str(uuid.uuid4()), payloads[i % len(payloads)], "SUCCESS")
+            samples.append(time.perf_counter() - t0)
+        wall_time = time.perf_counter() - started
+        used = client.info("memory")["used_memory"] - before
+        results.append(summarize(
+            f"{_profile_name(mode, serializer, compression)}.redis", samples, wall_time, 0,
+            redis_mb_per_10k=used / (1024 * 1024), keys=client.dbsize(),
+        ))
+    client.flushdb()
+    return results
@@ -0,0 +1,67 @@
+# benchmarks/bench_startup.py
+import json
+import os
+import subprocess
+import sys
+
+from .harness import summarize
+
+_PROBE = """
+import json, resource, sys, time
+t0 = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - t0
+print(json.dumps({
+    "import_s": elapsed,
+    "maxrss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "worker_only": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def _run_probe(extra_args=()):
+    from app.celery_app import WORKER_ONLY_MODULES
+
+    completed = subprocess.run(
+        [sys.executable, *extra_args, "-c", _PROBE % (WORKER_ONLY_MODULES,)],
+        capture_output=True, text=True, check=True, env=os.environ.copy(),
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1]), completed.stderr
+
+
+def parse_importtime(stderr: str, top: int = 15):
+    """Tyngsta moduler enligt `python -X importtime` (kumulativ tid i ms)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line.split(":", 1)[1].split("|")]
+        rows.append((name, int(self_us) / 1000, int(cumulative_us) / 1000))
+    total_self_ms = sum(self_ms for _, self_ms, _ in rows)
+    heaviest = sorted(rows, key=lambda row: row[2], reverse=True)[:top]
+    return total_self_ms, [{"module": n, "self_ms": s, "cumulative_ms": c} for n, s, c in heaviest]
+
+
+def run(options):
+    samples, rss, worker_only = [], [], set()
+    for _ in range(options.startup_runs):
+        probe, _ = _run_probe()
+        samples.append(probe["import_s"])
+        rss.append(probe["maxrss_kb"] * 1024)
+        worker_only.update(probe["worker_only"])
+
+    _, stderr = _run_probe(["-X", "importtime"])
+    importtime_total_ms, heaviest = parse_importtime(stderr)
+
+    result = summarize("startup.import_app_main", samples, sum(samples), max(rss),
+                       importtime_total_ms=importtime_total_ms, heaviest_imports=heaviest,
+                       worker_only_modules=sorted(worker_only))
+    failures = []
+    if worker_only:
+        failures.append(f"worker-only modules imported: {', '.join(sorted(worker_only))}")
+    if result["p50_ms"] > options.startup_max_ms:
+        failures.append(f"p50 import time {result['p50_ms']:.0f} ms > {options.startup_max_ms:.0f} ms")
+    if result["peak_rss_mb"] > options.startup_max_rss_mb:
+        failures.append(f"peak RSS {result['peak_rss_mb']:.0f} MB > {options.startup_max_rss_mb:.0f} MB")
+    result["guard_failures"] = failures
+    return [result]
@@ -0,0 +1,135 @@
+# benchmarks/corpus.py
+import glob
+import hashlib
+import os
+import random
+from html import escape
+
+SAVED_PAGES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "testdata", "merinfo"
+)
+
+# Syntetiska, anonymiserade värden – inga verkliga personer
+FIRST_NAMES = ["Anna", "Erik", "Maria", "Lars", "Karin", "Per", "Eva", "Johan", "Sara", "Carl-Filip",
+               "Åsa", "Björn", "Ingrid", "Mikael", "Elin", "Gustav", "Linnéa", "Oskar", "Märta", "Nils"]
+LAST_NAMES = ["Andersson", "Johansson", "Karlsson", "Nilsson", "Eriksson", "Larsson", "Olsson",
+              "Persson", "Svensson", "Gustafsson", "Grönlund", "Öberg", "Åberg", "Lindström", "Hedlund"]
+CITIES = ["Borlänge", "Falun", "Stockholm", "Göteborg", "Malmö", "Uppsala", "Umeå", "Östersund",
+          "Kiruna", "Västerås", "Örebro", "Luleå"]
+STREETS = ["Storgatan", "Kalkstensgatan", "Ringvägen", "Skolgatan", "Björkvägen", "Kyrkogatan"]
+MONTHS = ["januari", "februari", "mars", "april", "maj", "juni", "juli", "augusti", "september",
+          "oktober", "november", "december"]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="sv">
+<head>
+  <meta charset="utf-8">
+  <title>{name}, {age} år, {city} - Merinfo.se</title>
+  <link rel="stylesheet" href="/css/app.css">
+  <script src="/js/app.js" defer></script>
+</head>
+<body>
+  <header class="mi-header"><nav>{nav}</nav></header>
+  <div id="merinfo-content">
+    <div class="mi-flex mi-flex-col">
+      <h1 class="mi-text-xl"><span class="namn">{name}</span></h1>
+      <span class="mi-text-sm">{gender}</span>
+      <span class="mi-text-sm">{age} år</span>
+      <span dusk="summery-city">{city}</span>
+      <address class="mi-not-italic">
+        {street} {number}<br>
+        {postcode} {city}
+      </address>
+      {phone}
+      <p><span class="mi-font-bold">Fyller</span> {day}:e {month} ({next_age} år)</p>
+      <div dusk="summery-pnr">{birth_year}{month_no:02d}{day:02d}-XXXX</div>
+    </div>
+    <h3>Personer som bor på adressen</h3>
+    <ul>{cohabitants}</ul>
+    <h3>Fordon på adressen</h3>
+    <table>{vehicles}</table>
+  </div>
+  <footer>{footer}</footer>
+</body>
+</html>
+"""
+
+JS_ONLY_TEMPLATE = """<!DOCTYPE html>
+<html lang="sv"><head><meta charset="utf-8"><title>Merinfo.se</title></head>
+<body><div id="app"></div><script src="/js/app.js"></script></body></html>
+"""
+
+
+def _rng_for(key: str, seed: int = 0) -> random.Random:
+    digest = hashlib.sha256(f"{seed}:{key}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def render_person_page(first_name: str, last_name: str, city: str, seed: int = 0) -> str:
+    """Rendera en deterministisk Merinfo-liknande personsida för en sökning."""
+    rng = _rng_for(f"{first_name}|{last_name}|{city}", seed)
+    age = rng.randint(18, 95)
+    month_no = rng.randint(1, 12)
+    phone = (
+        f'<a href="tel:07{rng.randint(0, 9)}{rng.randint(1000000, 9999999)}" class="mi-text-primary">'
+        f'07{rng.randint(0, 9)}-{rng.randint(100, 999)} {rng.randint(10, 99)} {rng.randint(10, 99)}</a>'
+        if rng.random() < 0.8 else ""
+    )
+    cohabitants = "".join(
+        f"<li>{escape(rng.choice(FIRST_NAMES))} {escape(last_name)}, {rng.randint(1, 95)} år</li>"
+        for _ in range(rng.randint(0, 4))
+    )
+    vehicles = "".join(
+        f"<tr><td>Volvo V{rng.choice([40, 60, 70, 90])}</td><td>{rng.randint(1995, 2024)}</td></tr>"
+        for _ in range(rng.randint(0, 3))
+    )
+    # Sidbrus i samma storleksordning som riktiga sidor (navigering, sidfot)
+    nav = "".join(f'<a href="/kategori/{i}" class="mi-link">Kategori {i}</a>' for i in range(40))
+    footer = "".join(f"<p class='mi-text-xs'>Information {i} om tjänsten.</p>" for i in range(30))
+    return PAGE_TEMPLATE.format(
+        name=escape(f"{first_name} {last_name}"),
+        gender=rng.choice(["Man", "Kvinna"]),
+        age=age,
+        next_age=age + 1,
+        city=escape(city),
+        street=rng.choice(STREETS),
+        number=rng.randint(1, 120),
+        postcode=f"{rng.randint(100, 999)} {rng.randint(10, 99)}",
+        phone=phone,
+        day=rng.randint(1, 28),
+        month=MONTHS[month_no - 1],
+        month_no=month_no,
+        birth_year=2024 - age,
+        cohabitants=cohabitants,
+        vehicles=vehicles,
+        nav=nav,
+        footer=footer,
+    )
+
+
+def generate_queries(count: int, seed: int = 0):
+    """Deterministisk lista med unika (förnamn, efternamn, stad)."""
+    rng = random.Random(seed)
+    queries, seen = [], set()
+    while len(queries) < count:
+        query = (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.choice(CITIES))
+        if query in seen:
+            # Kombinationerna tar slut vid stora korpusar; gör namnen unika med ett suffix
+            query = (query[0], f"{query[1]}-{len(queries)}", query[2])
+        seen.add(query)
+        queries.append(query)
+    return queries
+
+
+def generate_pages(count: int, seed: int = 0):
+    """Lista med (query, html) för syntetiska sidor."""
+    return [(q, render_person_page(*q, seed=seed)) for q in generate_queries(count, seed)]
+
+
+def load_saved_pages():
+    """Sparade (anonymiserade) sidor som också används av extraktionens differentialtest."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(SAVED_PAGES_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
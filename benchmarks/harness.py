@@ -0,0 +1,149 @@
+# benchmarks/harness.py
+import json
+import os
+import platform
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime, timezone
+
+import psutil
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class RssSampler:
+    """Samplar processens RSS i en bakgrundstråd och håller reda på toppvärdet."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+
+def percentile(samples, pct: float) -> float:
+    """Percentil med linjär interpolation över sorterade mätvärden."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def summarize(name: str, samples, wall_time: float, peak_rss: int, **extra) -> dict:
+    samples_ms = [s * 1000 for s in samples]
+    return {
+        "name": name,
+        "iterations": len(samples),
+        "mean_ms": statistics.fmean(samples_ms) if samples_ms else 0.0,
+        "p50_ms": percentile(samples_ms, 50),
+        "p95_ms": percentile(samples_ms, 95),
+        "p99_ms": percentile(samples_ms, 99),
+        "throughput_per_s": len(samples) / wall_time if wall_time else 0.0,
+        "peak_rss_mb": peak_rss / (1024 * 1024),
+        **extra,
+    }
+
+
+def measure(name: str, func, iterations: int = 200, warmup: int = 5, args_iter=None, **extra) -> dict:
+    """Kör func upprepade gånger och returnera latens-, genomströmnings- och minnessammanfattning.
+
+    Om args_iter anges anropas func med nästa värde ur iteratorn vid varje körning.
+    """
+    next_args = (lambda: (next(args_iter),)) if args_iter is not None else (lambda: ())
+    for _ in range(warmup):
+        func(*next_args())
+
+    samples = []
+    with RssSampler() as sampler:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            args = next_args()
+            t0 = time.perf_counter()
+            func(*args)
+            samples.append(time.perf_counter() - t0)
+        wall_time = time.perf_counter() - started
+    return summarize(name, samples, wall_time, sampler.peak, **extra)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def save_results(results, output: str = None) -> str:
+    """Spara resultaten som JSON tillsammans med commit och miljö."""
+    commit = _git_commit()
+    now = datetime.now(timezone.utc)
+    payload = {
+        "meta": {
+            "commit": commit,
+            "timestamp": now.isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{now.strftime('%Y%m%dT%H%M%S')}-{commit}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    return output
+
+
+def load_results(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        payload = json.load(f)
+    return {r["name"]: r for r in payload["results"]}
+
+
+def compare(baseline_path: str, current_path: str, metric: str = "p95_ms", threshold: float = 0.10):
+    """Jämför två resultatfiler; returnerar rader och namnen på regressioner över tröskeln."""
+    baseline = load_results(baseline_path)
+    current = load_results(current_path)
+    rows, regressions = [], []
+    for name in sorted(set(baseline) | set(current)):
+        before = baseline.get(name, {}).get(metric)
+        after = current.get(name, {}).get(metric)
+        change = (after - before) / before if before and after is not None else None
+        rows.append((name, before, after, change))
+        if change is not None and change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def format_table(results) -> str:
+    header = f"{'benchmark':<40} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ops/s':>10} {'rss MB':>8}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['name']:<40} {r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} "
+            f"{r['throughput_per_s']:>10.1f} {r['peak_rss_mb']:>8.1f}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,615 @@
+# benchmarks/loadtest.py
+"""Lasttest av hela kedjan API → Redis → Celery → databas mot den lokala ersättaren.
+
+Ersättaren, Redis, uvicorn och en Celery-worker startas som egna processer och
+/scrape-person/ drivs av en asynkron klient med stigande ankomsttakt (Poisson-ankomster,
+öppen modell). Varje förfrågan följs via /task-events till slutläget, så latensen räknas
+från köningen till resultatet. CPU och minne samplas per komponent med psutil och
+workerns Prometheus-värden ger databasens och webbläsarens tid per task.
+
+Rapporten innehåller en kapacitetsmodell (Littles lag, L = λ·W): tjänstetid per task och
+komponent, vilken komponent som mättas först och hur många worker-platser, API-processer
+och Chrome-instanser som behövs för en given takt.
+
+    python -m benchmarks.loadtest --rates 2,5,10,20 --stage-seconds 30 --worker-concurrency 4
+
+Redis tas från --redis-url, annars startas redis-server om den finns och i sista hand
+fakeredis i en egen process (fungerar, men Redis-siffrorna är då inte representativa;
+kräver requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import psutil
+
+from .corpus import generate_queries
+from .harness import percentile, save_results, summarize
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# En takt räknas som mättad när färre än så här stor andel av ankomsterna hinner bli klara
+SATURATION_RATIO = 0.9
+MAX_ERROR_RATIO = 0.01
+
+# Workerns histogram som ger tid per komponent (summa och antal per steg)
+WORKER_METRICS = {
+    "persist": "scraper_persist_seconds",
+    "driver_get": "scraper_driver_get_seconds",
+    "driver_wait": "scraper_driver_wait_seconds",
+    "extract": "scraper_extract_seconds",
+}
+
+COMPONENTS = ["api", "worker", "chrome", "redis", "standin", "client"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for(check, timeout: float, what: str):
+    deadline = time.monotonic() + timeout
+    last_error = None
+    while time.monotonic() < deadline:
+        try:
+            if check():
+                return
+        except Exception as e:
+            last_error = e
+        time.sleep(0.2)
+    raise RuntimeError(f"{what} did not become ready within {timeout:.0f} s: {last_error}")
+
+
+class Stack:
+    """Startar och stoppar ersättaren, Redis, API:t och workern som underprocesser."""
+
+    def __init__(self, options, workdir: str):
+        self.options = options
+        self.workdir = workdir
+        self.processes = {}
+        self.redis_kind = None
+        self.standin_url = None
+        self.api_url = None
+        self.redis_url = None
+        self.metrics_url = None
+
+    def _spawn(self, name: str, command: list, env: dict = None):
+        log = open(os.path.join(self.workdir, f"{name}.log"), "wb")
+        self.processes[name] = subprocess.Popen(
+            command, cwd=ROOT_DIR, env={**os.environ, **(env or {})}, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+    def _start_redis(self):
+        if self.options.redis_url:
+            self.redis_url, self.redis_kind = self.options.redis_url, "external"
+            return
+        port = _free_port()
+        self.redis_url = f"redis://127.0.0.1:{port}/0"
+        if shutil.which("redis-server"):
+            self.redis_kind = "redis-server"
+            self._spawn("redis", ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"])
+        else:
+            self.redis_kind = "fakeredis"
+            self._spawn("redis", [
+                sys.executable, "-c",
+                f"from fakeredis import TcpFakeServer; TcpFakeServer(('127.0.0.1', {port})).serve_forever()",
+            ])
+
+    def app_environment(self) -> dict:
+        options = self.options
+        return {
+            "CELERY_BROKER_URL": self.redis_url,
+            "CELERY_RESULT_BACKEND": self.redis_url,
+            "REDIS_URL": self.redis_url,
+            "DATABASE_URL": options.database_url or f"sqlite:///{os.path.join(self.workdir, 'loadtest.db')}",
+            "MERINFO_BASE_URL": self.standin_url,
+            "FETCH_BACKEND": options.fetch_backend,
+            "PIPELINE_MODE": options.pipeline_mode,
+            "CACHE_TIERS": options.cache_tiers,
+            "ARCHIVE_DIR": os.path.join(self.workdir, "archive"),
+            "LOG_LEVEL": options.log_level,
+            "DRIVER_POOL_SIZE": str(options.driver_pool_size),
+            "SENTRY_DSN": "",
+        }
+
+    def start(self) -> "Stack":
+        options = self.options
+        port = _free_port()
+        self.standin_url = f"http://127.0.0.1:{port}"
+        self._spawn("standin", [
+            sys.executable, "-m", "benchmarks.standin", "--port", str(port),
+            "--latency", str(options.latency), "--jitter", str(options.jitter),
+            "--js-fraction", str(options.js_fraction),
+        ])
+        self._start_redis()
+        _wait_for(lambda: httpx.get(f"{self.standin_url}/search?q=a+b+c").status_code == 200, 30, "Stand-in")
+        _wait_for(lambda: self._redis().ping(), 30, "Redis")
+        self._redis().flushdb()
+
+        # API:t först, så att det skapar schemat innan workern ansluter
+        env = self.app_environment()
+        api_port = _free_port()
+        self.api_url = f"http://127.0.0.1:{api_port}"
+        self._spawn("api", [
+            sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(api_port),
+            "--workers", str(options.api_workers), "--log-level", "warning", "--no-access-log",
+        ], env)
+        _wait_for(lambda: httpx.get(f"{self.api_url}/coalescing-stats/").status_code == 200, 60, "API")
+
+        from app.celery_app import QUEUE_DEFAULT, QUEUE_FETCH, QUEUE_PARSE, QUEUE_PERSIST
+
+        metrics_port = _free_port()
+        self.metrics_url = f"http://127.0.0.1:{metrics_port}/metrics"
+        self._spawn("worker", [
+            sys.executable, "-m", "celery", "-A", "app.celery_worker.celery_app", "worker",
+            "--pool", "prefork", "--concurrency", str(options.worker_concurrency), "--prefetch-multiplier", "1",
+            "-Q", ",".join([QUEUE_DEFAULT, QUEUE_FETCH, QUEUE_PARSE, QUEUE_PERSIST]),
+            "--loglevel", options.log_level, "--without-gossip", "--without-mingle", "--without-heartbeat",
+        ], {**env, "METRICS_PORT": str(metrics_port),
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(self.workdir, "prometheus")})
+        _wait_for(lambda: httpx.get(self.metrics_url).status_code == 200, 60, "Worker metrics")
+        return self
+
+    def _redis(self):
+        import redis
+        return redis.Redis.from_url(self.redis_url, socket_timeout=5)
+
+    def roots(self) -> dict:
+        """Komponent -> rotprocess; Chrome räknas ur workerns processträd."""
+        roots = {name: psutil.Process(p.pid) for name, p in self.processes.items()}
+        roots["client"] = psutil.Process()
+        return roots
+
+    def stop(self):
+        for process in reversed(list(self.processes.values())):
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def __enter__(self):
+        try:
+            return self.start()
+        except Exception:
+            self.stop()
+            raise
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _tree(root: psutil.Process) -> list:
+    try:
+        return [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+
+class UtilisationSampler:
+    """Samplar CPU-sekunder och RSS per komponent samt kö-djup i en bakgrundstråd."""
+
+    def __init__(self, roots: dict, redis_client, queues: list, inflight, interval: float = 0.5):
+        self.roots = roots
+        self.redis = redis_client
+        self.queues = queues
+        self.inflight = inflight
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        # Samma Process-objekt mellan samplingarna; psutil cachar då inget i onödan
+        self._known = {}
+
+    def _process(self, p: psutil.Process) -> psutil.Process:
+        return self._known.setdefault(p.pid, p)
+
+    def sample(self) -> dict:
+        cpu = dict.fromkeys(COMPONENTS, 0.0)
+        rss = dict.fromkeys(COMPONENTS, 0)
+        chrome_processes = 0
+        for name, root in self.roots.items():
+            for p in _tree(root):
+                p = self._process(p)
+                try:
+                    group = "chrome" if name == "worker" and "chrome" in p.name().lower() else name
+                    times = p.cpu_times()
+                    cpu[group] += times.user + times.system
+                    rss[group] += p.memory_info().rss
+                except psutil.Error:
+                    continue
+                chrome_processes += group == "chrome"
+        try:
+            pipe = self.redis.pipeline()
+            for queue in self.queues:
+                pipe.llen(queue)
+            queue_depth = sum(pipe.execute())
+        except Exception:
+            queue_depth = None
+        return {"t": time.perf_counter(), "cpu": cpu, "rss": rss, "queue_depth": queue_depth,
+                "chrome_processes": chrome_processes, "inflight": self.inflight()}
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append(self.sample())
+            self._stop.wait(self.interval)
+
+    def window(self, start: float, end: float) -> list:
+        return [s for s in self.samples if start <= s["t"] <= end]
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _read_worker_metrics(url: str) -> dict:
+    """Summa och antal för workerns histogram (alla etiketter sammanslagna)."""
+    from prometheus_client.parser import text_string_to_metric_families
+
+    totals = {key: [0.0, 0.0] for key in WORKER_METRICS}
+    names = {name: key for key, name in WORKER_METRICS.items()}
+    try:
+        text = httpx.get(url, timeout=10).text
+    except httpx.HTTPError:
+        return totals
+    for family in text_string_to_metric_families(text):
+        key = names.get(family.name)
+        if key is None:
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_sum"):
+                totals[key][0] += sample.value
+            elif sample.name.endswith("_count"):
+                totals[key][1] += sample.value
+    return totals
+
+
+class Request:
+    __slots__ = ("stage", "posted", "accepted", "started", "finished", "cache", "error")
+
+    def __init__(self, stage: int, posted: float):
+        self.stage = stage
+        self.posted = posted
+        self.accepted = self.started = self.finished = None
+        self.cache = None
+        self.error = None
+
+
+async def _follow(client: httpx.AsyncClient, task_id: str, request: Request, timeout: float):
+    """Läs /task-events tills slutläget; STARTED-händelsen skiljer kötid från tjänstetid."""
+    async with client.stream("GET", f"/task-events/{task_id}", timeout=timeout) as response:
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+                if event == "started" and request.started is None:
+                    request.started = time.perf_counter()
+                elif event in ("success", "failure"):
+                    request.finished = time.perf_counter()
+                    if event == "failure":
+                        request.error = "task failed"
+                    return
+    request.error = "event stream ended"
+
+
+async def _submit(client: httpx.AsyncClient, payload: dict, request: Request, timeout: float):
+    try:
+        response = await client.post("/scrape-person/", json=payload, timeout=timeout)
+        request.accepted = time.perf_counter()
+        response.raise_for_status()
+        request.cache = response.headers.get("X-Cache")
+        if request.cache in ("fresh", "stale"):
+            request.finished = request.accepted
+            return
+        await asyncio.wait_for(_follow(client, response.json()["task_id"], request, timeout), timeout)
+    except asyncio.TimeoutError:
+        request.error = "timeout"
+    except (httpx.HTTPError, KeyError, ValueError) as e:
+        request.error = type(e).__name__
+
+
+async def _drive(api_url: str, rates: list, options, on_stage, requests: list):
+    """Öppen modell: ankomsterna följer takten oavsett hur snabbt systemet svarar."""
+    rng = random.Random(options.seed)
+    total = int(sum(rates) * options.stage_seconds * 1.5) + 10
+    queries = iter(generate_queries(total, options.seed))
+    tasks = set()
+    limits = httpx.Limits(max_connections=options.max_inflight * 2, max_keepalive_connections=options.max_inflight)
+    async with httpx.AsyncClient(base_url=api_url, limits=limits) as client:
+        for stage, rate in enumerate(rates):
+            on_stage(stage, time.perf_counter())
+            stage_end = time.perf_counter() + options.stage_seconds
+            next_arrival = time.perf_counter()
+            while True:
+                next_arrival += rng.expovariate(rate)
+                if next_arrival >= stage_end:
+                    break
+                await asyncio.sleep(max(0.0, next_arrival - time.perf_counter()))
+                request = Request(stage, time.perf_counter())
+                requests.append(request)
+                if len(tasks) >= options.max_inflight:
+                    request.error = "client limit"
+                    continue
+                first, last, city = next(queries)
+                task = asyncio.create_task(_submit(
+                    client, {"first_name": first, "last_name": last, "city": city}, request, options.timeout,
+                ))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(max(0.0, stage_end - time.perf_counter()))
+        on_stage(len(rates), time.perf_counter())
+        # Låt det som redan är köat bli klart; det räknas till sitt ankomststeg
+        if tasks:
+            await asyncio.wait(set(tasks), timeout=options.timeout)
+        for task in tasks:
+            task.cancel()
+
+
+def _mean(values) -> float:
+    return statistics.fmean(values) if values else 0.0
+
+
+def _stage_result(stage: int, rate: float, requests: list, window: tuple, samples: list,
+                  metrics_before: dict, metrics_after: dict, options) -> dict:
+    start, end = window
+    arrived = [r for r in requests if r.stage == stage]
+    done = [r for r in arrived if r.finished is not None and r.error is None]
+    errors = [r for r in arrived if r.error is not None]
+    completed_in_window = sum(1 for r in requests if r.finished is not None and start <= r.finished < end)
+    duration = end - start
+
+    e2e = [r.finished - r.posted for r in done]
+    result = summarize(f"loadtest.rate_{rate:g}", e2e, duration, max((sum(s["rss"].values()) for s in samples),
+                                                                    default=0))
+    # Genomströmning = uppgifter klara under stegets fönster, inte ankomster
+    result["throughput_per_s"] = completed_in_window / duration if duration else 0.0
+    started = [r for r in done if r.started is not None]
+    result.update({
+        "offered_rate": rate,
+        "arrived": len(arrived),
+        "completed": len(done),
+        "errors": len(errors),
+        "error_kinds": {kind: sum(1 for r in errors if r.error == kind) for kind in {r.error for r in errors}},
+        "cache_hits": sum(1 for r in done if r.cache in ("fresh", "stale")),
+        "enqueue_p50_ms": percentile([(r.accepted - r.posted) * 1000 for r in done], 50),
+        "enqueue_p95_ms": percentile([(r.accepted - r.posted) * 1000 for r in done], 95),
+        "queue_wait_p50_ms": percentile([(r.started - r.posted) * 1000 for r in started], 50),
+        "queue_wait_p95_ms": percentile([(r.started - r.posted) * 1000 for r in started], 95),
+        "service_mean_ms": _mean([(r.finished - r.started) * 1000 for r in started]),
+        "service_p95_ms": percentile([(r.finished - r.started) * 1000 for r in started], 95),
+    })
+
+    # CPU i kärnor per komponent under fönstret
+    if len(samples) >= 2:
+        first, last = samples[0], samples[-1]
+        elapsed = last["t"] - first["t"]
+        result["cpu_cores"] = {c: (last["cpu"][c] - first["cpu"][c]) / elapsed for c in COMPONENTS}
+        result["cpu_seconds"] = {c: last["cpu"][c] - first["cpu"][c] for c in COMPONENTS}
+    else:
+        result["cpu_cores"] = result["cpu_seconds"] = dict.fromkeys(COMPONENTS, 0.0)
+    result["rss_mb"] = {c: max((s["rss"][c] for s in samples), default=0) / (1024 * 1024) for c in COMPONENTS}
+    depths = [s["queue_depth"] for s in samples if s["queue_depth"] is not None]
+    result["queue_depth_mean"] = _mean(depths)
+    result["queue_depth_max"] = max(depths, default=0)
+    result["chrome_processes_max"] = max((s["chrome_processes"] for s in samples), default=0)
+    result["inflight_mean"] = _mean([s["inflight"] for s in samples])
+    # Littles lag: i systemet i snitt = genomströmning × tid i systemet
+    result["littles_law_inflight"] = result["throughput_per_s"] * result["mean_ms"] / 1000
+
+    result["worker_seconds"] = {key: metrics_after[key][0] - metrics_before[key][0] for key in WORKER_METRICS}
+    result["worker_counts"] = {key: metrics_after[key][1] - metrics_before[key][1] for key in WORKER_METRICS}
+    # Jämför med faktiska ankomster: Poisson-takten avviker från den nominella i korta steg
+    result["arrival_rate"] = len(arrived) / duration if duration else 0.0
+    result["saturated"] = (
+        len(done) < SATURATION_RATIO * len(arrived)
+        or result["throughput_per_s"] < SATURATION_RATIO * result["arrival_rate"]
+        or len(errors) > MAX_ERROR_RATIO * max(len(arrived), 1)
+    )
+    return result
+
+
+def capacity_model(stages: list, options) -> dict:
+    """Tjänstetid per task och komponent ur det högsta omättade steget, och dimensionering."""
+    measured = [s for s in stages if s["completed"]]
+    if not measured:
+        return {"name": "loadtest.capacity", "skipped": "no completed requests"}
+    healthy = [s for s in measured if not s["saturated"]]
+    basis = max(healthy or measured, key=lambda s: s["throughput_per_s"])
+    tasks = max(basis["throughput_per_s"] * options.stage_seconds, 1)
+    seconds, counts = basis["worker_seconds"], basis["worker_counts"]
+
+    # Tjänstebehov D per task (sekunder) – CPU per komponent, SQLite-skrivning och webbläsartid
+    demand = {f"{c}_cpu": basis["cpu_seconds"][c] / tasks for c in ("api", "worker", "chrome", "redis")}
+    # Från STARTED till slutläget; i pipelineläget ingår även väntan mellan stegens köer
+    demand["worker_slot"] = basis["service_mean_ms"] / 1000
+    # Växer kön i brokern är det workerplatserna som mättats; då ger genomströmningen där
+    # den effektiva platstiden inklusive hämtning från kön, kvittering och resultatlagring
+    backlogged = [s for s in stages if s["saturated"] and s["queue_depth_mean"] >= 1 and s["throughput_per_s"]]
+    observed_max = max((s["throughput_per_s"] for s in backlogged), default=None)
+    if observed_max:
+        demand["worker_slot"] = max(demand["worker_slot"], options.worker_concurrency / observed_max)
+    demand["db_write"] = seconds["persist"] / counts["persist"] if counts["persist"] else 0.0
+    browser_fetches = counts["driver_get"]
+    browser_fraction = min(browser_fetches / tasks, 1.0)
+    browser_time = (seconds["driver_get"] + seconds["driver_wait"]) / browser_fetches if browser_fetches else 0.0
+    demand["browser"] = browser_fraction * browser_time
+
+    # Största takt varje komponent klarar med nuvarande uppsättning (X_max = kapacitet / D)
+    cpu_total = sum(demand[f"{c}_cpu"] for c in ("api", "worker", "chrome", "redis"))
+    browsers = options.worker_concurrency * options.driver_pool_size
+    limits = {
+        "worker_pool": options.worker_concurrency / demand["worker_slot"] if demand["worker_slot"] else None,
+        "api": options.api_workers / demand["api_cpu"] if demand["api_cpu"] else None,
+        "redis": 1 / demand["redis_cpu"] if demand["redis_cpu"] else None,
+        "host_cpu": (os.cpu_count() or 1) / cpu_total if cpu_total else None,
+        "chrome": browsers / demand["browser"] if demand["browser"] else None,
+    }
+    if options.database_url is None or options.database_url.startswith("sqlite"):
+        # SQLite har en skrivare åt gången
+        limits["sqlite"] = 1 / demand["db_write"] if demand["db_write"] else None
+    known = {k: v for k, v in limits.items() if v}
+    bottleneck = min(known, key=known.get) if known else None
+
+    target, rho = options.target_rate, options.target_utilisation
+    saturated = [s["offered_rate"] for s in stages if s["saturated"]]
+    return {
+        "name": "loadtest.capacity",
+        "basis_rate": basis["offered_rate"],
+        "first_saturated_rate": min(saturated) if saturated else None,
+        "observed_max_rate": observed_max,
+        "service_demand_ms": {k: v * 1000 for k, v in demand.items()},
+        "browser_fraction": browser_fraction,
+        "max_rate_per_component": limits,
+        "bottleneck": bottleneck,
+        "target_rate": target,
+        "target_utilisation": rho,
+        # Littles lag: upptagna platser = λ × D; dela med ρ för marginal mot kötillväxt
+        "sizing": {
+            "worker_slots": math.ceil(target * demand["worker_slot"] / rho),
+            "chrome_instances": math.ceil(target * demand["browser"] / rho),
+            "api_processes": max(1, math.ceil(target * demand["api_cpu"] / rho)),
+            "cpu_cores": math.ceil(target * cpu_total / rho),
+            "redis_utilisation": target * demand["redis_cpu"],
+            "db_write_utilisation": target * demand["db_write"],
+        },
+    }
+
+
+def format_report(stages: list, capacity: dict, stack_info: dict) -> str:
+    lines = [f"Stack: {', '.join(f'{k}={v}' for k, v in stack_info.items())}", ""]
+    header = (f"{'rate/s':>7} {'done/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'wait p95':>9} "
+              f"{'svc ms':>8} {'err':>5} {'queue':>6} {'L obs':>6} {'L=XW':>6}  cpu cores (api/worker/chrome/redis)")
+    lines += [header, "-" * len(header)]
+    for s in stages:
+        cpu = s["cpu_cores"]
+        lines.append(
+            f"{s['offered_rate']:>7g} {s['throughput_per_s']:>7.1f} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} "
+            f"{s['p99_ms']:>9.1f} {s['queue_wait_p95_ms']:>9.1f} {s['service_mean_ms']:>8.1f} {s['errors']:>5} "
+            f"{s['queue_depth_mean']:>6.1f} {s['inflight_mean']:>6.1f} {s['littles_law_inflight']:>6.1f}  "
+            f"{cpu['api']:.2f}/{cpu['worker']:.2f}/{cpu['chrome']:.2f}/{cpu['redis']:.2f}"
+            f"{'  saturated' if s['saturated'] else ''}"
+        )
+    if "skipped" in capacity:
+        lines.append(f"Capacity model skipped: {capacity['skipped']}")
+        return "\n".join(lines)
+
+    observed = capacity["observed_max_rate"]
+    lines += ["", f"Capacity model (basis: {capacity['basis_rate']:g} req/s, "
+                  f"first saturated: {capacity['first_saturated_rate'] or 'none'}, "
+                  f"observed max with backlog: {f'{observed:.1f}' if observed else 'none'}):"]
+    for key, value in capacity["service_demand_ms"].items():
+        lines.append(f"  demand {key:<14} {value:10.2f} ms/task")
+    for key, value in capacity["max_rate_per_component"].items():
+        marker = "  <- bottleneck" if key == capacity["bottleneck"] else ""
+        lines.append(f"  max rate {key:<12} {value:10.1f} req/s{marker}" if value else f"  max rate {key:<12} {'-':>10}")
+    lines.append(f"  Sizing for {capacity['target_rate']:g} req/s at {capacity['target_utilisation']:.0%} utilisation:")
+    for key, value in capacity["sizing"].items():
+        lines.append(f"    {key:<22} {value:.0%}" if key.endswith("utilisation") else f"    {key:<22} {value}")
+    if stack_info.get("redis") == "fakeredis":
+        lines.append("  Note: Redis was fakeredis; its CPU demand and limit are not representative of redis-server.")
+    return "\n".join(lines)
+
+
+def run(options) -> list:
+    rates = [float(r) for r in options.rates.split(",")]
+    workdir = tempfile.mkdtemp(prefix="intellifetch-loadtest-")
+    stages, boundaries, metrics_at = [], [], []
+    with Stack(options, workdir) as stack:
+        from app.celery_app import QUEUE_DEFAULT, QUEUE_FETCH, QUEUE_PARSE, QUEUE_PERSIST
+
+        # Värm upp hela kedjan (importer, pooler, schema) innan mätningen
+        warmup = Request(-1, time.perf_counter())
+
+        async def warm():
+            async with httpx.AsyncClient(base_url=stack.api_url) as client:
+                await _submit(client, {"first_name": "Uppvärmning", "last_name": "Test", "city": "Borlänge"},
+                              warmup, options.timeout)
+
+        asyncio.run(warm())
+        if warmup.error:
+            raise RuntimeError(f"Warm-up request failed ({warmup.error}); see logs in {workdir}")
+
+        roots = stack.roots()
+        queues = [QUEUE_DEFAULT, QUEUE_FETCH, QUEUE_PARSE, QUEUE_PERSIST]
+
+        def on_stage(stage: int, at: float):
+            boundaries.append(at)
+            metrics_at.append(_read_worker_metrics(stack.metrics_url))
+
+        requests = []
+
+        def count_inflight():
+            return sum(1 for r in requests if r.finished is None and r.error is None)
+
+        with UtilisationSampler(roots, stack._redis(), queues, count_inflight) as sampler:
+            asyncio.run(_drive(stack.api_url, rates, options, on_stage, requests))
+
+        for stage, rate in enumerate(rates):
+            window = (boundaries[stage], boundaries[stage + 1])
+            stages.append(_stage_result(
+                stage, rate, requests, window, sampler.window(*window),
+                metrics_at[stage], metrics_at[stage + 1], options,
+            ))
+        stack_info = {
+            "redis": stack.redis_kind, "fetch_backend": options.fetch_backend,
+            "pipeline_mode": options.pipeline_mode, "worker_concurrency": options.worker_concurrency,
+            "api_workers": options.api_workers, "standin_latency_ms": options.latency * 1000,
+            "logs": workdir,
+        }
+    capacity = capacity_model(stages, options)
+    capacity["stack"] = stack_info
+    print(format_report(stages, capacity, stack_info))
+    return stages + [capacity]
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", default="2,5,10,20", help="Ankomsttakter per steg (förfrågningar/s), kommaseparerade.")
+    parser.add_argument("--stage-seconds", type=float, default=30)
+    parser.add_argument("--timeout", type=float, default=120, help="Längsta tid från köning till resultat.")
+    parser.add_argument("--max-inflight", type=int, default=1000, help="Klientens tak för väntande förfrågningar.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Svarslatens för den lokala ersättaren i sekunder.")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--js-fraction", type=float, default=0.0,
+                        help="Andel sidor som kräver webbläsare (med FETCH_BACKEND=http).")
+    parser.add_argument("--fetch-backend", default="http", choices=["http", "selenium"])
+    parser.add_argument("--pipeline-mode", default="monolith", choices=["monolith", "pipeline"])
+    parser.add_argument("--worker-concurrency", type=int, default=4)
+    parser.add_argument("--driver-pool-size", type=int, default=1)
+    parser.add_argument("--api-workers", type=int, default=1)
+    parser.add_argument("--cache-tiers", default="memory,redis,sql",
+                        help="CACHE_TIERS för stacken; söknivån kan annars ge träffar på liknande namn.")
+    parser.add_argument("--redis-url", help="Befintlig Redis (töms!); standard: redis-server eller fakeredis.")
+    parser.add_argument("--database-url", help="Standard: temporär SQLite-fil.")
+    parser.add_argument("--target-rate", type=float, default=50, help="Takt att dimensionera för (förfrågningar/s).")
+    parser.add_argument("--target-utilisation", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--output", help="Sökväg för resultat-JSON (standard: benchmarks/results/).")
+    args = parser.parse_args()
+
+    results = run(args)
+    print(f"Results saved to {save_results(results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# benchmarks/standin.py
+"""Lokal ersättare för Merinfo som serverar syntetiska sidor med konfigurerbar latens.
+
+Kan köras fristående: `python -m benchmarks.standin --port 8081 --latency 0.05`
+och pekas ut för scrapern med MERINFO_BASE_URL=http://localhost:8081.
+"""
+import argparse
+import gzip
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from .corpus import JS_ONLY_TEMPLATE, render_person_page
+
+
+class StandInServer:
+    """Trådad HTTP-server som svarar på /search?q=förnamn+efternamn+stad."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, js_fraction: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.js_fraction = js_fraction
+        self.seed = seed
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _requires_js(self, query: str) -> bool:
+        if not self.js_fraction:
+            return False
+        digest = hashlib.sha256(f"{self.seed}:{query}".encode("utf-8")).digest()
+        return digest[0] / 255 < self.js_fraction
+
+    def render(self, query: str) -> str:
+        if self._requires_js(query):
+            return JS_ONLY_TEMPLATE
+        parts = query.split()
+        if len(parts) < 3:
+            return render_person_page(query, "", "", seed=self.seed)
+        return render_person_page(parts[0], " ".join(parts[1:-1]), parts[-1], seed=self.seed)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers och body skrivs separat; utan detta lägger delayed ACK på ~40 ms per svar
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path != "/search":
+                    self.send_error(404)
+                    return
+                query = parse_qs(url.query).get("q", [""])[0]
+                delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+
+                body = server.render(query).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                if "gzip" in self.headers.get("Accept-Encoding", ""):
+                    body = gzip.compress(body, compresslevel=5)
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.requests += 1
+                    server.bytes_sent += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fast svarslatens i sekunder.")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Slumpmässig extra latens, upp till N sekunder.")
+    parser.add_argument("--js-fraction", type=float, default=0.0,
+                        help="Andel sökningar som svarar utan merinfo-content (kräver webbläsare).")
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, args.latency, args.jitter, args.js_fraction)
+    print(f"Stand-in serving on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
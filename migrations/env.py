@@ -0,0 +1,50 @@
+# migrations/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.database import DATABASE_URL, Base, engine
+from app import models, search  # noqa: F401  registrerar tabeller och sökindexets DDL
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    # Sökindexets tabeller skapas med rå DDL i migreringarna och finns inte i metadata
+    return not (type_ == "table" and name.startswith(search.SEARCH_TABLE))
+
+
+def run_migrations_offline():
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=DATABASE_URL.startswith("sqlite"),
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            # SQLite kan inte ändra kolumner på plats; batch-läget bygger om tabellen
+            render_as_batch=connection.dialect.name == "sqlite",
+            include_object=include_object,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,113 @@
+"""initial schema
+
+Schemat som app/models.py och sökindexet hade när Alembic infördes. Databaser som redan
+skapats med create_all märks upp med: alembic stamp 0001
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 11:04:13.467256
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app import search
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('persons',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=False),
+    sa.Column('age', sa.String(), nullable=True),
+    sa.Column('city', sa.String(), nullable=True),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('phone_number', sa.String(), nullable=True),
+    sa.Column('birthday', sa.String(), nullable=True),
+    sa.Column('national_id', sa.String(), nullable=True),
+    sa.Column('marital_status', sa.String(), nullable=True),
+    sa.Column('query_key', sa.String(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('fingerprint', sa.String(length=64), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_persons_id', 'persons', ['id'])
+    op.create_index('ix_persons_full_name', 'persons', ['full_name'], unique=True)
+    op.create_index('ix_persons_query_key', 'persons', ['query_key'])
+    op.create_index('ix_persons_city_id', 'persons', ['city', 'id'])
+    op.create_index('ix_persons_age_id', 'persons', ['age', 'id'])
+    op.create_index('ix_persons_city_age_id', 'persons', ['city', 'age', 'id'])
+    op.create_index('ix_persons_updated_at_id', 'persons', ['updated_at', 'id'])
+
+    op.create_table('cohabitants',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('age', sa.String(), nullable=True),
+    sa.Column('person_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['person_id'], ['persons.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_cohabitants_id', 'cohabitants', ['id'])
+    op.create_index('ix_cohabitants_person_id', 'cohabitants', ['person_id'])
+
+    op.create_table('vehicles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('make_model', sa.String(), nullable=False),
+    sa.Column('model_year', sa.String(), nullable=True),
+    sa.Column('owner', sa.String(), nullable=True),
+    sa.Column('registration', sa.String(), nullable=True),
+    sa.Column('person_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['person_id'], ['persons.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_vehicles_id', 'vehicles', ['id'])
+    op.create_index('ix_vehicles_person_id', 'vehicles', ['person_id'])
+
+    op.create_table('company_engagements',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('company_name', sa.String(), nullable=False),
+    sa.Column('position', sa.String(), nullable=True),
+    sa.Column('company_url', sa.String(), nullable=True),
+    sa.Column('person_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['person_id'], ['persons.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_company_engagements_id', 'company_engagements', ['id'])
+    op.create_index('ix_company_engagements_person_id', 'company_engagements', ['person_id'])
+
+    op.create_table('page_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('page_hash', sa.String(length=64), nullable=False),
+    sa.Column('query_key', sa.String(), nullable=True),
+    sa.Column('person_id', sa.Integer(), nullable=True),
+    sa.Column('fetched_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['person_id'], ['persons.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_page_archive_id', 'page_archive', ['id'])
+    op.create_index('ix_page_archive_page_hash', 'page_archive', ['page_hash'])
+    op.create_index('ix_page_archive_person_id', 'page_archive', ['person_id'])
+    op.create_index('ix_page_archive_query_key', 'page_archive', ['query_key'])
+
+    # FTS5- respektive pg_trgm-tabellerna för namnsökningen
+    search.create_search_index(None, op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(f"DROP TABLE IF EXISTS {search.SEARCH_KEY_TABLE}")
+    op.execute(f"DROP TABLE IF EXISTS {search.SEARCH_TABLE}")
+    op.drop_table('page_archive')
+    op.drop_table('company_engagements')
+    op.drop_table('vehicles')
+    op.drop_table('cohabitants')
+    op.drop_table('persons')
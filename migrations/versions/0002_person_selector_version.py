@@ -0,0 +1,30 @@
+"""person selector version
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 11:24:40.118025
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('persons') as batch_op:
+        batch_op.add_column(sa.Column('selector_version', sa.String(length=12), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('persons') as batch_op:
+        batch_op.drop_column('selector_version')